@@ -0,0 +1 @@
+"""Offline benchmarks and local stub servers for the LyTOC pipeline."""
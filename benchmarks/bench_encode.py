@@ -0,0 +1,94 @@
+"""
+Benchmark page encoding: bytes uploaded and encode time per page.
+
+Compares the original path (RGB pixmap -> PIL image -> PNG via BytesIO)
+with the pixmap-based encoder in extract_pdfs.encode_page, in grayscale,
+with and without margin trimming, and as 1-bit PNG.
+
+Usage:
+    python -m benchmarks.bench_encode [PDF ...] [--dpi 100] [--pages 20]
+
+Without PDF arguments a synthetic homework-like document is generated.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import fitz
+from PIL import Image
+
+from extract_pdfs import encode_page, pillow_image_to_file_binary, render_page
+
+
+def synthetic_document(pages=20):
+    """Build an in-memory PDF with text blocks and wide blank margins."""
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        if page_index % 10 == 9:
+            continue  # an occasional blank page
+        y = 90
+        for line in range(18 + page_index % 7):
+            page.insert_text(
+                (72, y),
+                f"{line + 1} (10'). Let L = {{a^n b^n | n >= 0}}. Prove that L is context-free.",
+                fontsize=11
+            )
+            y += 16
+    return doc
+
+
+def encode_baseline(doc, page_index, dpi):
+    """The original encoding path: RGB render, PIL copy, PNG into BytesIO."""
+    pix = doc[page_index].get_pixmap(dpi=dpi)
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return pillow_image_to_file_binary(image)
+
+
+VARIANTS = {
+    "baseline (rgb png)": lambda doc, i, dpi: encode_baseline(doc, i, dpi),
+    "rgb png, trimmed": lambda doc, i, dpi: encode_page(render_page(doc, i, dpi, grayscale=False)),
+    "gray png": lambda doc, i, dpi: encode_page(render_page(doc, i, dpi), trim=False),
+    "gray png, trimmed": lambda doc, i, dpi: encode_page(render_page(doc, i, dpi)),
+    "bilevel png, trimmed": lambda doc, i, dpi: encode_page(render_page(doc, i, dpi), "png-bilevel"),
+}
+
+
+def run(docs, dpi):
+    """Encode every page with every variant and print a comparison table."""
+    print(f"{'variant':<24}{'pages':>7}{'sent':>7}{'bytes/page':>13}{'ms/page':>10}{'vs base':>10}")
+    baseline_bytes = None
+
+    for name, encode in VARIANTS.items():
+        pages = sent = total_bytes = 0
+        start = time.perf_counter()
+        for doc in docs:
+            for page_index in range(doc.page_count):
+                data = encode(doc, page_index, dpi)
+                pages += 1
+                if data is not None:
+                    sent += 1
+                    total_bytes += len(data)
+        elapsed = time.perf_counter() - start
+
+        bytes_per_page = total_bytes / max(1, pages)
+        if baseline_bytes is None:
+            baseline_bytes = bytes_per_page
+        print(f"{name:<24}{pages:>7}{sent:>7}{bytes_per_page:>13.0f}"
+              f"{1000 * elapsed / max(1, pages):>10.2f}{bytes_per_page / baseline_bytes:>9.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page encoding for OCR upload.")
+    parser.add_argument("pdfs", nargs="*", type=Path, help="PDF files (default: synthetic)")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the synthetic document")
+    args = parser.parse_args()
+
+    docs = [fitz.open(str(path)) for path in args.pdfs] or [synthetic_document(args.pages)]
+    run(docs, args.dpi)
+
+
+if __name__ == "__main__":
+    main()
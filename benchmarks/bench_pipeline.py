@@ -0,0 +1,386 @@
+"""
+End-to-end offline benchmark suite for extraction and dataset creation.
+
+Extraction: generates synthetic homework PDFs (born-digital text-layer
+pages and scanned image-only pages, at several page counts) and runs
+extract_pdfs() against the local SimpleTex stub with configurable latency
+and failure rates. Dataset creation: generates synthetic parsed_data/
+corpora of increasing size and runs create_benchmark() on each.
+
+The "adaptive" scenarios use a stub whose OCR output is garbled for a
+third of the pages uploaded below LEGIBLE_MIN_WIDTH pixels, and compare a
+fixed high DPI with a low DPI plus --retry-dpi re-rendering. The "stitch"
+scenarios extract short PDFs one page per request and with --stitch,
+against a stub that finds the separator bands of stitched uploads, echoes
+their markers and takes longer for larger uploads (--latency-per-mb),
+with the client capped at --stitch-rate-limit requests per second.
+
+Every scenario runs in a fresh process inside its own temporary working
+directory, so peak RSS is per scenario and nothing touches ./raw or
+./parsed_data. Reported: wall time, throughput, OCR latency percentiles,
+retries, bytes uploaded and peak RSS (from the run reports written by
+perf.py).
+
+Usage:
+    python -m benchmarks.bench_pipeline [--only extract|benchmark] [--pages 1,3,10]
+        [--pdfs 4] [--latency 0.05] [--jitter 0.02] [--error-rate 0.05]
+        [--workers 4] [--processes 1] [--stitch 4] [--stitch-pages 1,2,3]
+        [--corpus-pages 1000,5000,20000] [--json results.json]
+"""
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_textproc import synthetic_corpus
+from textproc import PAGE_SEPARATOR, normalize_punctuation
+
+EXERCISE_LINES = [
+    "Let L = {a^n b^n | n >= 0}. Prove that L is not regular using the pumping lemma.",
+    "Construct a DFA over {0, 1} accepting strings with an even number of 1s.",
+    "Show that context-free languages are closed under union and concatenation.",
+    "Give a Turing machine deciding {w#w | w in {0, 1}*} and analyse its running time.",
+]
+
+
+def draw_homework_page(page, page_index):
+    """Write homework-like text (exercise headers and statements) onto a page."""
+    y = 90
+    for line in range(12 + page_index % 5):
+        if line % 3 == 0:
+            text = f"{page_index * 4 + line // 3 + 1} (10'). {EXERCISE_LINES[line % 4]}"
+        else:
+            text = EXERCISE_LINES[(line + page_index) % 4]
+        page.insert_text((72, y), text, fontsize=11)
+        y += 18
+
+
+def synthetic_pdf(path, pages, scanned=False, scan_dpi=150):
+    """
+    Write a synthetic homework PDF.
+
+    Args:
+        path: Output path
+        pages: Number of pages
+        scanned: Embed each page as an image without a text layer, like a scan
+        scan_dpi: Resolution of the embedded page images
+    """
+    import fitz
+
+    source = fitz.open()
+    for page_index in range(pages):
+        draw_homework_page(source.new_page(), page_index)
+    if not scanned:
+        source.save(str(path))
+        return
+
+    doc = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=scan_dpi, colorspace=fitz.csGRAY)
+        doc.new_page(width=page.rect.width, height=page.rect.height).insert_image(
+            page.rect, stream=pix.tobytes("png")
+        )
+    doc.save(str(path))
+
+
+def write_corpus(parsed_dir, pages, pages_per_doc=4):
+    """Write a synthetic corpus as parsed_data/hwN.md files; returns the file count."""
+    docs = synthetic_corpus(pages, pages_per_doc)
+    for hw_number, doc_pages in enumerate(docs, 1):
+        content = PAGE_SEPARATOR.join(normalize_punctuation(page) for page in doc_pages)
+        (parsed_dir / f"hw{hw_number}.md").write_text(content, encoding="utf-8")
+    return len(docs)
+
+
+# Pages narrower than this (in pixels) are hard to read for the adaptive stub
+LEGIBLE_MIN_WIDTH = 800
+
+
+def resolution_dependent_content(image_binary):
+    """
+    Stub OCR output that degrades at low resolution.
+
+    PNG uploads narrower than LEGIBLE_MIN_WIDTH come back with unbalanced
+    math for one page in three, as dense pages would; wider ones always
+    read correctly.
+    """
+    digest = hashlib.sha256(image_binary).hexdigest()[:12]
+    width = int.from_bytes(image_binary[16:20], "big")
+    if width < LEGIBLE_MIN_WIDTH and int(digest, 16) % 3 == 0:
+        return f"1 (10'). Let $L = {{a^n b^n mid n geq 0 ... {digest}"
+    return f"1 (10'). Let $L = \\{{a^n b^n \\mid n \\geq 0\\}}$, page {digest}."
+
+
+def stitch_aware_content(image_binary, drop_rate=0.0):
+    """
+    Stub OCR output for uploads that may be stitched from several pages.
+
+    Separator bands are found as runs of almost entirely dark pixel rows
+    (the full-width rule drawn by stitch_images()), and each band's marker
+    is echoed as a real OCR engine would read it. With `drop_rate`, that
+    fraction of stitched uploads loses its last marker, so the split is
+    ambiguous and extraction falls back to single pages.
+    """
+    import numpy as np
+    from PIL import Image
+
+    from extract_pdfs import STITCH_MARKER
+
+    digest = hashlib.sha256(image_binary).hexdigest()[:12]
+    pixels = np.asarray(Image.open(io.BytesIO(image_binary)).convert("L"))
+    rule_rows = (pixels < 128).mean(axis=1) >= 0.9
+    bands = int(np.count_nonzero(rule_rows[1:] & ~rule_rows[:-1])) + int(rule_rows[0])
+    if bands == 0:
+        return f"1 (10'). Mock exercise for page {digest}, with enough text."
+
+    parts = [f"{STITCH_MARKER.format(k, bands)}\n\n1 (10'). Mock exercise {k} of upload {digest}."
+             for k in range(1, bands + 1)]
+    if bands > 1 and int(digest, 16) % 1000 < drop_rate * 1000:
+        parts[-1] = parts[-1].split("\n\n", 1)[1]
+    return "\n\n".join(parts)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress output."""
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            yield
+
+
+def stage_ms(report, stage, stat):
+    stats = report["stages"].get(stage)
+    return round(1000 * stats[stat], 1) if stats else None
+
+
+def run_extract_scenario(pdf_pages, pdfs, scanned, text_layer, mock_options, workers, processes,
+                         extract_options=None, rate_limit=None):
+    """
+    Benchmark task: extract synthetic PDFs against the SimpleTex stub.
+
+    Runs in its own process and temporary directory.
+    """
+    from benchmarks.mock_simpletex import MockSimpleTexServer
+    from dataset_writer import peak_rss_mb
+    from extract_pdfs import extract_pdfs
+    from ocr_client import SimpleTexClient
+
+    with tempfile.TemporaryDirectory(prefix="lytoc-bench-") as workdir:
+        os.chdir(workdir)
+        Path("raw").mkdir()
+        for hw_number in range(1, pdfs + 1):
+            synthetic_pdf(Path("raw") / f"hw{hw_number}.pdf", pdf_pages, scanned)
+
+        with MockSimpleTexServer(**mock_options) as server:
+            client = SimpleTexClient(
+                "bench", api_url=server.url, backoff_base=0.01, backoff_max=0.1,
+                pool_size=max(16, workers), rate_limit=rate_limit
+            )
+            start = time.perf_counter()
+            with quiet():
+                results = extract_pdfs(
+                    workers=workers, processes=processes, use_cache=False,
+                    client=client, text_layer=text_layer, **(extract_options or {})
+                )
+            seconds = time.perf_counter() - start
+            requests = server.requests
+
+        with open("parsed_data/extraction_report.json", "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+    counters = report["counters"]
+    pages = counters.get("pages", 0)
+    return {
+        "pdfs": pdfs,
+        "pages": pages,
+        "ok": sum(1 for r in (results or {}).values() if r["status"] == "success"),
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 2),
+        "ocr_requests": requests,
+        "retries": counters.get("simpletex_retries", 0),
+        "bytes_uploaded": counters.get("simpletex_bytes_uploaded", 0),
+        "rerendered": counters.get("pages_rerendered", 0),
+        "stitch_fallbacks": counters.get("stitch_fallbacks", 0),
+        "ocr_p50_ms": stage_ms(report, "ocr_request", "p50"),
+        "ocr_p95_ms": stage_ms(report, "ocr_request", "p95"),
+        "ocr_p99_ms": stage_ms(report, "ocr_request", "p99"),
+        "render_p50_ms": stage_ms(report, "rasterize", "p50"),
+        "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+    }
+
+
+def run_benchmark_scenario(corpus_pages, workers):
+    """
+    Benchmark task: run create_benchmark() on a synthetic parsed_data/ corpus.
+
+    Runs in its own process and temporary directory.
+    """
+    from create_benchmark import create_benchmark
+    from dataset_writer import peak_rss_mb
+
+    with tempfile.TemporaryDirectory(prefix="lytoc-bench-") as workdir:
+        os.chdir(workdir)
+        parsed_dir = Path("parsed_data")
+        parsed_dir.mkdir()
+        files = write_corpus(parsed_dir, corpus_pages)
+
+        start = time.perf_counter()
+        with quiet():
+            export = create_benchmark(workers=workers, use_cache=False)
+        seconds = time.perf_counter() - start
+
+        with open(parsed_dir / "benchmark_report.json", "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+    rows = export["rows"] if export else 0
+    return {
+        "pages": corpus_pages,
+        "files": files,
+        "exercises": rows,
+        "seconds": round(seconds, 3),
+        "split_s": round(report["stages"]["split"]["total"], 3),
+        "dedup_s": round(report["stages"]["dedup"]["total"], 3),
+        "export_s": round(report["stages"]["export"]["total"], 3),
+        "exercises_per_second": round(rows / seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+    }
+
+
+def in_fresh_process(fn, *args):
+    """Run fn(*args) in a newly spawned process and return its result."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def print_table(rows, columns):
+    """Print dict rows as an aligned table of the given (key, heading) columns."""
+    cells = [["-" if row.get(key) is None else str(row[key]) for key, _ in columns] for row in rows]
+    widths = [max(len(heading), *(len(line[i]) for line in cells)) + 2
+              for i, (_, heading) in enumerate(columns)]
+    print("".join(f"{heading:>{width}}" for (_, heading), width in zip(columns, widths)))
+    for line in cells:
+        print("".join(f"{cell:>{width}}" for cell, width in zip(line, widths)))
+
+
+EXTRACT_COLUMNS = [
+    ("kind", "kind"), ("pdfs", "pdfs"), ("pages", "pages"), ("ok", "ok"), ("seconds", "s"),
+    ("pages_per_second", "pages/s"), ("ocr_requests", "requests"), ("retries", "retries"),
+    ("bytes_uploaded", "bytes up"), ("rerendered", "re-rendered"), ("requests_saved", "saved"),
+    ("stitch_fallbacks", "fallbacks"), ("ocr_p50_ms", "ocr p50"), ("ocr_p95_ms", "ocr p95"),
+    ("ocr_p99_ms", "ocr p99"), ("render_p50_ms", "render p50"), ("peak_rss_mb", "RSS MB"),
+]
+
+BENCHMARK_COLUMNS = [
+    ("pages", "pages"), ("files", "files"), ("exercises", "exercises"), ("seconds", "s"),
+    ("split_s", "split s"), ("dedup_s", "dedup s"), ("export_s", "export s"),
+    ("exercises_per_second", "exercises/s"), ("peak_rss_mb", "RSS MB"),
+]
+
+
+def int_list(value):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of extraction and dataset creation.")
+    parser.add_argument("--only", choices=("extract", "benchmark"), default=None,
+                        help="Run only one part of the suite")
+    parser.add_argument("--pages", type=int_list, default=[1, 3, 10],
+                        help="Comma-separated pages per synthetic PDF (default 1,3,10)")
+    parser.add_argument("--pdfs", type=int, default=4, help="PDFs per extraction scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub OCR latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra random stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--latency-per-mb", type=float, default=0.5,
+                        help="Stub delay per MB uploaded in the stitch scenarios")
+    parser.add_argument("--stitch", type=int, default=4, help="Pages per stitched request")
+    parser.add_argument("--stitch-pages", type=int_list, default=[1, 2, 3],
+                        help="Comma-separated pages per PDF in the stitch scenarios (default 1,2,3)")
+    parser.add_argument("--stitch-rate-limit", type=float, default=5.0,
+                        help="Client requests/sec cap in the stitch scenarios, like an API quota")
+    parser.add_argument("--stitch-drop-rate", type=float, default=0.05,
+                        help="Fraction of stitched uploads whose split is made ambiguous")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent OCR requests")
+    parser.add_argument("--processes", type=int, default=1, help="Page rendering processes")
+    parser.add_argument("--corpus-pages", type=int_list, default=[1000, 5000, 20000],
+                        help="Comma-separated sizes of the synthetic markdown corpora")
+    parser.add_argument("--split-workers", type=int, default=None,
+                        help="create_benchmark --workers (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Stub failure/latency seed")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the results here")
+    args = parser.parse_args()
+
+    # The stub accepts any token; extract_pdfs only checks that one is set
+    os.environ.setdefault("OCR_UAT", "bench")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    results = {"extract": [], "benchmark": []}
+    mock_options = {
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate, "seed": args.seed,
+    }
+
+    if args.only in (None, "extract"):
+        print(f"Extraction: {args.pdfs} PDFs per scenario, stub latency {args.latency}s "
+              f"+ {args.jitter}s jitter, {args.error_rate:.0%} errors, "
+              f"{args.workers} OCR workers, {args.processes} render process(es)\n")
+        adaptive_options = dict(mock_options, content_fn=resolution_dependent_content)
+        stitch_options = dict(
+            mock_options, latency_per_mb=args.latency_per_mb,
+            content_fn=functools.partial(stitch_aware_content, drop_rate=args.stitch_drop_rate)
+        )
+        scenarios = [
+            ("text", False, False, mock_options, {}, args.pages, None),
+            ("text --text-layer", False, True, mock_options, {}, args.pages, None),
+            ("scanned", True, False, mock_options, {}, args.pages, None),
+            ("adaptive 150 dpi", True, False, adaptive_options, {"dpi": 150}, args.pages, None),
+            ("adaptive 72+150", True, False, adaptive_options,
+             {"dpi": 72, "retry_dpis": (150,)}, args.pages, None),
+            ("stitch 1", True, False, stitch_options, {}, args.stitch_pages,
+             args.stitch_rate_limit),
+            (f"stitch {args.stitch}", True, False, stitch_options, {"stitch": args.stitch},
+             args.stitch_pages, args.stitch_rate_limit),
+        ]
+        baseline_requests = {}
+        for kind, scanned, text_layer, options, extract_options, page_counts, rate_limit in scenarios:
+            for pages in page_counts:
+                row = in_fresh_process(
+                    run_extract_scenario, pages, args.pdfs, scanned, text_layer,
+                    options, args.workers, args.processes, extract_options, rate_limit
+                )
+                if kind == "stitch 1":
+                    baseline_requests[pages] = row["ocr_requests"]
+                elif kind.startswith("stitch"):
+                    row["requests_saved"] = baseline_requests[pages] - row["ocr_requests"]
+                results["extract"].append({"kind": kind, "pages_per_pdf": pages, **row})
+        print_table(results["extract"], EXTRACT_COLUMNS)
+        print("(latencies in ms)\n")
+
+    if args.only in (None, "benchmark"):
+        print("Dataset creation on synthetic corpora\n")
+        for pages in args.corpus_pages:
+            results["benchmark"].append(
+                in_fresh_process(run_benchmark_scenario, pages, args.split_workers)
+            )
+        print_table(results["benchmark"], BENCHMARK_COLUMNS)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup-time benchmark for the pipeline's entry points.
+
+Imports each script in a fresh interpreter under `python -X importtime`
+and reports the cumulative import time of the script module (median of
+several runs), the wall time of `script.py --help`, and any heavy
+dependency loaded at import time. Exits non-zero if a script exceeds its
+budget or imports a heavy dependency eagerly, so it can guard against
+startup regressions.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--scale 1.0]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Import-time budget per entry point, in milliseconds
+BUDGETS_MS = {
+    "extract_pdfs": 150,
+    "create_benchmark": 150,
+    "upload_to_hf": 150,
+    "run_pipeline": 100,
+    "evaluate": 100,
+    "check_setup": 50,
+    "dataset_reader": 50,
+    "search_index": 50,
+    "watch": 50,
+}
+
+# Entry points runnable as `python <name>.py`
+SCRIPTS = ("extract_pdfs", "create_benchmark", "upload_to_hf", "run_pipeline", "evaluate",
+           "check_setup", "search_index", "watch")
+
+# Packages that must only be imported on the code paths that use them
+HEAVY_MODULES = (
+    "fitz", "PIL", "tqdm", "requests", "numpy", "pyarrow", "pandas", "datasets",
+    "huggingface_hub.hf_api", "aiohttp",
+)
+
+
+def import_profile(module):
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        (cumulative_us, imported): the module's cumulative import time in
+        microseconds and the set of all modules imported along the way
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not total.isdigit():
+            continue  # header line
+        imported.add(name)
+        if name == module:
+            cumulative = int(total)
+    return cumulative, imported
+
+
+def help_wall_time(module):
+    """Wall time of `python <module>.py --help`, in seconds (exit status ignored)."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, f"{module}.py", "--help"], cwd=ROOT, capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark entry-point startup time.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per script (median is used)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. on slow machines")
+    args = parser.parse_args()
+
+    print(f"{'script':<18}{'import ms':>11}{'budget':>9}{'--help ms':>11}  heavy imports")
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        profiles = [import_profile(module) for _ in range(args.repeat)]
+        import_ms = statistics.median(total for total, _ in profiles) / 1000
+        imported = profiles[0][1]
+        heavy = sorted(name for name in HEAVY_MODULES if name in imported)
+
+        help_ms = "-"
+        if module in SCRIPTS:
+            help_ms = f"{1000 * statistics.median(help_wall_time(module) for _ in range(args.repeat)):.0f}"
+
+        over = import_ms > budget * args.scale
+        failed = failed or over or bool(heavy)
+        status = "✗" if over or heavy else "✓"
+        print(f"{module:<18}{import_ms:>11.1f}{budget * args.scale:>9.0f}"
+              f"{help_ms:>11}  "
+              f"{', '.join(heavy) or '-'} {status}")
+
+    if failed:
+        print("\n✗ Startup budget exceeded or heavy dependency imported eagerly")
+        return 1
+    print("\n✓ All entry points within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
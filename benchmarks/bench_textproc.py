@@ -0,0 +1,144 @@
+"""
+Microbenchmark for textproc: punctuation normalization and exercise splitting.
+
+Builds a synthetic corpus (10k pages by default) of homework-like
+markdown with Chinese punctuation and compares the original
+implementations, kept here as references, with textproc. The new
+splitter's output is checked against the original on every document.
+
+Usage:
+    python -m benchmarks.bench_textproc [--pages 10000] [--pages-per-doc 4]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from create_benchmark import split_exercises
+from textproc import PAGE_SEPARATOR, normalize_punctuation
+
+
+def legacy_normalize_punctuation(content):
+    """Original extract_pdfs.normalize_punctuation: one str.replace per character."""
+    replacements = {
+        '，': ',', '。': '.', '、': ',', '；': ';', '：': ':',
+        '？': '?', '！': '!', '“': '"', '”': '"', '‘': "'",
+        '’': "'", '（': '(', '）': ')', '【': '[', '】': ']',
+        '《': '<', '》': '>', '．': '.',
+    }
+    for cn_char, en_char in replacements.items():
+        content = content.replace(cn_char, en_char)
+    return content
+
+
+def legacy_split_exercises(content, hw_number):
+    """Original create_benchmark.split_exercises."""
+    exercises = []
+
+    lines = content.split('\n')
+    content_start = 0
+    for i, line in enumerate(lines):
+        if re.match(r'^\d+\s*\(', line):
+            content_start = i
+            break
+
+    if content_start > 0:
+        content = '\n'.join(lines[content_start:])
+
+    exercise_pattern = r'^(\d+)\s*(?:\([^)]+\))?\s*\.?\s+'
+    parts = re.split(exercise_pattern, content, flags=re.MULTILINE)
+
+    for i in range(1, len(parts), 2):
+        if i + 1 < len(parts):
+            exercise_num = parts[i].strip()
+            exercise_content = parts[i + 1].strip()
+            exercise_content = re.sub(r'\n\d+\s*$', '', exercise_content)
+            if len(exercise_content) < 10:
+                continue
+            exercises.append({
+                "homework": f"hw{hw_number}",
+                "exercise_number": exercise_num,
+                "content": exercise_content.strip(),
+                "full_id": f"hw{hw_number}_ex{exercise_num}"
+            })
+
+    return exercises
+
+
+SENTENCES = [
+    "设 $L = \\{a^n b^n \\mid n \\geq 0\\}$，证明 $L$ 不是正则语言。",
+    "Construct a DFA（deterministic finite automaton）for the language below；",
+    "Use the pumping lemma：assume “L is regular” and derive a contradiction！",
+    "Show that the class of context-free languages is closed under union．",
+    "给出图灵机 $M$ 的形式化描述、状态转移函数以及接受条件？",
+    "Let $\\Sigma = \\{0, 1\\}$ and consider 【all strings】 with 《even parity》.",
+]
+
+
+def synthetic_corpus(pages, pages_per_doc, seed=0):
+    """Generate homework documents as lists of raw (un-normalized) pages."""
+    rng = random.Random(seed)
+    docs = []
+    exercise = 0
+    for doc_index in range(0, pages, pages_per_doc):
+        doc_pages = []
+        for page in range(min(pages_per_doc, pages - doc_index)):
+            lines = []
+            if page == 0:
+                exercise = 0
+                lines += [f"# Homework {doc_index // pages_per_doc + 1}", "Due: 2024-03-01", ""]
+            for _ in range(rng.randint(2, 4)):
+                exercise += 1
+                points = rng.choice(["(30').", "(20')", ".", ""])
+                lines.append(f"{exercise} {points} " + " ".join(
+                    rng.choice(SENTENCES) for _ in range(rng.randint(3, 8))
+                ))
+                lines.append("")
+            lines.append(str(page + 1))
+            doc_pages.append("\n".join(lines))
+        docs.append(doc_pages)
+    return docs
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text post-processing.")
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--pages-per-doc", type=int, default=4)
+    args = parser.parse_args()
+
+    docs = synthetic_corpus(args.pages, args.pages_per_doc)
+    pages = [page for doc in docs for page in doc]
+    print(f"Corpus: {len(pages)} pages, {len(docs)} documents, "
+          f"{sum(map(len, pages)) / 1e6:.1f}M characters")
+
+    legacy_pages, legacy_time = timed(lambda: [legacy_normalize_punctuation(p) for p in pages])
+    new_pages, new_time = timed(lambda: [normalize_punctuation(p) for p in pages])
+    assert legacy_pages == new_pages, "normalization output differs"
+    print(f"normalize_punctuation: {legacy_time:.3f}s -> {new_time:.3f}s "
+          f"({legacy_time / new_time:.1f}x)")
+
+    markdown = []
+    offset = 0
+    for doc in docs:
+        doc_pages = new_pages[offset:offset + len(doc)]
+        offset += len(doc)
+        markdown.append(PAGE_SEPARATOR.join(doc_pages))
+
+    legacy_ex, legacy_time = timed(
+        lambda: [legacy_split_exercises(md, i) for i, md in enumerate(markdown)]
+    )
+    new_ex, new_time = timed(lambda: [split_exercises(md, i) for i, md in enumerate(markdown)])
+    assert legacy_ex == new_ex, "split_exercises output differs"
+    print(f"split_exercises:       {legacy_time:.3f}s -> {new_time:.3f}s "
+          f"({legacy_time / new_time:.1f}x, {sum(map(len, new_ex))} exercises)")
+
+
+if __name__ == "__main__":
+    main()
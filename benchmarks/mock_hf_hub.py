@@ -0,0 +1,210 @@
+"""
+Local fake of the HuggingFace Hub endpoints used by upload_to_hf.py.
+
+Implements repo creation, README metadata validation, the recursive tree
+listing, the preupload check and the NDJSON commit endpoint for dataset
+repos, keeping files in memory.
+
+Every file is accepted as a regular (inline) upload; Parquet files are
+listed with LFS metadata like on the real Hub, so hash comparison against
+both kinds of entries is exercised.
+
+Usage:
+    python -m benchmarks.mock_hf_hub --port 8766
+    HF_TOKEN=test python upload_to_hf.py user/lytoc --endpoint http://127.0.0.1:8766
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Paths reported as LFS files in tree listings
+LFS_SUFFIXES = (".parquet", ".arrow")
+
+
+def git_blob_sha1(data):
+    return hashlib.sha1(f"blob {len(data)}\0".encode() + data).hexdigest()
+
+
+def tree_entry(path, data):
+    """Tree listing entry for a file, shaped like the Hub's."""
+    entry = {"type": "file", "path": path, "size": len(data), "oid": git_blob_sha1(data)}
+    if path.endswith(LFS_SUFFIXES):
+        sha256 = hashlib.sha256(data).hexdigest()
+        pointer = (f"version https://git-lfs.github.com/spec/v1\noid sha256:{sha256}\n"
+                   f"size {len(data)}\n").encode()
+        entry["oid"] = git_blob_sha1(pointer)
+        entry["lfs"] = {"oid": sha256, "size": len(data), "pointerSize": len(pointer)}
+    return entry
+
+
+class MockHfHub:
+    """
+    Threaded fake Hub server, usable as a context manager.
+
+    `repos` maps "namespace/name" to {path: bytes}; counters record commits,
+    committed files and bytes received in commit payloads.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.repos = {}
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.files_committed = 0
+        self.bytes_received = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _commit(self, repo_id, lines):
+        """Apply NDJSON commit operations to a repo."""
+        files = self.repos[repo_id]
+        for line in lines:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            key, value = item["key"], item["value"]
+            if key == "file":
+                data = base64.b64decode(value["content"])
+                files[value["path"]] = data
+                self.files_committed += 1
+                self.bytes_received += len(data)
+            elif key == "deletedFile":
+                files.pop(value["path"], None)
+            elif key == "deletedFolder":
+                prefix = value["path"].rstrip("/") + "/"
+                for path in [path for path in files if path.startswith(prefix)]:
+                    del files[path]
+            elif key != "header":
+                raise ValueError(f"unsupported commit operation: {key}")
+        self.commits += 1
+        return hashlib.sha1(f"{repo_id}:{self.commits}".encode()).hexdigest()
+
+    def _make_handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _not_found(self):
+                self._reply(404, {"error": "Repository not found"},
+                            {"X-Error-Code": "RepoNotFound"})
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _route(self):
+                """Split /api/datasets/{namespace}/{name}/{action}/{revision}[/...]."""
+                parts = urlparse(self.path).path.strip("/").split("/")
+                if len(parts) >= 6 and parts[:2] == ["api", "datasets"]:
+                    return f"{parts[2]}/{parts[3]}", parts[4]
+                return None, None
+
+            def do_GET(self):
+                repo_id, action = self._route()
+                if action != "tree":
+                    return self._reply(404, {"error": "not found"})
+                with hub._lock:
+                    files = hub.repos.get(repo_id)
+                    if files is None:
+                        return self._not_found()
+                    entries = [tree_entry(path, data) for path, data in sorted(files.items())]
+                self._reply(200, entries)
+
+            def do_POST(self):
+                body = self._body()
+                path = urlparse(self.path).path.rstrip("/")
+                if path == "/api/validate-yaml":
+                    return self._reply(200, {"errors": [], "warnings": []})
+                if path == "/api/repos/create":
+                    request = json.loads(body or b"{}")
+                    name = request["name"]
+                    repo_id = f"{request.get('organization') or 'user'}/{name}"
+                    with hub._lock:
+                        exists = repo_id in hub.repos
+                        hub.repos.setdefault(repo_id, {})
+                    return self._reply(409 if exists else 200, {
+                        "url": f"{hub.url}/datasets/{repo_id}",
+                        **({"error": "You already created this dataset repo"} if exists else {})
+                    })
+
+                repo_id, action = self._route()
+                with hub._lock:
+                    if repo_id not in hub.repos:
+                        return self._not_found()
+                    if action == "preupload":
+                        files = json.loads(body)["files"]
+                        return self._reply(200, {"files": [
+                            {"path": f["path"], "uploadMode": "regular", "shouldIgnore": False}
+                            for f in files
+                        ]})
+                    if action == "commit":
+                        oid = hub._commit(repo_id, body.decode("utf-8").splitlines())
+                        return self._reply(200, {
+                            "commitUrl": f"{hub.url}/datasets/{repo_id}/commit/{oid}",
+                            "commitOid": oid
+                        })
+                self._reply(404, {"error": "not found"})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake HuggingFace Hub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    hub = MockHfHub(host=args.host, port=args.port)
+    print(f"Fake Hub listening on {hub.url}")
+    try:
+        hub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
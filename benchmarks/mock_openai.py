@@ -0,0 +1,221 @@
+"""
+Local stub of an OpenAI-compatible completion server.
+
+Serves /v1/chat/completions and /v1/completions (including batched
+`prompt` lists) with deterministic answers and usage counts, and can
+inject latency, a token generation rate, 5xx errors and 429 rate limiting,
+so evaluate.py can be exercised without a model or API cost.
+
+Usage:
+    python -m benchmarks.mock_openai --port 8767 --latency 0.2 --tokens-per-second 200
+    python evaluate.py --base-url http://127.0.0.1:8767/v1 --model mock
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def default_answer(prompt):
+    """Deterministic fake answer derived from the prompt."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"Proof sketch {digest}: apply the pumping lemma and derive a contradiction."
+
+
+def count_tokens(text):
+    """Rough token count (whitespace-separated words)."""
+    return max(1, len(text.split()))
+
+
+class MockOpenAIServer:
+    """
+    Threaded HTTP server imitating an OpenAI-compatible API, usable as a
+    context manager.
+
+    Counters record requests, prompts answered and failures injected.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, tokens_per_second=None,
+                 error_rate=0.0, rate_limit_rate=0.0, answer_fn=default_answer, seed=None):
+        """
+        Args:
+            host, port: Address to bind (port 0 picks a free port)
+            latency: Base response delay in seconds
+            jitter: Extra uniformly distributed delay in seconds
+            tokens_per_second: Simulated generation speed (adds
+                completion_tokens / tokens_per_second to the delay)
+            error_rate: Fraction of requests answered with HTTP 503
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            answer_fn: Maps a prompt to the completion text
+            seed: Seed for the failure/latency random generator
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.answer_fn = answer_fn
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompts = 0
+        self.failures = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self):
+        """Pick the outcome and base delay of one request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        if roll < self.error_rate:
+            outcome = "error"
+        elif roll < self.error_rate + self.rate_limit_rate:
+            outcome = "rate_limit"
+        else:
+            outcome = "ok"
+        if outcome != "ok":
+            with self._lock:
+                self.failures += 1
+        return outcome, delay
+
+    def _complete(self, request, chat):
+        """Build the response body and the generated token count."""
+        if chat:
+            prompts = ["\n".join(m.get("content", "") for m in request.get("messages", []))]
+        else:
+            prompts = request.get("prompt", "")
+            prompts = prompts if isinstance(prompts, list) else [prompts]
+
+        choices = []
+        prompt_tokens = completion_tokens = 0
+        for index, prompt in enumerate(prompts):
+            answer = self.answer_fn(prompt)
+            prompt_tokens += count_tokens(prompt)
+            completion_tokens += count_tokens(answer)
+            if chat:
+                choices.append({"index": index, "finish_reason": "stop",
+                                "message": {"role": "assistant", "content": answer}})
+            else:
+                choices.append({"index": index, "finish_reason": "stop", "text": answer})
+
+        with self._lock:
+            self.prompts += len(prompts)
+        body = {
+            "id": "cmpl-" + hashlib.md5(json.dumps(request, sort_keys=True).encode()).hexdigest(),
+            "object": "chat.completion" if chat else "text_completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return body, completion_tokens
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                path = urlparse(self.path).path.rstrip("/")
+                if path not in ("/v1/chat/completions", "/v1/completions"):
+                    return self._reply(404, {"error": {"message": "not found"}})
+
+                outcome, delay = server._draw()
+                if outcome == "error":
+                    time.sleep(delay)
+                    return self._reply(503, {"error": {"message": "server overloaded"}})
+                if outcome == "rate_limit":
+                    time.sleep(delay)
+                    return self._reply(429, {"error": {"message": "rate limit reached"}},
+                                       {"Retry-After": "0"})
+
+                body, completion_tokens = server._complete(request, path.endswith("chat/completions"))
+                if server.tokens_per_second:
+                    delay += completion_tokens / server.tokens_per_second
+                time.sleep(delay)
+                self._reply(200, body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=None,
+                        help="Simulated generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    )
+    print(f"Mock OpenAI API listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Local stub of the SimpleTex `doc_ocr` endpoint.
+
+Serves the same response shape as the real API and can inject latency,
+5xx errors, 429 rate limiting and quota errors, so the OCR client and the
+extraction pipeline can be exercised without network access or API cost.
+
+Usage:
+    python -m benchmarks.mock_simpletex --port 8765 --latency 0.2 --error-rate 0.1
+    python extract_pdfs.py --api-url http://127.0.0.1:8765/api/doc_ocr/
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_content(image_binary):
+    """Deterministic fake OCR output derived from the uploaded bytes."""
+    digest = hashlib.sha256(image_binary).hexdigest()[:12]
+    return f"1 (10'). Mock exercise for page {digest}, with enough text."
+
+
+def read_upload(handler):
+    """Return the bytes of the multipart `file` field of a request."""
+    length = int(handler.headers.get("Content-Length", 0))
+    body = handler.rfile.read(length)
+    content_type = handler.headers.get("Content-Type", "")
+
+    message = BytesParser(policy=default_policy).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    if not message.is_multipart():
+        return b""
+
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True) or b""
+    return b""
+
+
+class MockSimpleTexServer:
+    """
+    Threaded HTTP server imitating SimpleTex, usable as a context manager.
+
+    Failure injection is random per request and controlled by the rates
+    passed in; `seed` makes a run reproducible. `outcomes` scripts the
+    first requests instead, for tests.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, quota_error_rate=0.0,
+                 content_fn=default_content, seed=None, latency_per_mb=0.0,
+                 outcomes=(), slow_delay=2.0):
+        """
+        Args:
+            host, port: Address to bind (port 0 picks a free port)
+            latency: Base response delay in seconds
+            jitter: Extra uniformly distributed delay in seconds
+            error_rate: Fraction of requests answered with HTTP 503
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            quota_error_rate: Fraction answered with a SimpleTex quota error
+            content_fn: Maps the uploaded image bytes to OCR content
+            seed: Seed for the failure/latency random generator
+            latency_per_mb: Extra delay in seconds per MB uploaded, so
+                larger images take longer
+            outcomes: Outcomes of the first requests, in arrival order, one
+                of "ok", "error" (503), "rate_limit" (429), "quota",
+                "invalid" (a non-retryable API error) or "slow" (answered
+                after `slow_delay` seconds); later requests are drawn at
+                random from the rates
+            slow_delay: Extra delay of "slow" requests, in seconds
+        """
+        self.latency = latency
+        self.latency_per_mb = latency_per_mb
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota_error_rate = quota_error_rate
+        self.content_fn = content_fn
+        self.slow_delay = slow_delay
+        self._outcomes = collections.deque(outcomes)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.bytes_received = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/doc_ocr/"
+
+    def _draw(self):
+        """Pick the outcome and delay of one request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            scripted = self._outcomes.popleft() if self._outcomes else None
+
+        if scripted is not None:
+            outcome = scripted
+        elif roll < self.error_rate:
+            outcome = "error"
+        elif roll < self.error_rate + self.rate_limit_rate:
+            outcome = "rate_limit"
+        elif roll < self.error_rate + self.rate_limit_rate + self.quota_error_rate:
+            outcome = "quota"
+        else:
+            outcome = "ok"
+
+        if outcome == "slow":
+            outcome, delay = "ok", delay + self.slow_delay
+        elif outcome != "ok":
+            with self._lock:
+                self.failures += 1
+        return outcome, delay
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                image_binary = read_upload(self)
+                with server._lock:
+                    server.bytes_received += len(image_binary)
+
+                outcome, delay = server._draw()
+                time.sleep(delay + server.latency_per_mb * len(image_binary) / 1e6)
+
+                if outcome == "error":
+                    self._reply(503, {"status": False, "err_info": {"err_msg": "server busy"}})
+                elif outcome == "rate_limit":
+                    self._reply(429, {"status": False, "err_info": {"err_msg": "too many requests"}},
+                                {"Retry-After": "0"})
+                elif outcome == "quota":
+                    self._reply(200, {"status": False, "err_info": {
+                        "err_type": "req_limit", "err_msg": "request rate limit exceeded"}})
+                elif outcome == "invalid":
+                    self._reply(200, {"status": False, "err_info": {
+                        "err_type": "file_error", "err_msg": "unsupported image file"}})
+                else:
+                    self._reply(200, {
+                        "status": True,
+                        "res": {"type": "doc", "content": server.content_fn(image_binary)},
+                        "request_id": hashlib.md5(image_binary).hexdigest()
+                    })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SimpleTex doc_ocr stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay in seconds")
+    parser.add_argument("--latency-per-mb", type=float, default=0.0,
+                        help="Extra delay in seconds per MB uploaded")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="Fraction of quota errors")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockSimpleTexServer(
+        host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        quota_error_rate=args.quota_error_rate, seed=args.seed,
+        latency_per_mb=args.latency_per_mb
+    )
+    print(f"Mock SimpleTex listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
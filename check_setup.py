@@ -5,6 +5,7 @@ Check if the environment is properly configured for running the benchmark pipeli
 
 import os
 import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 def check_file_exists(filepath, description):
@@ -37,12 +38,15 @@ def check_python_version():
         return False
 
 def check_package(package_name):
-    """Check if a Python package is installed."""
+    """Check if a Python package is installed, without importing it."""
     try:
-        __import__(package_name.replace("-", "_"))
+        found = find_spec(package_name.replace("-", "_")) is not None
+    except (ImportError, ValueError):
+        found = False
+    if found:
         print(f"✓ {package_name}: Installed")
         return True
-    except ImportError:
+    else:
         print(f"✗ {package_name}: Not installed")
         return False
 
@@ -107,13 +111,22 @@ def main():
         "datasets",
         "huggingface_hub",
         "dotenv",
-        "pandas",
+        "pyarrow",
+        "numpy",
+        "aiohttp",
     ]
 
     for package in packages:
         if not check_package(package):
             all_checks_passed = False
 
+    # Optional packages only add features, so they don't fail the check
+    print("\n📌 Optional Packages:")
+    if find_spec("watchdog") is not None:
+        print("✓ watchdog: Installed (watch.py uses filesystem events)")
+    else:
+        print("- watchdog: Not installed (watch.py falls back to polling)")
+
     # Summary
     print("\n" + "="*60)
     if all_checks_passed:
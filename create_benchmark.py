@@ -3,21 +3,47 @@ Create benchmark dataset from parsed PDF content.
 
 This script reads all markdown files from parsed_data/ directory,
 splits them into individual exercises, and creates a structured dataset.
+Split results are cached per file, so only changed files are re-split.
 """
 
+import os
 import json
 import re
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datasets import Dataset
-import pandas as pd
+from dataset_writer import COMPRESSIONS, DEFAULT_SHARD_SIZE, export_exercises
+from dedup import DEFAULT_THRESHOLD, duplicate_ids, find_duplicates, write_report
+from search_index import INDEX_FILE, build_index
+from perf import metrics, print_summary, write_json_report, write_prometheus_textfile
+from textproc import SPLITTER_VERSION, iter_exercises
+
+HW_NUMBER_PATTERN = re.compile(r'hw(\d+)')
+
+# Per-file split results, keyed by markdown hash and splitter version
+SPLIT_CACHE_FILE = Path("parsed_data/.cache/exercises.json")
+
+# Near-duplicate clusters found by the dedup stage
+DUPLICATES_REPORT = Path("benchmark_dataset/duplicates.json")
 
 
 def extract_homework_number(filename):
     """Extract homework number from filename like 'hw1.md' -> '1'."""
-    match = re.search(r'hw(\d+)', filename)
+    match = HW_NUMBER_PATTERN.search(filename)
     return match.group(1) if match else None
 
 
+def exercise_record(hw_number, exercise_number, content):
+    """Build the dataset row of one exercise."""
+    return {
+        "homework": f"hw{hw_number}",
+        "exercise_number": exercise_number,
+        "content": content,
+        "full_id": f"hw{hw_number}_ex{exercise_number}"
+    }
+
+
 def split_exercises(content, hw_number):
     """
     Split homework content into individual exercises.
@@ -34,53 +60,186 @@ def split_exercises(content, hw_number):
     Returns:
         List of exercise dictionaries
     """
-    exercises = []
+    # No sub-problem splitting, treat each exercise as a single unit
+    return [
+        exercise_record(hw_number, exercise.number, exercise.content)
+        for exercise in iter_exercises(content)
+    ]
+
+
+def split_file(md_file):
+    """
+    Split one markdown file into (exercise_number, content) pairs.
+
+    Runs in worker processes, so it takes a path and returns plain tuples.
+    """
+    with open(md_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    return [(exercise.number, exercise.content) for exercise in iter_exercises(content)]
+
 
-    # Remove the header (first few lines with title and date)
-    lines = content.split('\n')
-    content_start = 0
-    for i, line in enumerate(lines):
-        if re.match(r'^\d+\s*\(', line):  # First exercise starts
-            content_start = i
-            break
+def load_split_cache(cache_file):
+    """Load cached split results, or an empty cache if unavailable or stale."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("splitter_version") != SPLITTER_VERSION:
+        return {}
+    return cache.get("files") or {}
 
-    if content_start > 0:
-        content = '\n'.join(lines[content_start:])
 
-    # Pattern to match exercise numbers: "1 (30'). " or "1. " or "2 (40'). "
-    # Matches: digit(s), optional space, optional (time'), optional space, period or dot
-    exercise_pattern = r'^(\d+)\s*(?:\([^)]+\))?\s*\.?\s+'
+def save_split_cache(cache_file, files):
+    """Atomically write the split cache."""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"splitter_version": SPLITTER_VERSION, "files": files}, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
 
-    # Split by exercise numbers
-    parts = re.split(exercise_pattern, content, flags=re.MULTILINE)
 
-    # parts will be like: ['', '1', 'content1', '2', 'content2', '3', 'content3', ...]
-    # Skip the first empty element and process pairs
-    for i in range(1, len(parts), 2):
-        if i + 1 < len(parts):
-            exercise_num = parts[i].strip()
-            exercise_content = parts[i + 1].strip()
+def file_sha256(path):
+    """SHA-256 of a file's bytes."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-            # Remove trailing page numbers (single digit at the end)
-            exercise_content = re.sub(r'\n\d+\s*$', '', exercise_content)
 
-            # Skip if content is too short (likely parsing error)
-            if len(exercise_content) < 10:
-                continue
+def split_homeworks(md_files, workers=None, use_cache=True, cache_file=SPLIT_CACHE_FILE):
+    """
+    Split homework files into exercises, re-splitting only changed files.
+
+    Cache misses are split across a process pool. The result is ordered by
+    homework number, then exercise number (document order breaks ties), so
+    it does not depend on which files were cached or on scheduling.
+
+    Args:
+        md_files: Markdown files named like hwN.md
+        workers: Worker processes for cache misses (default: CPU count)
+        use_cache: Reuse and update the split cache (default True)
+        cache_file: Location of the split cache
+
+    Returns:
+        (homeworks, stats): (hw_number, [(exercise_number, content), ...])
+        pairs in dataset order, and counts of files and exercises
+    """
+    cached = load_split_cache(cache_file) if use_cache else {}
+    entries = {}
+    misses = []
+
+    for md_file in md_files:
+        hw_number = extract_homework_number(md_file.name)
+        if not hw_number:
+            print(f"Warning: Could not extract homework number from {md_file.name}")
+            continue
+
+        sha256 = file_sha256(md_file)
+        entry = cached.get(md_file.name)
+        if entry and entry.get("sha256") == sha256:
+            entries[md_file.name] = entry
+        else:
+            entries[md_file.name] = {"sha256": sha256}
+            misses.append(md_file)
+
+    if len(misses) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(misses) // (4 * (workers or os.cpu_count() or 1)))
+            results = pool.map(split_file, misses, chunksize=chunksize)
+            for md_file, pairs in zip(misses, results):
+                entries[md_file.name]["exercises"] = pairs
+    else:
+        for md_file in misses:
+            entries[md_file.name]["exercises"] = split_file(md_file)
+
+    if use_cache and (misses or entries.keys() != cached.keys()):
+        save_split_cache(cache_file, entries)
+
+    homeworks = []
+    for name in sorted(entries, key=lambda name: int(extract_homework_number(name))):
+        hw_number = extract_homework_number(name)
+        pairs = sorted(entries[name]["exercises"], key=lambda pair: int(pair[0]))
+        homeworks.append((hw_number, pairs))
+        print(f"hw{hw_number}: {len(pairs)} exercises")
+
+    stats = {
+        "files": len(entries),
+        "cached": len(entries) - len(misses),
+        "split": len(misses),
+        "exercises": sum(len(pairs) for _, pairs in homeworks)
+    }
+    return homeworks, stats
+
+
+def dedup_homeworks(homeworks, threshold=DEFAULT_THRESHOLD, keep_canonical=False,
+                    report_file=DUPLICATES_REPORT):
+    """
+    Find near-duplicate exercises across homeworks and report them.
 
-            # No sub-problem splitting, treat each exercise as a single unit
-            exercises.append({
-                "homework": f"hw{hw_number}",
-                "exercise_number": exercise_num,
-                "content": exercise_content.strip(),
-                "full_id": f"hw{hw_number}_ex{exercise_num}"
-            })
+    Args:
+        homeworks: split_homeworks() output
+        threshold: Minimum estimated Jaccard similarity of two exercises
+        keep_canonical: Drop every cluster member except the canonical one
+            (the first in dataset order)
+        report_file: Where the clusters are written
 
-    return exercises
+    Returns:
+        (homeworks, clusters): the homeworks, without duplicates if
+        keep_canonical, and the clusters found
+    """
+    clusters = find_duplicates(
+        ((exercise_record(hw_number, number, content)["full_id"], content)
+         for hw_number, pairs in homeworks
+         for number, content in pairs),
+        threshold
+    )
+
+    dropped = duplicate_ids(clusters) if keep_canonical else set()
+    if dropped:
+        homeworks = [
+            (hw_number, [(number, content) for number, content in pairs
+                         if f"hw{hw_number}_ex{number}" not in dropped])
+            for hw_number, pairs in homeworks
+        ]
+
+    write_report(report_file, clusters, threshold,
+                 exercises=sum(len(pairs) for _, pairs in homeworks) + len(dropped),
+                 dropped=len(dropped))
+    return homeworks, clusters
+
+
+def iter_exercise_records(homeworks):
+    """Yield dataset rows lazily from split_homeworks() output."""
+    for hw_number, pairs in homeworks:
+        for number, content in pairs:
+            yield exercise_record(hw_number, number, content)
+
+
+def create_benchmark(workers=None, use_cache=True, shard_size=DEFAULT_SHARD_SIZE,
+                     compression="zstd", metrics_textfile=None, dedup=True,
+                     dedup_threshold=DEFAULT_THRESHOLD, keep_canonical=False, index=True):
+    """
+    Create benchmark dataset from parsed PDFs.
 
+    Args:
+        workers: Worker processes for splitting changed files (default: CPU count)
+        use_cache: Reuse split results of unchanged files (default True)
+        shard_size: Maximum rows per Parquet shard
+        compression: Parquet compression codec, or "none"
+        metrics_textfile: Optional path of a Prometheus textfile to write
+            the run's metrics to
+        dedup: Detect near-duplicate exercises and write
+            benchmark_dataset/duplicates.json (default True)
+        dedup_threshold: Minimum estimated Jaccard similarity of duplicates
+        keep_canonical: Keep only the canonical exercise of each duplicate
+            cluster in the dataset (default False: report only)
+        index: Update the full-text search index of exercise content,
+            re-indexing only changed homeworks (default True)
+
+    Split and export timings are written to parsed_data/benchmark_report.json.
 
-def create_benchmark():
-    """Create benchmark dataset from parsed PDFs."""
+    Returns:
+        Export summary from dataset_writer.export_exercises, or None
+    """
 
     parsed_dir = Path("parsed_data")
 
@@ -98,84 +257,148 @@ def create_benchmark():
     print(f"Found {len(md_files)} homework files")
     print("="*60)
 
-    # Process all files
-    all_exercises = []
+    metrics.reset()
 
-    for md_file in md_files:
-        hw_number = extract_homework_number(md_file.name)
-        if not hw_number:
-            print(f"Warning: Could not extract homework number from {md_file.name}")
-            continue
-
-        # Read content
-        with open(md_file, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # Split into exercises
-        exercises = split_exercises(content, hw_number)
-        all_exercises.extend(exercises)
-
-        print(f"hw{hw_number}: {len(exercises)} exercises")
+    # Process all files, re-splitting only those that changed
+    with metrics.timer("split"):
+        homeworks, split_stats = split_homeworks(md_files, workers, use_cache)
+    metrics.count("files_split", split_stats["split"])
+    metrics.count("files_cached", split_stats["cached"])
 
     print(f"\n{'='*60}")
-    print(f"Total exercises extracted: {len(all_exercises)}")
+    print(f"Total exercises extracted: {split_stats['exercises']}")
+    print(f"Files split: {split_stats['split']}, reused from cache: {split_stats['cached']}")
 
-    if not all_exercises:
+    if not split_stats['exercises']:
         print("No exercises found. Check the parsing logic.")
         return
 
-    # Create output directory
+    # Near-duplicates across homeworks (re-issued homeworks, OCR re-runs)
+    if dedup:
+        with metrics.timer("dedup"):
+            homeworks, clusters = dedup_homeworks(homeworks, dedup_threshold, keep_canonical)
+        duplicates = len(duplicate_ids(clusters))
+        metrics.count("duplicate_clusters", len(clusters))
+        metrics.count("duplicates", duplicates)
+        action = "dropped" if keep_canonical else "kept, use --keep-canonical to drop them"
+        print(f"Near-duplicates: {duplicates} in {len(clusters)} cluster(s) ({action}), "
+              f"see {DUPLICATES_REPORT}")
+
+    # Stream every exercise once into JSON, JSONL, Parquet and the HF dataset
     output_dir = Path("benchmark_dataset")
-    output_dir.mkdir(exist_ok=True)
-
-    # Save as JSON
-    json_file = output_dir / "dataset.json"
-    with open(json_file, "w", encoding="utf-8") as f:
-        json.dump(all_exercises, f, indent=2, ensure_ascii=False)
-    print(f"\n✓ Saved to {json_file}")
-
-    # Save as JSONL
-    jsonl_file = output_dir / "dataset.jsonl"
-    with open(jsonl_file, "w", encoding="utf-8") as f:
-        for exercise in all_exercises:
-            f.write(json.dumps(exercise, ensure_ascii=False) + '\n')
-    print(f"✓ Saved to {jsonl_file}")
-
-    # Create HuggingFace dataset
-    df = pd.DataFrame(all_exercises)
-    dataset = Dataset.from_pandas(df)
-    dataset.save_to_disk(str(output_dir / "huggingface_dataset"))
-    print(f"✓ Saved to {output_dir / 'huggingface_dataset'}")
+    with metrics.timer("export"):
+        export = export_exercises(
+            iter_exercise_records(homeworks), output_dir, shard_size=shard_size,
+            compression=compression
+        )
+    metrics.count("exercises", export["rows"])
+    metrics.count("parquet_shards", len(export["parquet_files"]))
+    metrics.gauge("exercises_per_second", round(export["rows"] / metrics.elapsed(), 3))
+    if export["peak_rss_mb"] is not None:
+        metrics.gauge("peak_rss_mb", round(export["peak_rss_mb"], 1))
+    print(f"\n✓ Saved to {export['json_file']}")
+    print(f"✓ Saved to {export['jsonl_file']} (index: {export['index_file'].name})")
+    print(f"✓ Saved {len(export['parquet_files'])} Parquet shard(s) to {output_dir / 'parquet'}")
+    print(f"✓ Saved to {export['huggingface_dir']}")
+    if index:
+        with metrics.timer("index"):
+            index_stats = build_index(homeworks)
+        metrics.count("homeworks_indexed", index_stats["indexed"])
+        print(f"✓ Search index {INDEX_FILE}: {index_stats['indexed']} homework(s) indexed, "
+              f"{index_stats['unchanged']} unchanged, {index_stats['removed']} removed")
+    peak_rss = export['peak_rss_mb']
+    print(f"  Export time: {export['seconds']:.2f}s"
+          + (f", peak RSS: {peak_rss:.0f} MB" if peak_rss is not None else ""))
 
     # Print statistics
     print(f"\n{'='*60}")
     print("Dataset Statistics:")
-    print(f"  Total exercises: {len(all_exercises)}")
-    print(f"  Homeworks: {len(set(ex['homework'] for ex in all_exercises))}")
+    print(f"  Total exercises: {export['rows']}")
+    print(f"  Homeworks: {sum(1 for _, pairs in homeworks if pairs)}")
 
     # Print sample
-    if all_exercises:
-        print(f"\n{'='*60}")
-        print("Sample Exercise:")
-        sample = all_exercises[0]
-        print(f"  ID: {sample['full_id']}")
-        print(f"  Homework: {sample['homework']}")
-        print(f"  Exercise: {sample['exercise_number']}")
-        print(f"  Content preview: {sample['content'][:200]}...")
+    hw_number, pairs = next((hw, pairs) for hw, pairs in homeworks if pairs)
+    sample = exercise_record(hw_number, *pairs[0])
+    print(f"\n{'='*60}")
+    print("Sample Exercise:")
+    print(f"  ID: {sample['full_id']}")
+    print(f"  Homework: {sample['homework']}")
+    print(f"  Exercise: {sample['exercise_number']}")
+    print(f"  Content preview: {sample['content'][:200]}...")
 
     # Print breakdown by homework
     print(f"\n{'='*60}")
     print("Breakdown by Homework:")
-    hw_counts = {}
-    for ex in all_exercises:
-        hw = ex['homework']
-        hw_counts[hw] = hw_counts.get(hw, 0) + 1
-
-    for hw in sorted(hw_counts.keys(), key=lambda x: int(x[2:])):
-        print(f"  {hw}: {hw_counts[hw]} exercises")
-
-    return dataset
+    for hw_number, pairs in homeworks:
+        if pairs:
+            print(f"  hw{hw_number}: {len(pairs)} exercises")
+
+    # Run report
+    summary = metrics.summary()
+    print()
+    print_summary(summary)
+    report_file = parsed_dir / "benchmark_report.json"
+    params = {"splitter_version": SPLITTER_VERSION, "shard_size": shard_size,
+              "compression": compression, "dedup": dedup, "dedup_threshold": dedup_threshold,
+              "keep_canonical": keep_canonical, "index": index}
+    write_json_report(report_file, {"job": "benchmark", "params": params, **summary})
+    print(f"Run report saved to: {report_file}")
+    if metrics_textfile:
+        write_prometheus_textfile(Path(metrics_textfile), summary, "benchmark")
+        print(f"Prometheus metrics written to: {metrics_textfile}")
+
+    return export
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create the benchmark dataset from parsed_data/hw*.md."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes for splitting changed files (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Re-split every file instead of reusing cached results"
+    )
+    parser.add_argument(
+        "--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+        help="Maximum rows per Parquet shard (default %(default)s)"
+    )
+    parser.add_argument(
+        "--compression", choices=COMPRESSIONS, default="zstd",
+        help="Parquet compression codec (default %(default)s)"
+    )
+    parser.add_argument(
+        "--metrics-textfile", type=Path, default=None,
+        help="Also write run metrics in Prometheus textfile format to this path"
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="Skip near-duplicate detection"
+    )
+    parser.add_argument(
+        "--dedup-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Minimum estimated Jaccard similarity of near-duplicates (default %(default)s)"
+    )
+    parser.add_argument(
+        "--keep-canonical", action="store_true",
+        help="Keep only the first exercise of each near-duplicate cluster"
+    )
+    parser.add_argument(
+        "--no-index", action="store_true",
+        help="Do not update the full-text search index"
+    )
+    args = parser.parse_args()
+
+    create_benchmark(
+        workers=args.workers, use_cache=not args.no_cache, shard_size=args.shard_size,
+        compression=args.compression, metrics_textfile=args.metrics_textfile,
+        dedup=not args.no_dedup, dedup_threshold=args.dedup_threshold,
+        keep_canonical=args.keep_canonical, index=not args.no_index
+    )
 
 
 if __name__ == "__main__":
-    create_benchmark()
+    main()
@@ -0,0 +1,182 @@
+"""
+Random-access reader for benchmark_dataset/dataset.jsonl.
+
+create_benchmark.py writes a sidecar offset index next to the JSONL file
+(`dataset.jsonl.index.json`, full_id -> byte offset and length). The reader
+memory-maps the JSONL file and parses only the rows that are asked for, so
+looking up one exercise, one homework or a slice does not read the rest of
+the dataset.
+
+Usage:
+    from dataset_reader import DatasetReader
+
+    with DatasetReader() as dataset:
+        exercise = dataset.get("hw3_ex2")
+        for exercise in dataset.shard(worker_index, worker_count):
+            ...
+"""
+
+import os
+import json
+import mmap
+from pathlib import Path
+
+DEFAULT_DATASET = Path("benchmark_dataset/dataset.jsonl")
+INDEX_VERSION = 1
+
+
+def index_path_for(jsonl_path):
+    """Location of the sidecar index of a JSONL file."""
+    jsonl_path = Path(jsonl_path)
+    return jsonl_path.with_name(jsonl_path.name + ".index.json")
+
+
+def source_fingerprint(jsonl_path):
+    """Size and mtime of the JSONL file, used to detect a stale index."""
+    stat = Path(jsonl_path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_index(jsonl_path, rows):
+    """
+    Atomically write the sidecar index of a JSONL file.
+
+    Args:
+        jsonl_path: The indexed JSONL file (must be complete)
+        rows: [full_id, homework, offset, length] per line, in file order
+    """
+    index_path = index_path_for(jsonl_path)
+    tmp_file = index_path.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "source": source_fingerprint(jsonl_path),
+            "fields": ["full_id", "homework", "offset", "length"],
+            "rows": rows
+        }, f, ensure_ascii=False)
+    os.replace(tmp_file, index_path)
+
+
+def build_index(jsonl_path):
+    """Scan a JSONL file once and write its index; returns the index rows."""
+    rows = []
+    offset = 0
+    with open(jsonl_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                exercise = json.loads(line)
+                rows.append([exercise["full_id"], exercise["homework"], offset, len(line)])
+            offset += len(line)
+    write_index(jsonl_path, rows)
+    return rows
+
+
+def load_index(jsonl_path):
+    """Load the index of a JSONL file, rebuilding it if missing or stale."""
+    try:
+        with open(index_path_for(jsonl_path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return build_index(jsonl_path)
+
+    if index.get("version") != INDEX_VERSION \
+            or index.get("source") != source_fingerprint(jsonl_path):
+        return build_index(jsonl_path)
+    return index["rows"]
+
+
+class DatasetReader:
+    """
+    Lazy, memory-mapped view of a benchmark JSONL file.
+
+    Rows are parsed on access; nothing but the offset index is kept in
+    memory. Supports len(), integer and slice indexing, iteration, lookup
+    by full_id and by homework, and contiguous shards for parallel workers.
+    """
+
+    def __init__(self, path=DEFAULT_DATASET):
+        """
+        Args:
+            path: JSONL dataset written by create_benchmark.py
+        """
+        self.path = Path(path)
+        rows = load_index(self.path)
+        self._offsets = [(offset, length) for _, _, offset, length in rows]
+        self._positions = {}
+        self._homeworks = {}
+        for position, (full_id, homework, _, _) in enumerate(rows):
+            self._positions.setdefault(full_id, position)
+            self._homeworks.setdefault(homework, []).append(position)
+
+        self._file = open(self.path, "rb")
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if self._offsets else None
+
+    def _row(self, position):
+        offset, length = self._offsets[position]
+        return json.loads(self._map[offset:offset + length])
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, key):
+        """Row by position; a slice returns a list of just those rows."""
+        if isinstance(key, slice):
+            return [self._row(position) for position in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("dataset index out of range")
+        return self._row(key)
+
+    def __iter__(self):
+        """Stream every row in file order."""
+        for position in range(len(self)):
+            yield self._row(position)
+
+    def __contains__(self, full_id):
+        return full_id in self._positions
+
+    def ids(self):
+        """All full_ids, in file order."""
+        return list(self._positions)
+
+    def homeworks(self):
+        """All homework names, in file order."""
+        return list(self._homeworks)
+
+    def get(self, full_id, default=None):
+        """Row with this full_id (the first one if repeated), or `default`."""
+        position = self._positions.get(full_id)
+        return default if position is None else self._row(position)
+
+    def homework(self, homework):
+        """Rows of one homework (e.g. "hw3"), in file order."""
+        return [self._row(position) for position in self._homeworks.get(homework, ())]
+
+    def shard(self, index, count):
+        """
+        Stream the `index`-th of `count` contiguous, near-equal shards.
+
+        Args:
+            index: Shard number, 0 <= index < count
+            count: Total number of shards (e.g. evaluation workers)
+        """
+        if not 0 <= index < count:
+            raise ValueError(f"shard index {index} out of range for {count} shards")
+        start = len(self) * index // count
+        end = len(self) * (index + 1) // count
+        for position in range(start, end):
+            yield self._row(position)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
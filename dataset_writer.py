@@ -0,0 +1,270 @@
+"""
+Streaming export of benchmark exercises.
+
+Exercises are consumed once, as an iterator, and written at the same time
+to dataset.json, dataset.jsonl (with its offset index, see
+dataset_reader.py) and sharded Parquet files; the HuggingFace
+dataset is then built from the Parquet shards. Only the current row batch
+is held in memory, whatever the size of the corpus.
+
+Everything is written to a staging directory first and then renamed over
+the previous outputs, so readers never see a half-written export.
+"""
+
+import os
+import json
+import time
+import shutil
+import sys
+from pathlib import Path
+from dataset_reader import index_path_for, write_index
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Columns of every output format (all strings)
+COLUMNS = ("homework", "exercise_number", "content", "full_id")
+
+
+def arrow_schema():
+    """Arrow schema of the Parquet shards (pyarrow is imported on first use)."""
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.string()) for name in COLUMNS])
+
+DEFAULT_SHARD_SIZE = 100_000
+DEFAULT_ROW_GROUP_SIZE = 10_000
+COMPRESSIONS = ("zstd", "snappy", "gzip", "brotli", "lz4", "none")
+
+
+class JSONArrayWriter:
+    """
+    Write a JSON array one element at a time.
+
+    The output is byte-for-byte what `json.dump(items, f, indent=2,
+    ensure_ascii=False)` produces for the whole list.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, item):
+        encoded = json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.file.write(("[\n  " if self.count == 0 else ",\n  ") + encoded)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+
+
+class JSONLWriter:
+    """Write one JSON object per line, and the sidecar offset index."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(path, "wb")
+        self.index = []
+        self.offset = 0
+
+    def write(self, item):
+        line = (json.dumps(item, ensure_ascii=False) + '\n').encode("utf-8")
+        self.file.write(line)
+        self.index.append([item["full_id"], item["homework"], self.offset, len(line)])
+        self.offset += len(line)
+
+    def close(self):
+        self.file.close()
+        write_index(self.path, self.index)
+
+
+class ParquetShardWriter:
+    """
+    Write rows to Parquet files of at most `shard_size` rows each.
+
+    Shards are named like HuggingFace's data files,
+    `train-00000-of-00003.parquet`; the total is only known at the end, so
+    shards are renamed when the writer is closed.
+    """
+
+    def __init__(self, output_dir, shard_size=DEFAULT_SHARD_SIZE, compression="zstd",
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE, split="train"):
+        """
+        Args:
+            output_dir: Directory for the shards (stale shards are removed)
+            shard_size: Maximum rows per shard
+            compression: Parquet codec, or "none"
+            row_group_size: Rows buffered before a row group is written
+            split: Split name used in shard file names
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.output_dir.glob(f"{split}-*.parquet*"):
+            stale.unlink()
+
+        self.shard_size = shard_size
+        self.compression = None if compression == "none" else compression
+        self.row_group_size = min(row_group_size, shard_size)
+        self.split = split
+        self.paths = []
+        self.rows = 0
+        self._writer = None
+        self._shard_rows = 0
+        self._batch = {name: [] for name in COLUMNS}
+
+    def write(self, item):
+        for name, column in self._batch.items():
+            column.append(item[name])
+        if len(self._batch["full_id"]) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        """Write the buffered rows, splitting them across shard boundaries."""
+        import pyarrow as pa
+
+        offset = 0
+        pending = len(self._batch["full_id"])
+        while offset < pending:
+            if self._writer is None or self._shard_rows >= self.shard_size:
+                self._open_shard()
+            take = min(pending - offset, self.shard_size - self._shard_rows)
+            table = pa.Table.from_pydict(
+                {name: column[offset:offset + take] for name, column in self._batch.items()},
+                schema=self._writer.schema
+            )
+            self._writer.write_table(table)
+            self._shard_rows += take
+            self.rows += take
+            offset += take
+        self._batch = {name: [] for name in COLUMNS}
+
+    def _open_shard(self):
+        import pyarrow.parquet as pq
+
+        if self._writer is not None:
+            self._writer.close()
+        path = self.output_dir / f"{self.split}-{len(self.paths):05d}.parquet.tmp"
+        self._writer = pq.ParquetWriter(path, arrow_schema(), compression=self.compression)
+        self._shard_rows = 0
+        self.paths.append(path)
+
+    def close(self):
+        """Flush, close the last shard and give shards their final names."""
+        self._flush()
+        if self._writer is None:
+            self._open_shard()  # keep an empty shard so the dataset has a schema
+        self._writer.close()
+
+        total = len(self.paths)
+        final_paths = []
+        for index, path in enumerate(self.paths):
+            final = self.output_dir / f"{self.split}-{index:05d}-of-{total:05d}.parquet"
+            os.replace(path, final)
+            final_paths.append(final)
+        self.paths = final_paths
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def swap_into_place(staged, final):
+    """
+    Move a staged file or directory over `final`.
+
+    Files are replaced in one atomic rename. A directory is swapped with two
+    renames (old out of the way, new into place), so readers see either
+    the complete old or the complete new directory except for the instant
+    in between.
+    """
+    staged, final = Path(staged), Path(final)
+    if not staged.is_dir():
+        os.replace(staged, final)
+        return
+
+    old = final.with_name(f".{final.name}.old")
+    if old.exists():
+        shutil.rmtree(old)
+    if final.exists():
+        os.replace(final, old)
+    os.replace(staged, final)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def export_exercises(exercises, output_dir, shard_size=DEFAULT_SHARD_SIZE, compression="zstd",
+                     huggingface=True):
+    """
+    Stream exercises into every output format in a single pass.
+
+    Args:
+        exercises: Iterable of exercise dicts (consumed once)
+        output_dir: Destination directory, e.g. benchmark_dataset/
+        shard_size: Maximum rows per Parquet shard
+        compression: Parquet codec, or "none"
+        huggingface: Also build huggingface_dataset/ from the Parquet shards
+
+    The outputs are built in output_dir/.staging and swapped into place
+    once all of them are complete (see swap_into_place()).
+
+    Returns:
+        Dict with the row count, output paths, export time and peak RSS
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+    staging_dir = output_dir / ".staging"
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir()
+    start = time.perf_counter()
+
+    writers = [
+        JSONArrayWriter(staging_dir / "dataset.json"),
+        JSONLWriter(staging_dir / "dataset.jsonl"),
+        ParquetShardWriter(staging_dir / "parquet", shard_size, compression),
+    ]
+    try:
+        for exercise in exercises:
+            for writer in writers:
+                writer.write(exercise)
+    finally:
+        for writer in writers:
+            writer.close()
+
+    outputs = ["parquet", index_path_for("dataset.jsonl").name, "dataset.jsonl", "dataset.json"]
+    if huggingface:
+        from datasets import Dataset
+
+        # Build the Arrow cache inside the staging dir, so it is removed with it
+        # instead of piling up in ~/.cache/huggingface on every export
+        dataset = Dataset.from_parquet(
+            [str(path) for path in writers[2].paths], cache_dir=str(staging_dir / "hf_cache")
+        )
+        dataset.save_to_disk(str(staging_dir / "huggingface_dataset"))
+        del dataset
+        outputs.insert(1, "huggingface_dataset")
+
+    for name in outputs:
+        swap_into_place(staging_dir / name, output_dir / name)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    result = {
+        "rows": writers[2].rows,
+        "json_file": output_dir / "dataset.json",
+        "jsonl_file": output_dir / "dataset.jsonl",
+        "index_file": index_path_for(output_dir / "dataset.jsonl"),
+        "parquet_files": [output_dir / "parquet" / path.name for path in writers[2].paths],
+    }
+    if huggingface:
+        result["huggingface_dir"] = output_dir / "huggingface_dataset"
+
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
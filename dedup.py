@@ -0,0 +1,227 @@
+"""
+Near-duplicate exercise detection with MinHash and LSH.
+
+Re-issued homeworks and OCR re-runs produce near-identical exercises
+across hw*.md files. Each exercise is reduced to a MinHash signature of
+its character shingles. Signatures are bucketed by LSH bands, so an
+exercise is only compared with earlier canonical exercises sharing a band,
+in roughly linear time rather than pairwise. An exercise whose estimated
+Jaccard similarity to one of them reaches the threshold joins that
+cluster; the first exercise of a cluster in dataset order is its canonical
+one.
+
+Usage:
+    python dedup.py [benchmark_dataset/dataset.jsonl] [--threshold 0.8] [--report FILE]
+"""
+
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+
+# Character shingles work for both English and Chinese text and tolerate
+# OCR differences that break word boundaries
+SHINGLE_SIZE = 5
+
+DEDUP_VERSION = 1
+
+# Multiplier of the polynomial rolling hash over shingle code points
+_SHINGLE_BASE = 1_000_003
+_WHITESPACE = re.compile(r"\s+")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Hash the character shingles of whitespace- and case-normalized text.
+
+    Shingles are hashed together with a rolling polynomial hash over the
+    text's code points, vectorized with numpy.
+
+    Returns:
+        Sorted uint64 array of distinct shingle hashes (a single shingle for
+        texts shorter than `size`)
+    """
+    import numpy as np
+
+    text = _WHITESPACE.sub(" ", text).strip().lower()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = max(1, len(codes) - size + 1)
+    hashes = np.zeros(count, dtype=np.uint64)
+    base = np.uint64(_SHINGLE_BASE)
+    for offset in range(min(size, len(codes))):
+        hashes = hashes * base + codes[offset:offset + count]
+    return np.unique(hashes)
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` multiply-shift hash functions."""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        import numpy as np
+
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        # Odd multipliers, as multiply-shift hashing requires
+        self._a = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * 2 + 1
+        self._b = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """MinHash signature of `text` as a uint32 array of length num_perm."""
+        import numpy as np
+
+        # (a * x + b) mod 2^64, keeping the high 32 bits
+        hashed = (np.outer(shingles(text), self._a) + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+def _collision_probability(similarity, bands, rows):
+    """Probability that two items with this Jaccard similarity share a band."""
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def lsh_params(threshold, num_perm=DEFAULT_NUM_PERM, steps=100):
+    """
+    Choose (bands, rows) for a similarity threshold.
+
+    Minimizes the sum of the false positive area below the threshold and
+    the false negative area above it, with bands * rows <= num_perm.
+    """
+    best, best_error = None, None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        false_positive = sum(
+            _collision_probability(threshold * i / steps, bands, rows) for i in range(steps)
+        ) * threshold / steps
+        false_negative = sum(
+            1 - _collision_probability(threshold + (1 - threshold) * i / steps, bands, rows)
+            for i in range(steps)
+        ) * (1 - threshold) / steps
+        error = false_positive + false_negative
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def find_duplicates(items, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, seed=1):
+    """
+    Cluster near-duplicate texts.
+
+    Items are processed in order. Each is compared only with the canonical
+    items that share an LSH bucket with it, and joins the most similar one
+    that reaches the threshold; otherwise it becomes a new canonical item.
+    Every member is therefore within the threshold of its canonical item
+    (no chaining through intermediate members), and only canonical items
+    are indexed, so large groups of copies stay cheap.
+
+    Args:
+        items: Iterable of (id, text) in dataset order
+        threshold: Minimum estimated Jaccard similarity of shingle sets
+        num_perm: MinHash signature length
+        seed: Seed of the hash functions
+
+    Returns:
+        List of clusters with at least two members, in dataset order. Each is
+        a dict with the "canonical" id (the first member), all "members"
+        and each other member's estimated "similarity" to the canonical one
+    """
+    import numpy as np
+
+    hasher = MinHasher(num_perm, seed)
+    bands, rows = lsh_params(threshold, num_perm)
+    buckets = [{} for _ in range(bands)]
+    canonical_signatures = []
+    clusters = []
+
+    for item_id, text in items:
+        signature = hasher.signature(text)
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+
+        candidates = {c for band, key in enumerate(keys) for c in buckets[band].get(key, ())}
+        best, best_similarity = None, threshold
+        for c in sorted(candidates):
+            similarity = float(np.count_nonzero(canonical_signatures[c] == signature)) / num_perm
+            if similarity > best_similarity or (similarity == best_similarity and best is None):
+                best, best_similarity = c, similarity
+
+        if best is not None:
+            clusters[best]["members"].append(item_id)
+            clusters[best]["similarity"][item_id] = round(best_similarity, 3)
+            continue
+
+        index = len(clusters)
+        clusters.append({"canonical": item_id, "members": [item_id], "similarity": {}})
+        canonical_signatures.append(signature)
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(index)
+
+    return [cluster for cluster in clusters if len(cluster["members"]) > 1]
+
+
+def duplicate_ids(clusters):
+    """Ids of every non-canonical cluster member."""
+    return {
+        member
+        for cluster in clusters
+        for member in cluster["members"]
+        if member != cluster["canonical"]
+    }
+
+
+def write_report(report_file, clusters, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                 exercises=None, dropped=0):
+    """Atomically write the duplicate clusters as JSON."""
+    report_file = Path(report_file)
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "dedup_version": DEDUP_VERSION,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "shingle_size": SHINGLE_SIZE,
+        "exercises": exercises,
+        "clusters": len(clusters),
+        "duplicates": len(duplicate_ids(clusters)),
+        "dropped": dropped,
+        "groups": clusters,
+    }
+    tmp_file = report_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, report_file)
+
+
+def main():
+    from dataset_reader import DEFAULT_DATASET, DatasetReader
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate exercises in the dataset.")
+    parser.add_argument("dataset", nargs="?", type=Path, default=DEFAULT_DATASET,
+                        help="dataset.jsonl to scan (default %(default)s)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity (default %(default)s)")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM,
+                        help="MinHash signature length (default %(default)s)")
+    parser.add_argument("--report", type=Path, default=None, help="Write the clusters to this file")
+    args = parser.parse_args()
+
+    with DatasetReader(args.dataset) as dataset:
+        clusters = find_duplicates(
+            ((row["full_id"], row["content"]) for row in dataset), args.threshold, args.num_perm
+        )
+        exercises = len(dataset)
+
+    for cluster in clusters:
+        others = ", ".join(f"{member} ({cluster['similarity'][member]:.2f})"
+                           for member in cluster["members"][1:])
+        print(f"{cluster['canonical']}: {others}")
+    print(f"\n{len(clusters)} cluster(s), {len(duplicate_ids(clusters))} duplicate(s) "
+          f"among {exercises} exercises")
+    if args.report:
+        write_report(args.report, clusters, args.threshold, args.num_perm, exercises)
+        print(f"Report saved to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+"""
+Evaluate a model on the benchmark through an OpenAI-compatible API.
+
+Exercises are streamed from benchmark_dataset/dataset.jsonl (through
+DatasetReader, so the dataset is never loaded whole) and sent with asyncio
+over a pooled aiohttp session. At most `--concurrency` requests are in
+flight; with the completions API, `--batch-size` prompts go in one request.
+
+Responses are cached on disk by (model, prompt, generation parameters), so
+re-running an evaluation only calls the API for new prompts. Results are
+appended to eval_results/<model>.jsonl as they complete; an interrupted
+run resumes from that file and only sends exercises that have no result
+yet (or failed). Each result records its latency and tokens/sec, and the
+run report (latency percentiles, throughput) is written next to it.
+
+Usage:
+    python evaluate.py --model MODEL [--base-url URL] [--concurrency 16] [--batch-size 1]
+        [--api chat|completions] [--homework hw3] [--limit N] [--no-cache] [--no-resume]
+
+Environment:
+    OPENAI_API_KEY: API key (optional for local servers)
+    OPENAI_BASE_URL: Default for --base-url
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+from dataset_reader import DEFAULT_DATASET, DatasetReader
+from ocr_cache import OCRCache
+from perf import metrics, print_summary, write_json_report, write_prometheus_textfile
+
+load_dotenv()
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RESULTS_DIR = Path("eval_results")
+
+# Responses are kept for resumption and reruns, so the cap is generous
+RESPONSE_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+SYSTEM_PROMPT = (
+    "You are an expert in formal languages, automata and computability theory. "
+    "Solve the exercise rigorously and give a complete proof or construction."
+)
+PROMPT_TEMPLATE = "Exercise {full_id}:\n\n{content}"
+
+
+class EvalError(Exception):
+    """Raised when the model API returns an unusable response."""
+
+
+class RetryableError(EvalError):
+    """Raised on responses worth retrying (429, 5xx, timeouts)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def build_prompt(exercise):
+    """User prompt for one exercise."""
+    return PROMPT_TEMPLATE.format(full_id=exercise["full_id"], content=exercise["content"])
+
+
+def response_key(model, prompt, params):
+    """Cache key of a response: model, system and user prompt, and generation parameters."""
+    payload = json.dumps(
+        {"model": model, "system": SYSTEM_PROMPT, "prompt": prompt, "params": params},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def results_path(model, output_dir=RESULTS_DIR):
+    """Results file of a model, e.g. eval_results/gpt-4o-mini.jsonl."""
+    return Path(output_dir) / (re.sub(r"[^\w.-]+", "_", model) + ".jsonl")
+
+
+def load_done(results_file):
+    """
+    Scan a results file left by an earlier run.
+
+    Returns:
+        Set of full_ids that already have a successful result; a truncated
+        last line (from an interrupted run) is ignored
+    """
+    done = set()
+    try:
+        with open(results_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "error" in record:
+                    done.discard(record["full_id"])
+                else:
+                    done.add(record["full_id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+class CompletionClient:
+    """
+    Async client for OpenAI-compatible chat/completions endpoints.
+
+    Uses one pooled aiohttp session (connection limit = concurrency) and
+    retries 429, 5xx and timeouts with full-jitter exponential backoff.
+    """
+
+    def __init__(self, base_url, model, api_key=None, api="chat", max_tokens=1024,
+                 temperature=0.0, timeout=300, max_retries=4, backoff_base=0.5,
+                 backoff_max=30.0, concurrency=16):
+        """
+        Args:
+            base_url: API root, e.g. https://api.openai.com/v1
+            model: Model name sent with every request
+            api_key: Bearer token (optional for local servers)
+            api: "chat" (one prompt per request) or "completions" (batches)
+            max_tokens: Generation limit per prompt
+            temperature: Sampling temperature
+            timeout: Total timeout per request, in seconds
+            max_retries: Retries after the first attempt on transient errors
+            backoff_base: Base delay of the exponential backoff, in seconds
+            backoff_max: Upper bound of a single backoff delay, in seconds
+            concurrency: Connections kept open to the server
+        """
+        self.url = base_url.rstrip("/") + ("/chat/completions" if api == "chat" else "/completions")
+        self.model = model
+        self.api_key = api_key
+        self.api = api
+        self.params = {"max_tokens": max_tokens, "temperature": temperature}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrency = concurrency
+        self.session = None
+        self.requests_sent = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    async def __aenter__(self):
+        import aiohttp
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self.session = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After if given."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _payload(self, prompts):
+        if self.api == "chat":
+            messages = [{"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompts[0]}]
+            return {"model": self.model, "messages": messages, **self.params}
+        prompts = [f"{SYSTEM_PROMPT}\n\n{prompt}\n\nSolution:" for prompt in prompts]
+        return {"model": self.model, "prompt": prompts, **self.params}
+
+    async def _post(self, prompts):
+        """Send one request and return (texts, usage) or raise."""
+        import aiohttp
+
+        self.requests_sent += 1
+        try:
+            async with self.session.post(self.url, json=self._payload(prompts)) as response:
+                if response.status == 429:
+                    self.rate_limited += 1
+                    retry_after = response.headers.get("Retry-After")
+                    raise RetryableError(
+                        "HTTP 429 Too Many Requests",
+                        float(retry_after) if retry_after and retry_after.isdigit() else None
+                    )
+                if response.status >= 500:
+                    raise RetryableError(f"HTTP {response.status}")
+                if response.status >= 400:
+                    raise EvalError(f"HTTP {response.status}: {await response.text()}")
+                body = await response.json()
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}") from e
+        except (aiohttp.ContentTypeError, ValueError) as e:
+            # A non-JSON (e.g. HTML error page) or undecodable 2xx body
+            raise EvalError(f"invalid response body: {type(e).__name__}: {e}") from e
+
+        try:
+            choices = sorted(body.get("choices") or [], key=lambda choice: choice.get("index", 0))
+            if len(choices) != len(prompts):
+                raise EvalError(f"expected {len(prompts)} choice(s), got {len(choices)}")
+            if self.api == "chat":
+                texts = [choice["message"]["content"] for choice in choices]
+            else:
+                texts = [choice["text"] for choice in choices]
+            usage = body.get("usage") or {}
+            if not isinstance(usage, dict):
+                raise TypeError(f"usage is {type(usage).__name__}, not an object")
+        except (AttributeError, KeyError, TypeError) as e:
+            raise EvalError(f"malformed response: {type(e).__name__}: {e}") from e
+        return texts, usage
+
+    async def complete(self, prompts):
+        """
+        Complete a batch of prompts (a single prompt with the chat API).
+
+        Returns:
+            (texts, usage): one completion per prompt, and the request's
+            token usage as reported by the server
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._post(prompts)
+            except RetryableError as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, e.retry_after))
+
+    def stats(self):
+        """Return request counters."""
+        return {
+            "requests": self.requests_sent,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited
+        }
+
+
+def iter_exercises(dataset, done=(), homework=None, limit=None):
+    """Yield exercises still to evaluate, in dataset order."""
+    rows = dataset.homework(homework) if homework else dataset
+    count = 0
+    for exercise in rows:
+        if limit is not None and count >= limit:
+            return
+        count += 1
+        if exercise["full_id"] not in done:
+            yield exercise
+
+
+async def run_evaluation(client, exercises, results_file, cache=None, batch_size=1):
+    """
+    Send exercises through `client` and append results as they complete.
+
+    A producer fills a bounded queue with batches while `client.concurrency`
+    workers send them, so memory stays bounded however large the dataset.
+    Cached responses are written without a request. Cache reads and writes
+    run in the default executor, so SQLite I/O does not block the event loop.
+
+    Returns:
+        Dict of item counts: "done", "cached" and "failed"
+    """
+    counts = {"done": 0, "cached": 0, "failed": 0}
+    queue = asyncio.Queue(maxsize=2 * client.concurrency)
+    batch_size = batch_size if client.api == "completions" else 1
+    loop = asyncio.get_running_loop()
+
+    with open(results_file, "a", encoding="utf-8") as out:
+
+        def write(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts["failed" if "error" in record else "done"] += 1
+
+        async def produce():
+            batch = []
+            for exercise in exercises:
+                prompt = build_prompt(exercise)
+                key = response_key(client.model, prompt, {"api": client.api, **client.params})
+                cached = None
+                if cache is not None:
+                    cached = await loop.run_in_executor(None, cache.get, key)
+                if cached is not None:
+                    write({**json.loads(cached), "full_id": exercise["full_id"], "cached": True})
+                    counts["cached"] += 1
+                    continue
+                batch.append((exercise, prompt, key))
+                if len(batch) == batch_size:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
+            for _ in range(client.concurrency):
+                await queue.put(None)
+
+        async def work():
+            while (batch := await queue.get()) is not None:
+                started = time.perf_counter()
+                try:
+                    texts, usage = await client.complete([prompt for _, prompt, _ in batch])
+                except EvalError as e:
+                    for exercise, _, _ in batch:
+                        write({"full_id": exercise["full_id"], "model": client.model,
+                               "error": f"{type(e).__name__}: {e}"})
+                    continue
+                latency = time.perf_counter() - started
+                metrics.observe("request", latency)
+
+                # Batched requests report usage for the whole batch
+                completion_tokens = usage.get("completion_tokens", 0) / len(batch)
+                prompt_tokens = usage.get("prompt_tokens", 0) / len(batch)
+                metrics.count("completion_tokens", usage.get("completion_tokens", 0))
+                metrics.count("prompt_tokens", usage.get("prompt_tokens", 0))
+                for (exercise, _, key), text in zip(batch, texts):
+                    record = {
+                        "full_id": exercise["full_id"],
+                        "model": client.model,
+                        "response": text,
+                        "latency": round(latency, 3),
+                        "prompt_tokens": round(prompt_tokens),
+                        "completion_tokens": round(completion_tokens),
+                        "tokens_per_second": round(completion_tokens * len(batch) / latency, 1),
+                    }
+                    if len(batch) > 1:
+                        record["batch_size"] = len(batch)
+                    if cache is not None:
+                        await loop.run_in_executor(None, cache.put, key, json.dumps(
+                            {k: v for k, v in record.items() if k != "full_id"}, ensure_ascii=False
+                        ))
+                    write(record)
+
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(work()) for _ in range(client.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return counts
+
+
+def evaluate(model, base_url=None, api_key=None, dataset=DEFAULT_DATASET, output_dir=RESULTS_DIR,
+             concurrency=16, batch_size=1, api="chat", homework=None, limit=None, use_cache=True,
+             resume=True, max_tokens=1024, temperature=0.0, timeout=300, max_retries=4,
+             metrics_textfile=None):
+    """
+    Evaluate a model on the benchmark dataset.
+
+    Args:
+        model: Model name
+        base_url: API root (default: OPENAI_BASE_URL or the OpenAI API)
+        api_key: API key (default: OPENAI_API_KEY)
+        dataset: dataset.jsonl written by create_benchmark.py
+        output_dir: Where <model>.jsonl and <model>.report.json are written
+        concurrency: Requests in flight at once
+        batch_size: Prompts per request with api="completions"
+        api: "chat" or "completions"
+        homework: Only evaluate this homework, e.g. "hw3"
+        limit: Only evaluate the first N selected exercises
+        use_cache: Reuse cached responses for identical prompts (default True)
+        resume: Keep earlier results and skip their exercises (default True)
+        max_tokens, temperature: Generation parameters
+        timeout: Total timeout per request, in seconds
+        max_retries: Retries on 429, 5xx and timeouts
+        metrics_textfile: Optional path of a Prometheus textfile
+
+    Returns:
+        Run report dict, or None if the dataset is missing
+    """
+    if not Path(dataset).exists():
+        print(f"Error: {dataset} not found. Run create_benchmark.py first.")
+        return
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_file = results_path(model, output_dir)
+    if not resume and results_file.exists():
+        results_file.unlink()
+    done = load_done(results_file)
+
+    cache = None
+    if use_cache:
+        cache = OCRCache(output_dir / ".cache", RESPONSE_CACHE_MAX_BYTES, filename="responses.sqlite")
+
+    client = CompletionClient(
+        base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL, model,
+        api_key=api_key or os.getenv("OPENAI_API_KEY"), api=api, max_tokens=max_tokens,
+        temperature=temperature, timeout=timeout, max_retries=max_retries,
+        concurrency=concurrency
+    )
+
+    print(f"Evaluating {model} at {client.url}")
+    if done:
+        print(f"Resuming: {len(done)} exercise(s) already evaluated")
+
+    metrics.reset()
+
+    async def main():
+        async with client:
+            return await run_evaluation(
+                client, iter_exercises(reader, done, homework, limit), results_file, cache, batch_size
+            )
+
+    with DatasetReader(dataset) as reader:
+        try:
+            counts = asyncio.run(main())
+        except KeyboardInterrupt:
+            print(f"\nInterrupted; rerun to resume from {results_file}")
+            raise
+        finally:
+            if cache is not None:
+                cache.close()
+
+    for name, value in {**counts, **client.stats()}.items():
+        metrics.count(name, value)
+    summary = metrics.summary()
+    completion_tokens = summary["counters"].get("completion_tokens", 0)
+    metrics.gauge("tokens_per_second", round(completion_tokens / summary["wall_time"], 1))
+    metrics.gauge("items_per_second",
+                  round((counts["done"] + counts["failed"]) / summary["wall_time"], 2))
+    summary = metrics.summary()
+
+    print(f"\n{'='*60}")
+    print("Evaluation complete!")
+    print(f"Evaluated: {counts['done'] - counts['cached']} (+{counts['cached']} from cache), "
+          f"failed: {counts['failed']}, skipped (already done): {len(done)}")
+    print(f"Requests: {client.requests_sent} ({client.retries} retries, "
+          f"{client.rate_limited} rate limited)")
+    print(f"Throughput: {summary['gauges']['items_per_second']} items/s, "
+          f"{summary['gauges']['tokens_per_second']} completion tokens/s")
+    print_summary(summary)
+
+    report = {"job": "evaluate", "model": model, "params": {
+        "api": api, "concurrency": concurrency, "batch_size": batch_size, **client.params
+    }, **summary}
+    report_file = results_file.with_suffix(".report.json")
+    write_json_report(report_file, report)
+    print(f"Results: {results_file}")
+    print(f"Run report saved to: {report_file}")
+    if metrics_textfile:
+        write_prometheus_textfile(Path(metrics_textfile), summary, "evaluate")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a model on the benchmark through an OpenAI-compatible API."
+    )
+    parser.add_argument("--model", required=True, help="Model name")
+    parser.add_argument("--base-url", default=None,
+                        help="API root (default: OPENAI_BASE_URL or https://api.openai.com/v1)")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET,
+                        help="dataset.jsonl to evaluate (default %(default)s)")
+    parser.add_argument("--output-dir", type=Path, default=RESULTS_DIR,
+                        help="Results directory (default %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Requests in flight at once (default %(default)s)")
+    parser.add_argument("--api", choices=("chat", "completions"), default="chat",
+                        help="Endpoint to use (default %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Prompts per request with --api completions (default %(default)s)")
+    parser.add_argument("--homework", default=None, help="Only evaluate this homework, e.g. hw3")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N exercises")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse cached responses")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Discard earlier results for this model and start over")
+    parser.add_argument("--max-tokens", type=int, default=1024, help="Generation limit per exercise")
+    parser.add_argument("--temperature", type=float, default=0.0, help="Sampling temperature")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout per request in seconds")
+    parser.add_argument("--max-retries", type=int, default=4,
+                        help="Retries on 429, 5xx and timeouts (default %(default)s)")
+    parser.add_argument("--metrics-textfile", type=Path, default=None,
+                        help="Also write run metrics in Prometheus textfile format to this path")
+    args = parser.parse_args()
+
+    evaluate(
+        args.model, base_url=args.base_url, dataset=args.dataset, output_dir=args.output_dir,
+        concurrency=args.concurrency, batch_size=args.batch_size, api=args.api,
+        homework=args.homework, limit=args.limit, use_cache=not args.no_cache,
+        resume=not args.no_resume, max_tokens=args.max_tokens, temperature=args.temperature,
+        timeout=args.timeout, max_retries=args.max_retries, metrics_textfile=args.metrics_textfile
+    )
+
+
+if __name__ == "__main__":
+    main()
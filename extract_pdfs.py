@@ -10,19 +10,69 @@ Environment:
 
 import io
 import os
+import re
 import json
+import hashlib
+import time
+import argparse
+import subprocess
+import unicodedata
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-import fitz
-from PIL import Image
-import requests
-from tqdm import tqdm
 from dotenv import load_dotenv
+from ocr_cache import DEFAULT_MAX_BYTES, OCRCache, cache_key
+from ocr_client import API_URL, OCRError, SimpleTexClient
+from perf import metrics, print_summary, write_json_report, write_prometheus_textfile
+from textproc import EXERCISE_PATTERN, normalize_punctuation
 
 # Load environment variables
 load_dotenv()
 
 UAT = os.getenv("OCR_UAT")
 
+# Bump when normalize_punctuation changes so existing extractions are redone
+NORMALIZATION_VERSION = 2
+
+# Text-layer classifier thresholds: a page's embedded text replaces OCR only
+# if it has enough characters, few unmapped glyphs, little area covered by
+# images and little text set in math fonts (OCR returns LaTeX for those).
+TEXT_LAYER_MIN_CHARS = 50
+TEXT_LAYER_MAX_BAD_GLYPH_RATIO = 0.01
+TEXT_LAYER_MAX_IMAGE_RATIO = 0.2
+TEXT_LAYER_MAX_MATH_RATIO = 0.02
+MATH_FONT_MARKERS = ("cmmi", "cmsy", "cmex", "msam", "msbm", "math", "symbol", "stix", "esint")
+
+# Page encoding: pixels darker than INK_THRESHOLD count as ink; pages with
+# less ink than BLANK_MAX_INK_RATIO of their area are blank and skipped.
+IMAGE_FORMATS = ("png", "png-bilevel")
+INK_THRESHOLD = 200
+BILEVEL_THRESHOLD = 160
+BLANK_MAX_INK_RATIO = 0.0002
+TRIM_MARGIN = 8
+
+# OCR quality checks used to re-render pages at a higher DPI (--retry-dpi):
+# output shorter than OCR_MIN_CHARS, with more than OCR_MAX_GARBLED_RATIO
+# unreadable characters, with unbalanced $ or braces, or a first page
+# without an exercise number fails.
+OCR_MIN_CHARS = 20
+OCR_MAX_GARBLED_RATIO = 0.02
+ESCAPED_DELIMITERS = re.compile(r"\\[{}$]")
+
+# Stitched requests (--stitch): pages are stacked into one image, each
+# below a separator band (a full-width rule and a "LYTOC PAGE k/n" marker)
+# whose marker the OCR reads back; the output is split at the markers.
+STITCH_MARKER = "LYTOC PAGE {}/{}"
+STITCH_MARKER_PATTERN = re.compile(
+    r"^.*LYTOC\s*PAGE\s*(\d+)\s*/\s*(\d+).*$", re.MULTILINE | re.IGNORECASE
+)
+STITCH_BAND_HEIGHT = 64
+STITCH_MAX_HEIGHT = 12000
+HORIZONTAL_RULE = re.compile(r"^[ \t]*[-_=*]{3,}[ \t]*$")
+
+_default_client = None
+
 
 def pillow_image_to_file_binary(image):
     """Convert PIL image to binary data for API upload."""
@@ -31,81 +81,1138 @@ def pillow_image_to_file_binary(image):
     return bytes_io.getvalue()
 
 
+def default_client():
+    """Return the shared SimpleTex client used when none is passed in."""
+    global _default_client
+    if _default_client is None:
+        _default_client = SimpleTexClient(UAT)
+    return _default_client
+
+
+def default_backend():
+    """Return the SimpleTex backend used when none is passed in."""
+    return SimpleTexBackend(default_client())
+
+
+def ocr_image_binary(image_binary, client=None):
+    """Perform OCR on an encoded (PNG) image using SimpleTex API."""
+    return (client or default_client()).ocr(image_binary)
+
+
 def pdf_ocr(image):
     """Perform OCR on a single image using SimpleTex API."""
-    api_url = "https://server.simpletex.cn/api/doc_ocr/"
-    header = {"token": UAT}
-    img_file = {"file": pillow_image_to_file_binary(image)}
-    res = requests.post(api_url, files=img_file, data={}, headers=header).json()
-    return res["res"]["content"]
-
-
-def normalize_punctuation(content):
-    """Replace Chinese punctuation with English equivalents."""
-    replacements = {
-        '，': ',', '。': '.', '、': ',', '；': ';', '：': ':',
-        '？': '?', '！': '!', '"': '"', '"': '"', ''': "'",
-        ''': "'", '（': '(', '）': ')', '【': '[', '】': ']',
-        '《': '<', '》': '>', '．': '.',
+    return ocr_image_binary(pillow_image_to_file_binary(image))
+
+
+class OCRBackend:
+    """
+    Interface of an OCR engine used for page extraction.
+
+    Implementations turn an encoded page image into markdown text. They must
+    be safe to call from several OCR worker threads at once.
+    """
+
+    name = "base"
+
+    def cache_id(self):
+        """Identify the engine (and its configuration) in OCR cache keys."""
+        return self.name
+
+    def ocr(self, image_binary):
+        """Recognize an encoded page image and return its content."""
+        raise NotImplementedError
+
+    def select(self, features):
+        """Backend that should handle a page with these features."""
+        return self
+
+    def backends(self):
+        """Concrete backends behind this one (itself, unless it routes)."""
+        return [self]
+
+    def stats(self):
+        """Return request counters for the extraction summary."""
+        return {}
+
+
+class SimpleTexBackend(OCRBackend):
+    """Remote SimpleTex doc_ocr API, through a pooled SimpleTexClient."""
+
+    name = "simpletex"
+
+    def __init__(self, client):
+        self.client = client
+
+    def cache_id(self):
+        return self.client.api_url
+
+    def ocr(self, image_binary):
+        return self.client.ocr(image_binary)
+
+    def stats(self):
+        return self.client.stats()
+
+
+class TesseractBackend(OCRBackend):
+    """Local Tesseract engine, run as a subprocess per page."""
+
+    name = "tesseract"
+
+    def __init__(self, executable="tesseract", lang="eng", timeout=120):
+        self.executable = executable
+        self.lang = lang
+        self.timeout = timeout
+        self.requests = 0
+
+    def cache_id(self):
+        return f"tesseract:{self.lang}"
+
+    def ocr(self, image_binary):
+        self.requests += 1
+        result = subprocess.run(
+            [self.executable, "stdin", "stdout", "-l", self.lang],
+            input=image_binary, capture_output=True, timeout=self.timeout
+        )
+        if result.returncode != 0:
+            raise OCRError(result.stderr.decode("utf-8", "replace").strip() or "tesseract failed")
+        return result.stdout.decode("utf-8").strip()
+
+    def stats(self):
+        return {"requests": self.requests}
+
+
+class FixtureBackend(OCRBackend):
+    """
+    Deterministic replay of recorded OCR output, for offline runs and CI.
+
+    Fixtures are files named after the SHA-256 of the page image. If a
+    `record_from` backend is given, missing fixtures are fetched from it
+    and saved; otherwise a missing fixture is an error.
+    """
+
+    name = "fixture"
+
+    def __init__(self, fixture_dir, record_from=None):
+        self.fixture_dir = Path(fixture_dir)
+        self.record_from = record_from
+        self.requests = 0
+        self.recorded = 0
+
+    def cache_id(self):
+        return f"fixture:{self.fixture_dir}"
+
+    def ocr(self, image_binary):
+        self.requests += 1
+        fixture = self.fixture_dir / f"{hashlib.sha256(image_binary).hexdigest()}.md"
+        if fixture.exists():
+            return fixture.read_text(encoding="utf-8")
+        if self.record_from is None:
+            raise OCRError(f"no OCR fixture {fixture.name}")
+
+        content = self.record_from.ocr(image_binary)
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+        fixture.write_text(content, encoding="utf-8")
+        self.recorded += 1
+        return content
+
+    def backends(self):
+        return [self] + (self.record_from.backends() if self.record_from else [])
+
+    def stats(self):
+        return {"requests": self.requests, "recorded": self.recorded}
+
+
+class FeatureRouter(OCRBackend):
+    """
+    Routing policy: send each page to a backend chosen from its features.
+
+    `rules` is a list of (predicate, backend) pairs; the first predicate
+    that accepts the page's features (see page_features) wins, and pages
+    no rule accepts go to `default`.
+    """
+
+    name = "router"
+
+    def __init__(self, default, rules=()):
+        self.default = default
+        self.rules = list(rules)
+
+    def select(self, features):
+        for predicate, backend in self.rules:
+            if features is not None and predicate(features):
+                return backend.select(features)
+        return self.default.select(features)
+
+    def ocr(self, image_binary):
+        return self.default.ocr(image_binary)
+
+    def backends(self):
+        found = []
+        for backend in [self.default] + [backend for _, backend in self.rules]:
+            found.extend(b for b in backend.backends() if b not in found)
+        return found
+
+
+def is_easy_page(features):
+    """Routing predicate: born-digital text pages without math or images."""
+    return (
+        features["text_chars"] >= TEXT_LAYER_MIN_CHARS
+        and features["math_ratio"] <= TEXT_LAYER_MAX_MATH_RATIO
+        and features["image_ratio"] <= TEXT_LAYER_MAX_IMAGE_RATIO
+    )
+
+
+def page_features(page):
+    """
+    Cheap per-page features from the PDF structure (no rendering).
+
+    Returns:
+        Dict with the embedded `text` and its length, and the ratios of
+        unmapped glyphs, image-covered area and math-font characters
+    """
+    import fitz
+
+    text = page.get_text("text").strip()
+
+    # Glyphs without a unicode mapping come out as U+FFFD or private-use code points
+    bad_glyphs = sum(1 for ch in text if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff")
+
+    page_area = abs(page.rect) or 1
+    image_area = 0
+    total_chars = math_chars = 0
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] == 1:
+            image_area += abs(fitz.Rect(block["bbox"]) & page.rect)
+            continue
+        for line in block["lines"]:
+            for span in line["spans"]:
+                chars = len(span["text"].strip())
+                total_chars += chars
+                if any(marker in span["font"].lower() for marker in MATH_FONT_MARKERS):
+                    math_chars += chars
+
+    return {
+        "text": text,
+        "text_chars": len(text),
+        "bad_glyph_ratio": bad_glyphs / len(text) if text else 0.0,
+        "image_ratio": image_area / page_area,
+        "math_ratio": math_chars / total_chars if total_chars else 0.0
     }
-    for cn_char, en_char in replacements.items():
-        content = content.replace(cn_char, en_char)
-    return content
 
 
-def extract_pdf(pdf_path, dpi=100):
+def text_layer_content(page, features=None):
     """
-    Extract content from a single PDF file using OCR.
+    Return a page's embedded text if it can stand in for OCR, else None.
+
+    Scanned pages (little or no text, large image area), pages with
+    unmapped glyphs and math-heavy pages are left to OCR.
+    """
+    features = features or page_features(page)
+    if features["text_chars"] < TEXT_LAYER_MIN_CHARS:
+        return None
+    if features["bad_glyph_ratio"] > TEXT_LAYER_MAX_BAD_GLYPH_RATIO:
+        return None
+    if features["image_ratio"] > TEXT_LAYER_MAX_IMAGE_RATIO:
+        return None
+    if features["math_ratio"] > TEXT_LAYER_MAX_MATH_RATIO:
+        return None
+
+    return features["text"]
+
+
+def ocr_quality_issues(content, first_page=False):
+    """
+    Cheap plausibility checks of a page's OCR output.
 
     Args:
-        pdf_path: Path to PDF file
-        dpi: DPI for image conversion (default 100)
+        content: Normalized OCR content
+        first_page: The page is the first of its PDF, so it should contain
+            an exercise number
 
     Returns:
-        List of page contents
+        List of failed checks ("empty", "short", "garbled", "unbalanced_math",
+        "unbalanced_braces", "no_exercise_marker"); empty if the output looks fine
+    """
+    text = content.strip()
+    if not text:
+        return ["empty"]
+
+    issues = []
+    if len(text) < OCR_MIN_CHARS:
+        issues.append("short")
+
+    garbled = sum(
+        1 for ch in text
+        if ch == "\ufffd" or (unicodedata.category(ch)[0] == "C" and ch not in "\n\r\t")
+    )
+    if garbled > OCR_MAX_GARBLED_RATIO * len(text):
+        issues.append("garbled")
+
+    unescaped = ESCAPED_DELIMITERS.sub("", text)
+    if unescaped.count("$") % 2:
+        issues.append("unbalanced_math")
+    if unescaped.count("{") != unescaped.count("}"):
+        issues.append("unbalanced_braces")
+
+    if first_page and not EXERCISE_PATTERN.search(text):
+        issues.append("no_exercise_marker")
+    return issues
+
+
+def render_page(doc, page_index, dpi=100, grayscale=True):
+    """Rasterize a single PDF page into a fitz.Pixmap."""
+    import fitz
+
+    page = doc[page_index]
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    return page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+
+
+def encode_page(pix, image_format="png", trim=True):
+    """
+    Encode a rendered page for upload.
+
+    Reads the pixmap's sample buffer through a memoryview (no intermediate
+    bytes copy), trims blank margins and detects blank pages. Untrimmed PNG
+    pages are encoded by MuPDF directly from the pixmap.
+
+    Args:
+        pix: Rendered page (fitz.Pixmap, gray or RGB, no alpha)
+        image_format: "png" or "png-bilevel" (1-bit, much smaller for scans)
+        trim: Crop to the inked area plus a small margin
+
+    Returns:
+        Encoded image bytes, or None if the page is blank
     """
-    with open(pdf_path, 'rb') as f:
-        pdf_binary = f.read()
+    from PIL import Image
+
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride)
+    gray = image if mode == "L" else image.convert("L")
+
+    ink = gray.point(lambda v: 255 if v < INK_THRESHOLD else 0)
+    bbox = ink.getbbox()
+    if bbox is None or ink.histogram()[255] < BLANK_MAX_INK_RATIO * pix.width * pix.height:
+        return None
 
-    doc = fitz.open("pdf", pdf_binary)
-    total_pages = doc.page_count
+    cropped = False
+    if trim:
+        left, top, right, bottom = bbox
+        bbox = (
+            max(0, left - TRIM_MARGIN), max(0, top - TRIM_MARGIN),
+            min(pix.width, right + TRIM_MARGIN), min(pix.height, bottom + TRIM_MARGIN)
+        )
+        if bbox != (0, 0, pix.width, pix.height):
+            image, gray = image.crop(bbox), gray.crop(bbox)
+            cropped = True
 
-    pages_content = []
+    if image_format == "png-bilevel":
+        image = gray.point(lambda v: 255 if v >= BILEVEL_THRESHOLD else 0, mode="1")
+    elif not cropped:
+        # Let MuPDF encode straight from the pixmap
+        return pix.tobytes("png")
 
-    for page_index in tqdm(range(total_pages), desc=f"Processing {pdf_path.name}"):
-        try:
-            # Convert page to image
-            page = doc[page_index]
-            pix = page.get_pixmap(dpi=dpi)
-            image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return pillow_image_to_file_binary(image)
 
-            # OCR processing
-            content = pdf_ocr(image)
 
-            # Normalize punctuation
+def page_error(page_index, error, source="ocr"):
+    """Build the page record stored when a page fails to process."""
+    print(f"\nError processing page {page_index}: {str(error)}")
+    return {
+        "page_index": page_index,
+        "content": "",
+        "source": source,
+        "error": str(error)
+    }
+
+
+def ocr_page(page_index, image_binary, dpi=100, cache=None, backend=None, features=None):
+    """
+    OCR an encoded page image and return its page record.
+
+    The backend is chosen by `backend.select(features)`; the record notes
+    which backend handled the page, and the time taken is reported as the
+    `ocr_<backend>` metric. Records hold nothing run-dependent (timings,
+    cache hits), so they are identical however the page was processed.
+    """
+    engine = (backend or default_backend()).select(features)
+    started = time.perf_counter()
+    try:
+        # OCR processing, served from the cache when possible
+        content = None
+        if cache is not None:
+            key = cache_key(image_binary, dpi, engine.cache_id())
+            content = cache.get(key)
+
+        if content is None:
+            with metrics.timer("ocr_request"):
+                content = engine.ocr(image_binary)
+            if cache is not None:
+                cache.put(key, content)
+
+        # Normalize punctuation
+        with metrics.timer("normalize"):
             content = normalize_punctuation(content)
 
-            pages_content.append({
+        record = {
+            "page_index": page_index,
+            "content": content,
+            "source": "ocr"
+        }
+
+    except Exception as e:
+        record = page_error(page_index, e)
+
+    record["backend"] = engine.name
+    record["dpi"] = dpi
+    record["attempts"] = 1
+    metrics.observe(f"ocr_{engine.name}", time.perf_counter() - started)
+    return record
+
+
+def _marker_font():
+    """Font for stitch markers (Pillow's scalable default font where available)."""
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=24)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def image_height(image_binary):
+    """Height in pixels of an encoded page image (reads only the header)."""
+    from PIL import Image
+
+    return Image.open(io.BytesIO(image_binary)).height
+
+
+def stitch_images(image_binaries):
+    """
+    Stack encoded page images into one tall PNG for a single OCR request.
+
+    Each page is preceded by a STITCH_BAND_HEIGHT band holding a full-width
+    rule and its STITCH_MARKER text ("LYTOC PAGE k/n"). Bilevel pages stay
+    bilevel; grayscale and color pages are stacked in the widest mode.
+    """
+    from PIL import Image, ImageDraw
+
+    images = [Image.open(io.BytesIO(binary)) for binary in image_binaries]
+    count = len(images)
+    mode = "RGB" if any(image.mode not in ("1", "L") for image in images) else "L"
+    font = _marker_font()
+    marker_width = int(font.getlength(STITCH_MARKER.format(count, count))) + 16
+    width = max(marker_width, *(image.width for image in images))
+    canvas = Image.new(mode, (width, sum(image.height for image in images) + STITCH_BAND_HEIGHT * count),
+                       "white")
+    draw = ImageDraw.Draw(canvas)
+
+    y = 0
+    for k, image in enumerate(images, 1):
+        draw.rectangle((0, y + 6, width - 1, y + 9), fill="black")
+        draw.text((8, y + 24), STITCH_MARKER.format(k, count), fill="black", font=font)
+        y += STITCH_BAND_HEIGHT
+        canvas.paste(image.convert(mode), (0, y))
+        y += image.height
+
+    if all(image.mode == "1" for image in images):
+        canvas = canvas.point(lambda v: 255 if v >= BILEVEL_THRESHOLD else 0, mode="1")
+    return pillow_image_to_file_binary(canvas)
+
+
+def _strip_rules(text):
+    """Strip a chunk of stitched output, dropping horizontal rules at its edges."""
+    lines = text.strip().splitlines()
+    while lines and HORIZONTAL_RULE.match(lines[0]):
+        lines.pop(0)
+    while lines and HORIZONTAL_RULE.match(lines[-1]):
+        lines.pop()
+    return "\n".join(lines).strip()
+
+
+def split_stitched(content, count):
+    """
+    Split the OCR output of a stitched image back into pages.
+
+    Returns:
+        List of `count` page contents, or None if the split is ambiguous:
+        markers missing, repeated or out of order, text before the first
+        marker, or a page that came back empty
+    """
+    markers = list(STITCH_MARKER_PATTERN.finditer(content))
+    found = [(int(m.group(1)), int(m.group(2))) for m in markers]
+    if found != [(k, count) for k in range(1, count + 1)]:
+        return None
+    if _strip_rules(content[:markers[0].start()]):
+        return None
+
+    ends = [m.start() for m in markers[1:]] + [len(content)]
+    parts = [_strip_rules(content[m.end():end]) for m, end in zip(markers, ends)]
+    return parts if all(parts) else None
+
+
+def ocr_stitched(pages, dpi=100, cache=None, backend=None):
+    """
+    OCR several encoded pages with one request on a stitched image.
+
+    If the request fails or its output cannot be split unambiguously
+    (see split_stitched()), each page is OCRed on its own instead.
+
+    Args:
+        pages: (page_index, image_binary, features) tuples of pages that
+            select the same backend
+        dpi, cache, backend: As for ocr_page()
+
+    Returns:
+        List of page records in page order, with the same fields as
+        ocr_page() records (stitching only shows in the run metrics)
+    """
+    engine = (backend or default_backend()).select(pages[0][2])
+    started = time.perf_counter()
+    parts = None
+    cached = False
+    try:
+        with metrics.timer("stitch"):
+            image_binary = stitch_images([image for _, image, _ in pages])
+
+        content = None
+        if cache is not None:
+            key = cache_key(image_binary, dpi, engine.cache_id())
+            content = cache.get(key)
+            cached = content is not None
+        if content is None:
+            with metrics.timer("ocr_request"):
+                content = engine.ocr(image_binary)
+
+        parts = split_stitched(content, len(pages))
+        if parts is not None and cache is not None and not cached:
+            cache.put(key, content)
+    except Exception as e:
+        print(f"\nStitched OCR of pages {pages[0][0]}-{pages[-1][0]} failed: {str(e)}")
+
+    if parts is None:
+        metrics.count("stitch_fallbacks")
+        return [ocr_page(page_index, image, dpi, cache, backend, features)
+                for page_index, image, features in pages]
+
+    metrics.count("stitched_requests")
+    metrics.count("stitched_pages", len(pages))
+    metrics.observe(f"ocr_{engine.name}", time.perf_counter() - started)
+    records = []
+    for (page_index, _, _), part in zip(pages, parts):
+        with metrics.timer("normalize"):
+            part = normalize_punctuation(part)
+        record = {
+            "page_index": page_index,
+            "content": part,
+            "source": "ocr",
+            "backend": engine.name,
+            "dpi": dpi,
+            "attempts": 1
+        }
+        records.append(record)
+    return records
+
+
+def rerender_page(doc, record, retry_dpis, render_options, cache=None, backend=None,
+                  executor=None):
+    """
+    Re-render and re-OCR a page at higher DPIs while its OCR output looks wrong.
+
+    The page is rendered at each of `retry_dpis` in turn until a result
+    passes ocr_quality_issues(); failed requests stop the retries. The
+    result with the fewest issues wins, the higher DPI on a tie.
+
+    Args:
+        doc: Open fitz document (used on the calling thread only)
+        record: OCR page record from the first attempt
+        retry_dpis: Increasing DPIs to try
+        render_options: prepare_page() options of the first attempt
+        cache, backend: As for ocr_page()
+        executor: Optional thread pool to run the OCR request in
+
+    Returns:
+        The chosen page record, with its `dpi`, the total `attempts` and any
+        remaining `quality_issues`
+    """
+    page_index = record["page_index"]
+    first_page = page_index == 0
+    best, best_issues = record, ocr_quality_issues(record["content"], first_page)
+    attempts = 1
+
+    for dpi in retry_dpis:
+        if not best_issues:
+            break
+        options = dict(render_options, dpi=dpi, text_layer=False)
+        prepared, image_binary, features = prepare_page(doc, page_index, **options)
+        if prepared is not None:
+            break
+
+        attempts += 1
+        metrics.count("ocr_rerenders")
+        if executor is not None:
+            candidate = executor.submit(
+                ocr_page, page_index, image_binary, dpi, cache, backend, features
+            ).result()
+        else:
+            candidate = ocr_page(page_index, image_binary, dpi, cache, backend, features)
+        if "error" in candidate:
+            break
+
+        issues = ocr_quality_issues(candidate["content"], first_page)
+        if len(issues) <= len(best_issues):
+            best, best_issues = candidate, issues
+
+    if attempts > 1:
+        metrics.count("pages_rerendered")
+    best["attempts"] = attempts
+    if best_issues:
+        best["quality_issues"] = best_issues
+    return best
+
+
+def prepare_page(doc, page_index, dpi=100, text_layer=False, grayscale=True, trim=True,
+                 image_format="png", with_features=False):
+    """
+    Turn a page into either a finished record or an encoded image to OCR.
+
+    Returns:
+        Tuple of (record, image_binary, features). `record` is the final
+        page record for text-layer, blank and failed pages; otherwise it is
+        None and `image_binary` holds the encoded page. `features` are the
+        page_features() used for backend routing (None unless requested).
+    """
+    try:
+        features = None
+        if text_layer or with_features:
+            features = page_features(doc[page_index])
+
+        text = text_layer_content(doc[page_index], features) if text_layer else None
+        if text is not None:
+            with metrics.timer("normalize"):
+                text = normalize_punctuation(text)
+            return {
                 "page_index": page_index,
-                "content": content
-            })
+                "content": text,
+                "source": "text_layer"
+            }, None, None
 
-        except Exception as e:
-            print(f"\nError processing page {page_index}: {str(e)}")
-            pages_content.append({
+        # Convert page to image
+        with metrics.timer("rasterize"):
+            pix = render_page(doc, page_index, dpi, grayscale)
+        with metrics.timer("encode"):
+            image_binary = encode_page(pix, image_format, trim)
+        del pix
+
+        if image_binary is None:
+            return {
                 "page_index": page_index,
                 "content": "",
-                "error": str(e)
-            })
+                "source": "blank"
+            }, None, None
+
+        if features is not None:
+            # Routing only needs the numbers; don't ship the text around
+            features = {k: v for k, v in features.items() if k != "text"}
+        return None, image_binary, features
+
+    except Exception as e:
+        return page_error(page_index, e), None, None
+
+
+# Document opened by the current render worker process, as (path, doc)
+_worker_doc = (None, None)
+
+
+def _init_render_worker():
+    """Start render workers with empty metrics (a forked worker inherits the parent's)."""
+    metrics.reset()
+
+
+def prepare_page_range(pdf_path, page_indices, render_options):
+    """
+    Render-pool task: open the PDF by path and prepare a run of pages.
+
+    Each worker process keeps its last document open, so consecutive
+    chunks of the same file do not reopen it.
+
+    Returns:
+        List of (page_index, record, image_binary, features) tuples, and
+        the worker's timing measurements for the parent's metrics
+    """
+    import fitz
+
+    global _worker_doc
+    if _worker_doc[0] != pdf_path:
+        _worker_doc = (pdf_path, fitz.open(pdf_path))
+    doc = _worker_doc[1]
+    pages = [(i,) + prepare_page(doc, i, **render_options) for i in page_indices]
+    return pages, metrics.drain()
+
+
+def iter_prepared_pages(pdf_path, doc, page_indices, render_options, render_pool=None,
+                        chunk_size=4, render_queue_depth=8, queue_peaks=None):
+    """
+    Yield (page_index, record, image_binary, features) tuples in page order.
+
+    Without `render_pool`, pages are prepared lazily on the calling thread.
+    With a process pool, runs of `chunk_size` pages are rendered by worker
+    processes; at most `render_queue_depth` chunks are pending at a time,
+    so rendering pauses while the consumer (OCR dispatch) is saturated.
+    The highest number of pending chunks is recorded in queue_peaks["render"].
+    """
+    if render_pool is None:
+        for page_index in page_indices:
+            yield (page_index,) + prepare_page(doc, page_index, **render_options)
+        return
+
+    pending = deque()
+    for start in range(0, len(page_indices), chunk_size):
+        pending.append(render_pool.submit(
+            prepare_page_range, str(pdf_path), page_indices[start:start + chunk_size],
+            render_options
+        ))
+        if queue_peaks is not None:
+            queue_peaks["render"] = max(queue_peaks.get("render", 0), len(pending))
+        if len(pending) >= render_queue_depth:
+            yield from _collect(pending.popleft())
+
+    while pending:
+        yield from _collect(pending.popleft())
+
+
+def _collect(future):
+    """Unpack a prepare_page_range() result, merging the worker's timings."""
+    pages, worker_metrics = future.result()
+    metrics.merge(worker_metrics)
+    return pages
+
+
+def iter_pdf_pages(pdf_path, dpi=100, workers=1, cache=None, backend=None, skip_pages=(),
+                   text_layer=False, grayscale=True, trim=True, image_format="png",
+                   render_pool=None, ocr_pool=None, chunk_size=4, render_queue_depth=8,
+                   ocr_queue_depth=None, queue_peaks=None, retry_dpis=(), stitch=1):
+    """
+    Extract a PDF page by page, yielding page records in page order.
+
+    The extraction is a pull-based pipeline of generators with bounded
+    queues between stages: render/encode (on the calling thread, since
+    PyMuPDF documents are not thread-safe, or in a process pool that opens
+    the PDF by path) -> OCR and normalization (thread pool) -> the caller,
+    which writes each record out. The PDF is opened from its path, so peak
+    memory follows the queue depths rather than the page count. Results are
+    yielded in page order, so the output does not depend on the number of
+    workers, processes or queue depths.
+
+    With `text_layer`, born-digital pages whose embedded text passes
+    text_layer_content() are taken from the PDF directly and never sent to
+    OCR. Blank pages are detected after rendering and not sent either.
+    Each record notes its `source` ("text_layer", "blank" or "ocr").
+
+    With `retry_dpis`, OCR output failing ocr_quality_issues() is retried
+    at those higher resolutions (see rerender_page()) as the record comes
+    off the OCR queue; OCR records note the `dpi` and number of `attempts`.
+
+    With `stitch` > 1, runs of up to `stitch` consecutive OCR pages (same
+    backend, at most STITCH_MAX_HEIGHT pixels in total) are sent as one
+    stitched image (see ocr_stitched()) and split back into page records.
+
+    Args:
+        pdf_path: Path to PDF file
+        dpi: DPI for image conversion (default 100)
+        workers: Number of concurrent OCR requests (default 1)
+        cache: Optional OCRCache; cached pages skip the OCR request
+        backend: OCRBackend to use (default: SimpleTex with OCR_UAT)
+        skip_pages: Page indices that are already extracted
+        text_layer: Use the embedded text layer where good enough (default False)
+        grayscale: Render pages in grayscale instead of RGB (default True)
+        trim: Crop blank page margins before upload (default True)
+        image_format: Upload format, one of IMAGE_FORMATS (default "png")
+        render_pool: Optional ProcessPoolExecutor for rasterization
+        ocr_pool: Optional shared thread pool for OCR requests
+        chunk_size: Pages per render-pool task (default 4)
+        render_queue_depth: Render-pool tasks pending at once (default 8)
+        ocr_queue_depth: Encoded pages queued for or in OCR at once
+            (default: `workers`)
+        queue_peaks: Optional dict updated with the highest observed depth
+            of the "render" and "ocr" queues
+        retry_dpis: Higher DPIs to re-render pages at when their OCR output
+            fails the quality checks (default: none)
+        stitch: Maximum pages per OCR request (default 1: no stitching)
+
+    Yields:
+        Page records ({"page_index", "content", "source"[, "error"]})
+    """
+    import fitz
+    from tqdm import tqdm
+
+    # Opening by path lets MuPDF read the file on demand instead of holding a copy
+    doc = fitz.open(str(pdf_path))
+    skip_pages = set(skip_pages)
+    page_indices = [i for i in range(doc.page_count) if i not in skip_pages]
+    workers = max(1, workers)
+    ocr_queue_depth = max(1, ocr_queue_depth or workers)
+
+    render_options = {
+        "dpi": dpi,
+        "text_layer": text_layer,
+        "grayscale": grayscale,
+        "trim": trim,
+        "image_format": image_format,
+        "with_features": isinstance(backend, FeatureRouter)
+    }
+    prepared = iter_prepared_pages(
+        pdf_path, doc, page_indices, render_options, render_pool, chunk_size,
+        render_queue_depth, queue_peaks
+    )
+
+    executor = ocr_pool or ThreadPoolExecutor(max_workers=workers)
+    # Futures of a page record, or of a list of records for a stitched request
+    in_flight = deque()
+    retry_dpis = sorted(d for d in retry_dpis if d > dpi)
+    backend = backend or default_backend()
+    # OCR pages waiting to be stitched: (page_index, image_binary, features)
+    batch = []
+    batch_height = 0
+
+    def finish(future):
+        result = future.result()
+        for page in (result if isinstance(result, list) else [result]):
+            if retry_dpis and page["source"] == "ocr" and "error" not in page:
+                page = rerender_page(doc, page, retry_dpis, render_options, cache, backend, executor)
+            progress.update(1)
+            yield page
+
+    def enqueue(future):
+        in_flight.append(future)
+        if queue_peaks is not None:
+            queue_peaks["ocr"] = max(queue_peaks.get("ocr", 0), len(in_flight))
+
+        # Bound the number of pending requests (and encoded images)
+        if len(in_flight) >= ocr_queue_depth:
+            yield from finish(in_flight.popleft())
+
+    def submit_batch():
+        nonlocal batch, batch_height
+        pages, batch, batch_height = batch, [], 0
+        if len(pages) == 1:
+            return executor.submit(ocr_page, *pages[0][:2], dpi, cache, backend, pages[0][2])
+        return executor.submit(ocr_stitched, pages, dpi, cache, backend)
+
+    try:
+        with tqdm(total=len(page_indices), desc=f"Processing {pdf_path.name}") as progress:
+            for page_index, record, image_binary, features in prepared:
+                if record is None and stitch > 1:
+                    height = image_height(image_binary) + STITCH_BAND_HEIGHT
+                    if batch and (
+                        backend.select(features) is not backend.select(batch[0][2])
+                        or batch_height + height > STITCH_MAX_HEIGHT
+                    ):
+                        yield from enqueue(submit_batch())
+                    batch.append((page_index, image_binary, features))
+                    batch_height += height
+                    if len(batch) >= stitch:
+                        yield from enqueue(submit_batch())
+                    continue
+
+                # Keep page order: pages waiting to be stitched go first
+                if batch:
+                    yield from enqueue(submit_batch())
+                if record is not None:
+                    future = Future()
+                    future.set_result(record)
+                else:
+                    future = executor.submit(
+                        ocr_page, page_index, image_binary, dpi, cache, backend, features
+                    )
+                yield from enqueue(future)
+
+            if batch:
+                yield from enqueue(submit_batch())
+            while in_flight:
+                yield from finish(in_flight.popleft())
+    finally:
+        if executor is not ocr_pool:
+            executor.shutdown()
+        doc.close()
+
+
+def extract_pdf(pdf_path, dpi=100, workers=1, cache=None, backend=None, text_layer=False,
+                grayscale=True, trim=True, image_format="png", retry_dpis=(), stitch=1):
+    """
+    Extract content from a single PDF file using OCR.
+
+    Args:
+        pdf_path: Path to PDF file
+        dpi: DPI for image conversion (default 100)
+        workers: Number of concurrent OCR requests (default 1)
+        cache: Optional OCRCache; cached pages skip the OCR request
+        backend: OCRBackend to use (default: SimpleTex with OCR_UAT)
+        text_layer: Use the embedded text layer where good enough (default False)
+        grayscale: Render pages in grayscale instead of RGB (default True)
+        trim: Crop blank page margins before upload (default True)
+        image_format: Upload format, one of IMAGE_FORMATS (default "png")
+        retry_dpis: Higher DPIs for pages failing the OCR quality checks
+        stitch: Maximum pages per OCR request (default 1: no stitching)
+
+    Returns:
+        List of page contents
+    """
+    return list(iter_pdf_pages(
+        pdf_path, dpi, workers, cache, backend, text_layer=text_layer,
+        grayscale=grayscale, trim=trim, image_format=image_format, retry_dpis=retry_dpis,
+        stitch=stitch
+    ))
+
+
+def scan_checkpoint(jsonl_file):
+    """
+    Index a (possibly truncated) JSONL checkpoint without keeping its records.
+
+    Returns:
+        Tuple of (index, valid_size). `index` maps page_index to
+        (offset, length, ok) of the last record written for that page, where
+        `ok` is False for errored records; `valid_size` is the byte offset
+        just past the last complete line.
+    """
+    index = {}
+    valid_size = 0
+    try:
+        with open(jsonl_file, "rb") as f:
+            for line in f:
+                offset = valid_size
+                if not line.endswith(b"\n"):
+                    # Torn final line from an interrupted write
+                    break
+                valid_size += len(line)
+                try:
+                    page = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(page, dict) and "page_index" in page:
+                    index[page["page_index"]] = (offset, len(line), "error" not in page)
+    except FileNotFoundError:
+        pass
+    return index, valid_size
+
+
+def compact_checkpoint(jsonl_file):
+    """
+    Rewrite a checkpoint in page order, keeping the last record per page.
+
+    Only record offsets are held in memory; records are copied by seeking.
+    """
+    index, _ = scan_checkpoint(jsonl_file)
+    tmp_file = jsonl_file.with_suffix(".jsonl.tmp")
+    with open(jsonl_file, "rb") as src, open(tmp_file, "wb") as dst:
+        for page_index in sorted(index):
+            offset, length, _ = index[page_index]
+            src.seek(offset)
+            dst.write(src.read(length))
+    os.replace(tmp_file, jsonl_file)
+
+
+def extract_pdf_to_jsonl(pdf_path, jsonl_file, resume=False, **options):
+    """
+    Extract a PDF into a page-level JSONL file, checkpointing every page.
+
+    Each page record is written and flushed as soon as it is available, so
+    an interrupted run loses at most the pages still in flight. With
+    `resume`, pages already present in `jsonl_file` without an error are
+    kept and only missing or errored pages are extracted again.
+
+    Args:
+        pdf_path: Path to PDF file
+        jsonl_file: Output JSONL path (also the checkpoint)
+        resume: Continue from an existing partial `jsonl_file`
+        **options: Passed on to iter_pdf_pages (dpi, workers, cache, backend)
+    """
+    done = set()
+    if resume:
+        index, valid_size = scan_checkpoint(jsonl_file)
+        done = {page_index for page_index, (_, _, ok) in index.items() if ok}
+        # Drop a torn final line so appended records start on a fresh line
+        with open(jsonl_file, "r+b") as f:
+            f.truncate(valid_size)
+        if done:
+            print(f"  Resuming: {len(done)} pages already extracted")
+
+    with open(jsonl_file, "a" if resume else "w", encoding="utf-8") as f:
+        for page in iter_pdf_pages(pdf_path, skip_pages=done, **options):
+            f.write(json.dumps(page, ensure_ascii=False) + '\n')
+            f.flush()
+            metrics.count("pages")
+            metrics.count(f"pages_{page['source']}")
+            if "error" in page:
+                metrics.count("pages_failed")
+
+    if resume:
+        # Restore page order and drop superseded records
+        compact_checkpoint(jsonl_file)
+
+
+def build_markdown(jsonl_file, output_file):
+    """
+    Rebuild the markdown file from a completed page JSONL, streaming.
 
-    return pages_content
+    Returns:
+        Dict with total_pages, failed_pages, content_length and a per-source
+        page count (text_layer_pages, blank_pages, ocr_pages)
+    """
+    total_pages = failed_pages = content_length = 0
+    sources = {"text_layer": 0, "blank": 0, "ocr": 0}
+    separator = "\n\n---\n\n"
 
+    with open(jsonl_file, "r", encoding="utf-8") as src, \
+            open(output_file, "w", encoding="utf-8") as dst:
+        for line in src:
+            page = json.loads(line)
+            total_pages += 1
+            source = page.get("source", "ocr")
+            sources[source] = sources.get(source, 0) + 1
+            if "error" in page:
+                failed_pages += 1
+            if not page["content"]:
+                continue
+            if content_length:
+                dst.write(separator)
+                content_length += len(separator)
+            dst.write(page["content"])
+            content_length += len(page["content"])
+
+    return {
+        "total_pages": total_pages,
+        "failed_pages": failed_pages,
+        "content_length": content_length,
+        "text_layer_pages": sources["text_layer"],
+        "blank_pages": sources["blank"],
+        "ocr_pages": sources["ocr"]
+    }
 
-def extract_pdfs():
-    """Extract content from all PDFs in the raw/ directory."""
+
+def file_fingerprint(path, previous=None):
+    """
+    Describe a source file by size, mtime and SHA-256.
+
+    If `previous` (a fingerprint from the manifest) has the same size and
+    mtime, its hash is reused instead of re-reading the file.
+    """
+    stat = path.stat()
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()) \
+            and previous.get("sha256"):
+        fingerprint["sha256"] = previous["sha256"]
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def extraction_params(dpi, text_layer=False, grayscale=True, trim=True, image_format="png",
+                      backend=None, retry_dpis=(), stitch=1):
+    """Parameters that affect extraction output; a change forces re-extraction."""
+    return {
+        "dpi": dpi,
+        "retry_dpis": sorted(retry_dpis),
+        "stitch": stitch,
+        "normalization_version": NORMALIZATION_VERSION,
+        "text_layer": text_layer,
+        "grayscale": grayscale,
+        "trim": trim,
+        "image_format": image_format,
+        "ocr_backends": [engine.cache_id() for engine in (backend or default_backend()).backends()]
+    }
+
+
+def load_manifest(metadata_file):
+    """Load extraction_metadata.json, or an empty manifest if unavailable."""
+    try:
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(metadata_file, manifest):
+    """Atomically write extraction_metadata.json."""
+    tmp_file = metadata_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, metadata_file)
+
+
+def is_up_to_date(entry, fingerprint, params):
+    """Check whether a manifest entry is a complete extraction of this source."""
+    if not entry or entry.get("status") != "success":
+        return False
+    if entry.get("params") != params:
+        return False
+    if (entry.get("source") or {}).get("sha256") != fingerprint["sha256"]:
+        return False
+    return all(
+        Path(entry[key]).exists() for key in ("parsed_file", "jsonl_file")
+    )
+
+
+def extract_pdfs(dpi=100, workers=1, use_cache=True, cache_max_bytes=DEFAULT_MAX_BYTES,
+                 client=None, force=False, only=None, resume=True, text_layer=False,
+                 grayscale=True, trim=True, image_format="png", processes=1,
+                 render_queue_depth=None, ocr_queue_depth=None, backend=None,
+                 metrics_textfile=None, retry_dpis=(), stitch=1):
+    """
+    Extract content from all PDFs in the raw/ directory.
+
+    extraction_metadata.json is kept as a manifest of source fingerprints and
+    extraction parameters; PDFs whose previous extraction succeeded with the
+    same content and parameters are skipped. Failed and partially failed
+    files are always retried, resuming from their page-level JSONL.
+
+    Args:
+        dpi: DPI for image conversion (default 100)
+        workers: Number of concurrent OCR requests per PDF (default 1)
+        use_cache: Reuse OCR results from parsed_data/.cache (default True)
+        cache_max_bytes: Size cap of the OCR cache, in bytes
+        client: SimpleTexClient to use (default: one built from OCR_UAT)
+        force: Re-extract every selected PDF, even if unchanged
+        only: Optional collection of file stems (e.g. {"hw3", "hw7"}) to process
+        resume: Continue interrupted or partially failed extractions from
+            their page checkpoint instead of starting over (default True)
+        text_layer: Take born-digital pages from the PDF text layer instead
+            of OCR when the text is good enough (default False)
+        grayscale: Render pages in grayscale instead of RGB (default True)
+        trim: Crop blank page margins before upload (default True)
+        image_format: Upload format, one of IMAGE_FORMATS (default "png")
+        processes: Rasterize pages in this many worker processes; 1 renders
+            on the main thread (default 1)
+        render_queue_depth: Render chunks pending at once (default 2 * processes)
+        ocr_queue_depth: Encoded pages queued for or in OCR (default: workers)
+        backend: OCRBackend (or FeatureRouter) to use; defaults to SimpleTex
+            through `client`
+        metrics_textfile: Optional path of a Prometheus textfile to write
+            the run's metrics to
+        retry_dpis: Higher DPIs to re-render and re-OCR pages at when their
+            OCR output fails ocr_quality_issues(); lets `dpi` stay low for
+            most pages (default: none)
+        stitch: Send up to this many consecutive pages of a PDF as one
+            stitched OCR request (default 1: one request per page)
+
+    The run report (stage timings with p50/p95/p99, throughput, retries,
+    bytes uploaded and cache hits) is written to
+    parsed_data/extraction_report.json.
+    """
+
+    if backend is None:
+        backend = SimpleTexBackend(client or default_client())
 
     # Validate environment
-    if not UAT:
+    uses_simpletex = any(isinstance(b, SimpleTexBackend) for b in backend.backends())
+    if uses_simpletex and not UAT:
         print("Error: OCR_UAT environment variable not set")
         print("Please add OCR_UAT to your .env file")
         print("Get your token from: https://simpletex.cn")
@@ -123,6 +1230,13 @@ def extract_pdfs():
 
     pdf_files = sorted(raw_dir.glob("*.pdf"))
 
+    if only:
+        only = set(only)
+        missing = only - {pdf_file.stem for pdf_file in pdf_files}
+        for stem in sorted(missing):
+            print(f"Warning: {stem}.pdf not found in raw/")
+        pdf_files = [pdf_file for pdf_file in pdf_files if pdf_file.stem in only]
+
     if not pdf_files:
         print("No PDF files found in raw/ directory")
         return
@@ -130,68 +1244,340 @@ def extract_pdfs():
     print(f"Found {len(pdf_files)} PDF files to process")
     print("="*60)
 
+    metadata_file = output_dir / "extraction_metadata.json"
+    manifest = load_manifest(metadata_file)
+    retry_dpis = sorted(d for d in retry_dpis if d > dpi)
+    stitch = max(1, stitch)
+    params = extraction_params(dpi, text_layer, grayscale, trim, image_format, backend, retry_dpis,
+                               stitch)
+
+    cache = OCRCache(output_dir / ".cache", cache_max_bytes) if use_cache else None
+    metrics.reset()
+
     # Process each PDF
     results = {}
+    skipped = 0
+    text_layer_pages = 0
+    blank_pages = 0
+    queue_peaks = {}
 
-    for pdf_file in pdf_files:
-        print(f"\nProcessing {pdf_file.name}...")
+    # Pools are shared by all files: rendering runs in worker processes
+    # (each opening PDFs by path) and feeds one OCR thread pool
+    with ExitStack() as pools:
+        render_pool = None
+        if processes > 1:
+            render_pool = pools.enter_context(
+                ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker)
+            )
+        ocr_pool = pools.enter_context(ThreadPoolExecutor(max_workers=max(1, workers)))
 
-        try:
-            # Extract content
-            pages_content = extract_pdf(pdf_file)
+        for pdf_file in pdf_files:
+            previous = manifest.get(pdf_file.stem)
+            fingerprint = file_fingerprint(pdf_file, (previous or {}).get("source"))
 
-            # Combine all pages into markdown
-            markdown_content = "\n\n---\n\n".join([
-                page["content"] for page in pages_content if page["content"]
-            ])
+            if not force and is_up_to_date(previous, fingerprint, params):
+                previous["source"] = fingerprint
+                skipped += 1
+                print(f"\n- Skipping {pdf_file.name} (unchanged)")
+                continue
 
-            # Save as markdown
-            output_file = output_dir / f"{pdf_file.stem}.md"
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(markdown_content)
+            print(f"\nProcessing {pdf_file.name}...")
 
-            # Save as JSONL (with page info)
+            output_file = output_dir / f"{pdf_file.stem}.md"
             jsonl_file = output_dir / f"{pdf_file.stem}.jsonl"
-            with open(jsonl_file, "w", encoding="utf-8") as f:
-                for page in pages_content:
-                    f.write(json.dumps(page, ensure_ascii=False) + '\n')
 
-            # Store metadata
-            results[pdf_file.stem] = {
+            # Resume an interrupted or partially failed run of the same source
+            can_resume = (
+                resume and not force and previous is not None
+                and previous.get("params") == params
+                and (previous.get("source") or {}).get("sha256") == fingerprint["sha256"]
+                and jsonl_file.exists()
+            )
+
+            manifest[pdf_file.stem] = {
                 "original_file": pdf_file.name,
                 "parsed_file": str(output_file),
                 "jsonl_file": str(jsonl_file),
-                "status": "success",
-                "total_pages": len(pages_content),
-                "content_length": len(markdown_content)
+                "status": "running",
+                "source": fingerprint,
+                "params": params
             }
+            save_manifest(metadata_file, manifest)
 
-            print(f"✓ Successfully parsed {pdf_file.name}")
-            print(f"  Pages: {len(pages_content)}")
-            print(f"  Content length: {len(markdown_content)} characters")
+            try:
+                # Extract content, checkpointing each page to JSONL
+                extract_pdf_to_jsonl(
+                    pdf_file, jsonl_file, resume=can_resume,
+                    dpi=dpi, workers=workers, cache=cache, backend=backend,
+                    text_layer=text_layer, grayscale=grayscale, trim=trim,
+                    image_format=image_format, render_pool=render_pool,
+                    ocr_pool=ocr_pool,
+                    render_queue_depth=render_queue_depth or 2 * processes,
+                    ocr_queue_depth=ocr_queue_depth, queue_peaks=queue_peaks,
+                    retry_dpis=retry_dpis, stitch=stitch
+                )
 
-        except Exception as e:
-            print(f"✗ Error parsing {pdf_file.name}: {str(e)}")
-            results[pdf_file.stem] = {
-                "original_file": pdf_file.name,
-                "status": "failed",
-                "error": str(e)
-            }
+                # Combine all pages into markdown
+                stats = build_markdown(jsonl_file, output_file)
+                total_pages = stats["total_pages"]
+                failed_pages = stats["failed_pages"]
+                content_length = stats["content_length"]
+                text_layer_pages += stats["text_layer_pages"]
+                blank_pages += stats["blank_pages"]
 
-    # Save metadata
-    metadata_file = output_dir / "extraction_metadata.json"
-    with open(metadata_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+                # Store metadata
+                results[pdf_file.stem] = {
+                    "original_file": pdf_file.name,
+                    "parsed_file": str(output_file),
+                    "jsonl_file": str(jsonl_file),
+                    "status": "partial" if failed_pages else "success",
+                    "total_pages": total_pages,
+                    "failed_pages": failed_pages,
+                    "content_length": content_length,
+                    "text_layer_pages": stats["text_layer_pages"],
+                    "blank_pages": stats["blank_pages"],
+                    "source": fingerprint,
+                    "params": params
+                }
+
+                if failed_pages:
+                    print(f"⚠ Partially parsed {pdf_file.name} ({failed_pages} pages failed, will be retried)")
+                else:
+                    print(f"✓ Successfully parsed {pdf_file.name}")
+                print(f"  Pages: {total_pages}")
+                print(f"  Content length: {content_length} characters")
+
+            except Exception as e:
+                print(f"✗ Error parsing {pdf_file.name}: {str(e)}")
+                results[pdf_file.stem] = {
+                    "original_file": pdf_file.name,
+                    "status": "failed",
+                    "error": str(e),
+                    "source": fingerprint,
+                    "params": params
+                }
+
+            # Save metadata after every file so an interrupted run keeps its progress
+            manifest[pdf_file.stem] = results[pdf_file.stem]
+            save_manifest(metadata_file, manifest)
+
+    save_manifest(metadata_file, manifest)
 
     print(f"\n{'='*60}")
     print(f"Extraction complete!")
     print(f"Processed: {len(results)} files")
+    print(f"Skipped (unchanged): {skipped}")
     print(f"Success: {sum(1 for r in results.values() if r['status'] == 'success')}")
+    print(f"Partial: {sum(1 for r in results.values() if r['status'] == 'partial')}")
     print(f"Failed: {sum(1 for r in results.values() if r['status'] == 'failed')}")
+    if text_layer:
+        print(f"Text layer pages: {text_layer_pages} (OCR calls avoided)")
+    print(f"Blank pages skipped: {blank_pages}")
+    if retry_dpis:
+        print(f"Re-rendered at higher DPI: {metrics.counters.get('pages_rerendered', 0)} pages "
+              f"({metrics.counters.get('ocr_rerenders', 0)} extra OCR requests)")
+    if stitch > 1:
+        stitched_pages = metrics.counters.get("stitched_pages", 0)
+        stitched_requests = metrics.counters.get("stitched_requests", 0)
+        print(f"Stitched requests: {stitched_requests} for {stitched_pages} pages "
+              f"({stitched_pages - stitched_requests} requests saved, "
+              f"{metrics.counters.get('stitch_fallbacks', 0)} fell back to single pages)")
+    if queue_peaks:
+        print("Peak queue depth: " + ", ".join(
+            f"{stage} {depth}" for stage, depth in sorted(queue_peaks.items())
+        ))
+    for engine in backend.backends():
+        engine_stats = engine.stats()
+        for name, value in engine_stats.items():
+            if isinstance(value, (int, float)):
+                metrics.count(f"{engine.name}_{name}", value)
+        if isinstance(engine, SimpleTexBackend):
+            print(f"OCR requests ({engine.name}): {engine_stats['requests']} "
+                  f"({engine_stats['retries']} retries, {engine_stats['rate_limited']} rate limited, "
+                  f"{engine_stats['bytes_uploaded']} bytes uploaded)")
+        else:
+            print(f"OCR requests ({engine.name}): {engine_stats.get('requests', 0)}")
+    if cache is not None:
+        cache_stats = cache.stats()
+        cache.close()
+        print(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['entries']} entries, {cache_stats['size_bytes']} bytes)")
+        metrics.count("ocr_cache_hits", cache_stats["hits"])
+        metrics.count("ocr_cache_misses", cache_stats["misses"])
     print(f"Metadata saved to: {metadata_file}")
 
+    # Run report
+    pages = metrics.counters.get("pages", 0)
+    metrics.gauge("pages_per_second", round(pages / metrics.elapsed(), 3))
+    summary = metrics.summary()
+    print()
+    print_summary(summary)
+    report_file = output_dir / "extraction_report.json"
+    write_json_report(report_file, {"job": "extract", "params": params, **summary})
+    print(f"Run report saved to: {report_file}")
+    if metrics_textfile:
+        write_prometheus_textfile(Path(metrics_textfile), summary, "extract")
+        print(f"Prometheus metrics written to: {metrics_textfile}")
+
     return results
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract content from PDFs in raw/ using SimpleTex OCR."
+    )
+    parser.add_argument(
+        "--dpi", type=int, default=100,
+        help="DPI for page rasterization (default %(default)s)"
+    )
+    parser.add_argument(
+        "--retry-dpi", type=lambda value: [int(dpi) for dpi in value.split(",") if dpi.strip()],
+        default=[],
+        help="Comma-separated higher DPIs to re-render pages at when their OCR output "
+             "looks wrong (empty, garbled, unbalanced $/braces), e.g. 150,200"
+    )
+    parser.add_argument(
+        "--stitch", type=int, default=1,
+        help="Send up to N consecutive pages of a PDF as one stitched OCR request (default 1)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-extract PDFs even if they are unchanged since the last run"
+    )
+    parser.add_argument(
+        "--only", type=lambda value: [stem.strip() for stem in value.split(",") if stem.strip()],
+        default=None,
+        help="Comma-separated file stems to process, e.g. hw3,hw7"
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true",
+        help="Restart interrupted extractions instead of resuming from their JSONL"
+    )
+    parser.add_argument(
+        "--text-layer", action="store_true",
+        help="Use the embedded text of born-digital pages instead of OCR when good enough"
+    )
+    parser.add_argument(
+        "--color", action="store_true",
+        help="Render pages in RGB instead of grayscale"
+    )
+    parser.add_argument(
+        "--no-trim", action="store_true",
+        help="Upload full pages instead of cropping blank margins"
+    )
+    parser.add_argument(
+        "--image-format", choices=IMAGE_FORMATS, default="png",
+        help="Upload image format (default %(default)s; png-bilevel is 1-bit)"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="Rasterize pages in N worker processes (default 1: main thread)"
+    )
+    parser.add_argument(
+        "--render-queue-depth", type=int, default=None,
+        help="Render chunks pending at once with --processes (default 2 * processes)"
+    )
+    parser.add_argument(
+        "--ocr-queue-depth", type=int, default=None,
+        help="Encoded pages queued for or in OCR at once (default: --workers)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of concurrent OCR requests (default 1)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always call the OCR API instead of reusing cached results"
+    )
+    parser.add_argument(
+        "--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Size cap of the OCR result cache in MB (default %(default)s)"
+    )
+    parser.add_argument(
+        "--backend", choices=("simpletex", "tesseract", "fixture"), default="simpletex",
+        help="OCR backend (default %(default)s)"
+    )
+    parser.add_argument(
+        "--route-easy-to", choices=("tesseract", "fixture"), default=None,
+        help="Send easy pages (born-digital text, no math or images) to this local backend"
+    )
+    parser.add_argument(
+        "--fixture-dir", type=Path, default=Path("parsed_data/.fixtures"),
+        help="Directory of recorded OCR output for the fixture backend"
+    )
+    parser.add_argument(
+        "--record-fixtures", action="store_true",
+        help="Fetch missing fixtures from SimpleTex and save them"
+    )
+    parser.add_argument(
+        "--tesseract-lang", default="eng",
+        help="Tesseract language(s) for the tesseract backend (default %(default)s)"
+    )
+    parser.add_argument(
+        "--api-url", default=API_URL,
+        help="OCR endpoint (default: SimpleTex doc_ocr)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120,
+        help="Read timeout per OCR request in seconds (default %(default)s)"
+    )
+    parser.add_argument(
+        "--max-retries", type=int, default=4,
+        help="Retries on 5xx, timeouts and rate limiting (default %(default)s)"
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=None,
+        help="Maximum OCR requests per second (default: unlimited)"
+    )
+    parser.add_argument(
+        "--metrics-textfile", type=Path, default=None,
+        help="Also write run metrics in Prometheus textfile format to this path"
+    )
+    args = parser.parse_args()
+
+    client = SimpleTexClient(
+        UAT,
+        api_url=args.api_url,
+        timeout=(10, args.timeout),
+        max_retries=args.max_retries,
+        rate_limit=args.rate_limit,
+        pool_size=max(16, args.workers)
+    )
+
+    def make_backend(name):
+        if name == "tesseract":
+            return TesseractBackend(lang=args.tesseract_lang)
+        if name == "fixture":
+            record_from = SimpleTexBackend(client) if args.record_fixtures else None
+            return FixtureBackend(args.fixture_dir, record_from)
+        return SimpleTexBackend(client)
+
+    backend = make_backend(args.backend)
+    if args.route_easy_to:
+        backend = FeatureRouter(backend, [(is_easy_page, make_backend(args.route_easy_to))])
+
+    extract_pdfs(
+        dpi=args.dpi,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_max_bytes=args.cache_size_mb * 1024 * 1024,
+        client=client,
+        force=args.force,
+        only=args.only,
+        resume=not args.no_resume,
+        text_layer=args.text_layer,
+        grayscale=not args.color,
+        trim=not args.no_trim,
+        image_format=args.image_format,
+        processes=args.processes,
+        render_queue_depth=args.render_queue_depth,
+        ocr_queue_depth=args.ocr_queue_depth,
+        backend=backend,
+        metrics_textfile=args.metrics_textfile,
+        retry_dpis=args.retry_dpi,
+        stitch=args.stitch
+    )
+
+
 if __name__ == "__main__":
-    extract_pdfs()
+    main()
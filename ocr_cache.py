@@ -0,0 +1,165 @@
+"""
+Content-addressed cache for OCR results.
+
+Maps a hash of the rendered page (image bytes, DPI and OCR endpoint) to the
+raw OCR output, so pages that have already been recognized are never sent
+to the API again. Entries are stored in a single SQLite file and evicted in
+least-recently-used order once the cache grows past its size cap.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Cache hits only refresh last_access; those updates are committed with the
+# next put, on close, or after this many hits
+ACCESS_COMMIT_EVERY = 100
+
+# Entries fetched per eviction query
+EVICT_BATCH = 64
+
+
+def cache_key(image_binary, dpi, endpoint):
+    """Build the cache key for a rendered page."""
+    digest = hashlib.sha256()
+    digest.update(f"{endpoint}\0{dpi}\0".encode("utf-8"))
+    digest.update(image_binary)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    SQLite-backed OCR result cache with LRU eviction.
+
+    The total content size is tracked in memory, so inserts do not scan the
+    table. last_access updates from hits are committed in batches; entries
+    read just before a crash may lose their refresh, which only affects
+    eviction order.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, filename="ocr_cache.sqlite"):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Size cap for cached content, in bytes
+            filename: Database file name, so other caches (e.g. model
+                responses in evaluate.py) can share the implementation
+        """
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.path = cache_dir / filename
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Shared between OCR worker threads; access is serialized by _lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access"
+            " ON entries (last_access)"
+        )
+        self._conn.commit()
+        self._total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        self._uncommitted_hits = 0
+
+    def get(self, key):
+        """Return cached content for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            self._uncommitted_hits += 1
+            if self._uncommitted_hits >= ACCESS_COMMIT_EVERY:
+                self._commit()
+            return row[0]
+
+    def put(self, key, content):
+        """
+        Store `content` under `key`, evicting old entries if needed.
+
+        Content larger than the whole cache is not stored, so it cannot
+        evict every other entry.
+        """
+        size = len(content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, content, size, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, content, size, time.time())
+            )
+            self._total += size - (previous[0] if previous else 0)
+            self._evict()
+            self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._uncommitted_hits = 0
+
+    def _evict(self):
+        """Drop least-recently-used entries until under the size cap."""
+        while self._total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access ASC LIMIT ?",
+                (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total = 0
+                return
+
+            stale = []
+            for key, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                self._total -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def stats(self):
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = self._total
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._commit()
+            self._conn.close()
@@ -0,0 +1,214 @@
+"""
+HTTP client for the SimpleTex document OCR API.
+
+Wraps a pooled keep-alive `requests.Session` with per-request timeouts,
+exponential backoff with jitter on transient failures (5xx, timeouts,
+dropped connections) and a token-bucket rate limiter that backs off when
+the server answers 429 or reports an exhausted quota.
+"""
+
+import random
+import threading
+import time
+
+API_URL = "https://server.simpletex.cn/api/doc_ocr/"
+
+# Substrings of SimpleTex error messages that mean "slow down", not "give up"
+QUOTA_ERROR_MARKERS = ("limit", "quota", "too many", "frequent")
+
+
+class OCRError(Exception):
+    """Raised when the OCR API returns an unusable response."""
+
+
+class RateLimitError(OCRError):
+    """Raised when the OCR API rejects a request because of rate limits."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter with adaptive rate.
+
+    The rate is cut multiplicatively by `slow_down()` (called on 429/quota
+    errors) and recovers additively through `speed_up()` on successful
+    requests, up to the configured rate.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.1):
+        """
+        Args:
+            rate: Maximum sustained requests per second
+            capacity: Burst size (default: max(1, rate))
+            min_rate: Floor for the adaptive rate
+        """
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(min_rate, self.max_rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self, factor=0.5):
+        """Reduce the rate after the server pushed back."""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._tokens = min(self._tokens, 0.0)
+
+    def speed_up(self, step=None):
+        """Recover the rate after a successful request."""
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + (step or self.max_rate * 0.05))
+
+
+class SimpleTexClient:
+    """Reusable SimpleTex OCR client with pooling, retries and rate limiting."""
+
+    def __init__(self, token, api_url=API_URL, timeout=(10, 120), max_retries=4,
+                 backoff_base=0.5, backoff_max=30.0, rate_limit=None, pool_size=16):
+        """
+        Args:
+            token: SimpleTex API token (OCR_UAT)
+            api_url: OCR endpoint
+            timeout: (connect, read) timeout in seconds
+            max_retries: Retries after the first attempt on transient errors
+            backoff_base: Base delay of the exponential backoff, in seconds
+            backoff_max: Upper bound of a single backoff delay, in seconds
+            rate_limit: Requests per second, or None for no client-side limit
+            pool_size: Number of keep-alive connections kept per host
+        """
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.headers["token"] = token or ""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.bytes_uploaded = 0
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After if given."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _post(self, image_binary):
+        """Send one request and return the OCR content or raise."""
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+        self._count(requests_sent=1, bytes_uploaded=len(image_binary))
+        response = self.session.post(
+            self.api_url,
+            files={"file": image_binary},
+            data={},
+            timeout=self.timeout
+        )
+
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError(
+                "HTTP 429 Too Many Requests",
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
+
+        res = response.json()
+        if res.get("status") is False:
+            err_info = res.get("err_info") or {}
+            message = str(err_info.get("err_msg") or err_info or "request failed")
+            if any(marker in message.lower() for marker in QUOTA_ERROR_MARKERS):
+                raise RateLimitError(message)
+            raise OCRError(message)
+
+        return res["res"]["content"]
+
+    def ocr(self, image_binary):
+        """
+        Perform OCR on an encoded image.
+
+        Retries 5xx responses, timeouts, connection errors and rate-limit
+        responses with exponential backoff; other errors are raised at once.
+        """
+        import requests
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                content = self._post(image_binary)
+            except RateLimitError as e:
+                self._count(rate_limited=1)
+                if self.limiter is not None:
+                    self.limiter.slow_down()
+                error, retry_after = e, e.retry_after
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code < 500:
+                    raise
+                error = e
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = e
+            else:
+                if self.limiter is not None:
+                    self.limiter.speed_up()
+                return content
+
+            if attempt == self.max_retries:
+                raise error
+
+            self._count(retries=1)
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def stats(self):
+        """Return request counters."""
+        with self._lock:
+            return {
+                "requests": self.requests_sent,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "bytes_uploaded": self.bytes_uploaded
+            }
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
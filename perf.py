@@ -0,0 +1,186 @@
+"""
+Lightweight timing and throughput instrumentation.
+
+Hot paths record into the process-wide `metrics` registry with
+`metrics.timer("stage")` and `metrics.count("name")`, so instrumentation
+does not have to be threaded through every call. Worker processes hand
+their measurements back with `drain()`, and the parent process folds them
+in with `merge()`. At the end of a run the registry is written as a JSON
+report and, optionally, as a Prometheus textfile (for node_exporter's
+textfile collector).
+"""
+
+import os
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Metrics:
+    """Thread-safe registry of durations, counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far and restart the run clock."""
+        with self._lock:
+            self.durations = {}
+            self.counters = {}
+            self.gauges = {}
+            self.started = time.time()
+            self._started_monotonic = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block as one observation of `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.durations.setdefault(name, []).append(seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def drain(self):
+        """Return and clear raw measurements (used by worker processes)."""
+        with self._lock:
+            snapshot = {"durations": self.durations, "counters": self.counters}
+            self.durations, self.counters = {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add measurements returned by drain() in another process."""
+        with self._lock:
+            for name, values in snapshot["durations"].items():
+                self.durations.setdefault(name, []).extend(values)
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def elapsed(self):
+        """Seconds since the last reset()."""
+        return time.perf_counter() - self._started_monotonic
+
+    def summary(self):
+        """
+        Aggregate the run.
+
+        Returns:
+            Dict with the run start time and wall time, per-stage timing
+            statistics (count, total, mean, max and p50/p95/p99 in
+            seconds), counters and gauges
+        """
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self.durations.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        stages = {}
+        for name, values in sorted(durations.items()):
+            total = sum(values)
+            stats = {
+                "count": len(values),
+                "total": round(total, 6),
+                "mean": round(total / len(values), 6),
+                "max": round(values[-1], 6),
+            }
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}"] = round(percentile(values, q), 6)
+            stages[name] = stats
+
+        return {
+            "started": self.started,
+            "wall_time": round(self.elapsed(), 6),
+            "stages": stages,
+            "counters": dict(sorted(counters.items())),
+            "gauges": dict(sorted(gauges.items())),
+        }
+
+
+def write_json_report(path, report):
+    """Atomically write a JSON run report."""
+    tmp_file = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, path)
+
+
+def _metric_name(name):
+    return "".join(ch if ch.isalnum() else "_" for ch in name).strip("_").lower()
+
+
+def prometheus_text(summary, job, prefix="lytoc"):
+    """
+    Render a summary() in the Prometheus text exposition format.
+
+    Stage timings become a summary metric with quantile labels; counters
+    and gauges become gauges, since each file describes one run.
+    """
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, stats in summary["stages"].items():
+        labels = f'job="{job}",stage="{stage}"'
+        for q in QUANTILES:
+            lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{q}"}} '
+                         f'{stats[f"p{int(q * 100)}"]}')
+        lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {stats['total']}")
+        lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {stats['count']}")
+
+    for kind in ("counters", "gauges"):
+        for name, value in summary[kind].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f'{metric}{{job="{job}"}} {value}')
+
+    lines.append(f"# TYPE {prefix}_run_wall_seconds gauge")
+    lines.append(f'{prefix}_run_wall_seconds{{job="{job}"}} {summary["wall_time"]}')
+    lines.append(f"# TYPE {prefix}_run_started_timestamp_seconds gauge")
+    lines.append(f'{prefix}_run_started_timestamp_seconds{{job="{job}"}} {summary["started"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path, summary, job):
+    """Atomically write a Prometheus textfile (the collector must never see a partial file)."""
+    tmp_file = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(summary, job))
+    os.replace(tmp_file, path)
+
+
+def print_summary(summary):
+    """Print stage timings as a compact table."""
+    if not summary["stages"]:
+        return
+    print(f"{'stage':<16}{'count':>8}{'total s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for stage, stats in summary["stages"].items():
+        print(f"{stage:<16}{stats['count']:>8}{stats['total']:>10.2f}"
+              f"{1000 * stats['p50']:>9.1f}{1000 * stats['p95']:>9.1f}{1000 * stats['p99']:>9.1f}")
+
+
+# Process-wide registry used by the pipeline's hot paths
+metrics = Metrics()
@@ -1,12 +1,248 @@
 #!/usr/bin/env python3
 """
-Helper script to run the full benchmark pipeline.
+Run the full benchmark pipeline in one process.
+
+Stages (extract -> benchmark -> upload) are imported and called directly
+and run in dependency order. Each stage declares its input files, output
+files and parameters; a stage is skipped when the hash of its inputs and
+parameters matches its last successful run and its outputs still exist.
+Stage hashes are kept in .pipeline_state.json.
+
+Usage:
+    python run_pipeline.py                      # interactive, as before
+    python run_pipeline.py --yes                # extract + benchmark, no prompts
+    python run_pipeline.py --yes --stages extract,benchmark,upload --repo user/lytoc
 """
 
+import os
 import sys
-import subprocess
+import json
+import hashlib
+import argparse
 from pathlib import Path
 
+STATE_FILE = Path(".pipeline_state.json")
+
+
+class Stage:
+    """
+    A pipeline stage: a function plus what it reads, writes and depends on.
+
+    `inputs` and `outputs` are glob patterns relative to the working
+    directory; `params` are the arguments that affect the stage's output.
+    """
+
+    def __init__(self, name, description, run, inputs=(), outputs=(), params=None, deps=()):
+        """
+        Args:
+            name: Short stage name used by --stages
+            description: Heading printed when the stage runs
+            run: Callable returning True on success, False on failure, or
+                "partial" if it produced usable output but should run again
+            inputs: Glob patterns of files the stage reads
+            outputs: Glob patterns of files the stage writes
+            params: JSON-serializable parameters included in the stage hash
+            deps: Names of stages that must run before this one
+        """
+        self.name = name
+        self.description = description
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.deps = deps
+
+
+def expand(patterns):
+    """Files matching glob patterns, sorted and without duplicates."""
+    return sorted({path for pattern in patterns for path in Path(".").glob(pattern) if path.is_file()})
+
+
+def stage_hash(stage, fingerprints):
+    """
+    Hash a stage's input files and parameters.
+
+    Args:
+        stage: Stage to hash
+        fingerprints: path -> previous fingerprint; updated in place, so
+            unchanged files (same size and mtime) are not re-read
+
+    Returns:
+        Hex digest identifying the stage's inputs and parameters
+    """
+    from extract_pdfs import file_fingerprint
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(stage.params, sort_keys=True).encode())
+    for path in expand(stage.inputs):
+        fingerprint = file_fingerprint(path, fingerprints.get(str(path)))
+        fingerprints[str(path)] = fingerprint
+        digest.update(f"{path}\0{fingerprint['sha256']}\n".encode())
+    return digest.hexdigest()
+
+
+def load_state(state_file=STATE_FILE):
+    """Load the last successful stage hashes, or an empty state."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "fingerprints": {}}
+    state.setdefault("stages", {})
+    state.setdefault("fingerprints", {})
+    return state
+
+
+def save_state(state, state_file=STATE_FILE):
+    """Atomically write the pipeline state."""
+    tmp_file = state_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def topological_order(stages, selected):
+    """Order the selected stages so that dependencies run first."""
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle at stage {name}")
+        visiting.add(name)
+        for dep in stages[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in selected:
+        visit(name)
+    return [name for name in order if name in selected]
+
+
+def run_stages(stages, selected, force=False, state_file=STATE_FILE):
+    """
+    Run the selected stages in dependency order, skipping up-to-date ones.
+
+    A selected stage whose dependency failed in this run is not started.
+    Partial results let dependent stages run but are not recorded, so the
+    stage runs again next time.
+
+    Args:
+        stages: name -> Stage
+        selected: Names of the stages to run
+        force: Run stages even if their inputs are unchanged
+        state_file: Where stage hashes are kept
+
+    Returns:
+        name -> "success", "partial", "skipped", "failed" or "blocked"
+    """
+    state = load_state(state_file)
+    results = {}
+
+    for name in topological_order(stages, selected):
+        stage = stages[name]
+        if any(results.get(dep) in ("failed", "blocked") for dep in stage.deps):
+            print(f"\n⏭ Skipping {stage.description}: a dependency failed")
+            results[name] = "blocked"
+            continue
+
+        # Hash after dependencies ran, since their outputs are this stage's inputs
+        current = stage_hash(stage, state["fingerprints"])
+        outputs_exist = all(expand([pattern]) for pattern in stage.outputs)
+        if not force and state["stages"].get(name) == current and outputs_exist:
+            print(f"\n✓ {stage.description}: up to date, skipped")
+            results[name] = "skipped"
+            continue
+
+        print(f"\n{'='*60}")
+        print(f"📍 {stage.description}")
+        print(f"{'='*60}\n")
+        try:
+            outcome = stage.run()
+        except Exception as e:
+            print(f"\n✗ Error: {stage.description} raised {type(e).__name__}: {e}")
+            outcome = False
+
+        if outcome == "partial":
+            print(f"\n⚠ {stage.description} partially completed, will run again next time")
+            state["stages"].pop(name, None)
+            results[name] = "partial"
+        elif outcome:
+            print(f"\n✓ {stage.description} completed successfully!")
+            # Record the hash of the inputs the stage actually consumed
+            state["stages"][name] = current
+            results[name] = "success"
+        else:
+            print(f"\n✗ Error: {stage.description} failed!")
+            state["stages"].pop(name, None)
+            results[name] = "failed"
+        save_state(state, state_file)
+
+    return results
+
+
+def build_stages(args):
+    """Define the pipeline stages from the command-line options."""
+
+    def extract():
+        from extract_pdfs import extract_pdfs
+
+        results = extract_pdfs(
+            dpi=args.dpi, workers=args.workers, processes=args.processes,
+            text_layer=args.text_layer, retry_dpis=args.retry_dpi, stitch=args.stitch
+        )
+        if results is None:
+            return False
+        if any(r["status"] != "success" for r in results.values()):
+            return "partial"
+        return True
+
+    def benchmark():
+        from create_benchmark import create_benchmark
+
+        return create_benchmark() is not None
+
+    def upload():
+        from upload_to_hf import upload_to_huggingface
+
+        return upload_to_huggingface(args.repo, private=args.private) is not None
+
+    from dedup import DEDUP_VERSION
+    from search_index import INDEX_FORMAT, TOKENIZER_VERSION
+    from extract_pdfs import NORMALIZATION_VERSION
+    from textproc import SPLITTER_VERSION
+
+    return {
+        "extract": Stage(
+            "extract", "PDF Extraction", extract,
+            inputs=["raw/*.pdf"],
+            outputs=["parsed_data/extraction_metadata.json", "parsed_data/hw*.md"],
+            params={"dpi": args.dpi, "retry_dpis": sorted(args.retry_dpi),
+                    "text_layer": args.text_layer, "stitch": args.stitch,
+                    "normalization_version": NORMALIZATION_VERSION}
+        ),
+        "benchmark": Stage(
+            "benchmark", "Benchmark Creation", benchmark,
+            inputs=["parsed_data/hw*.md"],
+            outputs=["benchmark_dataset/dataset.jsonl", "benchmark_dataset/parquet/*.parquet",
+                     "benchmark_dataset/search_index.sqlite"],
+            params={"splitter_version": SPLITTER_VERSION, "dedup_version": DEDUP_VERSION,
+                    "tokenizer_version": TOKENIZER_VERSION, "index_format": INDEX_FORMAT},
+            deps=["extract"]
+        ),
+        "upload": Stage(
+            "upload", "HuggingFace Upload", upload,
+            inputs=["HF_README.md", "benchmark_dataset/dataset.json",
+                    "benchmark_dataset/dataset.jsonl", "benchmark_dataset/parquet/*.parquet"],
+            params={"repo": args.repo, "private": args.private},
+            deps=["benchmark"]
+        ),
+    }
+
+
 def check_env_file():
     """Check if .env file exists."""
     if not Path(".env").exists():
@@ -17,65 +253,74 @@ def check_env_file():
         return False
     return True
 
-def run_command(cmd, description):
-    """Run a command and handle errors."""
-    print(f"\n{'='*60}")
-    print(f"📍 {description}")
-    print(f"{'='*60}\n")
-
-    try:
-        result = subprocess.run(cmd, check=True, shell=True)
-        print(f"\n✓ {description} completed successfully!")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n✗ Error: {description} failed!")
-        print(f"Error code: {e.returncode}")
-        return False
 
 def main():
     """Run the benchmark creation pipeline."""
+    parser = argparse.ArgumentParser(description="Run the LyTOC benchmark pipeline.")
+    parser.add_argument(
+        "--stages", type=lambda value: [s.strip() for s in value.split(",") if s.strip()],
+        default=None,
+        help="Comma-separated stages to run: extract,benchmark,upload "
+             "(default: extract,benchmark, plus upload if --repo is given)"
+    )
+    parser.add_argument(
+        "--yes", "-y", action="store_true",
+        help="Never prompt (for cron); upload only runs if selected with --stages or --repo"
+    )
+    parser.add_argument("--repo", default=None, help="HuggingFace dataset repo, e.g. user/lytoc")
+    parser.add_argument("--private", action="store_true", help="Create the HF repo as private")
+    parser.add_argument("--force", action="store_true", help="Run stages even if up to date")
+    parser.add_argument("--dpi", type=int, default=100, help="Extraction DPI (default %(default)s)")
+    parser.add_argument("--retry-dpi", type=lambda value: [int(d) for d in value.split(",") if d.strip()],
+                        default=[], help="Higher DPIs for pages whose OCR output looks wrong")
+    parser.add_argument("--stitch", type=int, default=1, help="Pages per stitched OCR request")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent OCR requests")
+    parser.add_argument("--processes", type=int, default=1, help="Page rendering processes")
+    parser.add_argument("--text-layer", action="store_true",
+                        help="Use the PDF text layer for born-digital pages")
+    args = parser.parse_args()
 
     print("🚀 LyTOC Benchmark Creation Pipeline")
     print("="*60)
 
     # Check environment
-    if not check_env_file():
+    if not check_env_file() and not args.yes:
         response = input("\nContinue anyway? (y/n): ")
         if response.lower() != 'y':
             print("Exiting...")
             sys.exit(1)
 
-    # Step 1: Extract PDFs
-    print("\n📄 Step 1: Extracting content from PDFs...")
-    if not run_command("python extract_pdfs.py", "PDF Extraction"):
-        print("\nPipeline stopped due to error.")
-        sys.exit(1)
-
-    # Step 2: Create benchmark
-    print("\n📊 Step 2: Creating benchmark dataset...")
-    if not run_command("python create_benchmark.py", "Benchmark Creation"):
-        print("\nPipeline stopped due to error.")
-        sys.exit(1)
+    selected = args.stages or ["extract", "benchmark"] + (["upload"] if args.repo else [])
 
-    # Step 3: Ask about upload
-    print("\n" + "="*60)
-    print("✅ Benchmark dataset created successfully!")
-    print("="*60)
+    # Interactive mode keeps the old upload prompts
+    if not args.yes and args.stages is None and not args.repo:
+        response = input("\n📤 Upload to HuggingFace after building the dataset? (y/n): ")
+        if response.lower() == 'y':
+            args.repo = input("Enter repository name (e.g., username/repo-name): ")
+            args.private = input("Make repository private? (y/n): ").lower() == 'y'
+            selected.append("upload")
 
-    response = input("\n📤 Would you like to upload to HuggingFace? (y/n): ")
-    if response.lower() == 'y':
-        repo_name = input("Enter repository name (e.g., username/repo-name): ")
-        private = input("Make repository private? (y/n): ")
+    stages = build_stages(args)
+    unknown = [name for name in selected if name not in stages]
+    if unknown:
+        print(f"Error: unknown stage(s): {', '.join(unknown)} (choose from {', '.join(stages)})")
+        sys.exit(2)
+    if "upload" in selected and not args.repo:
+        print("Error: the upload stage needs --repo")
+        sys.exit(2)
 
-        cmd = f"python upload_to_hf.py {repo_name}"
-        if private.lower() == 'y':
-            cmd += " --private"
-
-        run_command(cmd, "HuggingFace Upload")
+    results = run_stages(stages, selected, force=args.force)
 
     print("\n" + "="*60)
+    for name, status in results.items():
+        print(f"  {name}: {status}")
+    if any(status in ("failed", "blocked") for status in results.values()):
+        print("Pipeline stopped due to error.")
+        print("="*60)
+        sys.exit(1)
     print("🎉 Pipeline complete!")
     print("="*60)
 
+
 if __name__ == "__main__":
     main()
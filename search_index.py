@@ -0,0 +1,356 @@
+"""
+Full-text search over benchmark exercises.
+
+create_benchmark.py keeps an SQLite FTS5 inverted index of exercise content
+next to the dataset (benchmark_dataset/search_index.sqlite). Content is
+tokenized in Python before indexing, LaTeX-aware: commands such as
+\\Sigma or \\cup are kept as tokens, formatting commands (\\mathrm,
+\\text, \\left, ...) are dropped and the words inside them indexed, and
+Chinese text is indexed as character bigrams. The index is updated per
+homework: only homeworks whose exercises changed are re-indexed.
+
+Queries support implicit AND, OR, NOT, parentheses and "quoted phrases",
+ranked by BM25 or (with --boolean) returned in dataset order. Only the
+index is read, plus the matching rows of dataset.jsonl for previews.
+
+The FTS5 table is contentless: it holds the inverted index but not the
+token text, and results are resolved to full_ids through a small table of
+exercise ids. Rows of a contentless table can only be deleted on SQLite
+3.43+ (contentless_delete); with older versions a change to any homework
+rebuilds the whole index instead.
+
+Usage:
+    python search_index.py "pumping lemma" [--limit 10] [--homework hw3]
+    python search_index.py "turing machine NOT decidable" --boolean
+    python search_index.py --rebuild   # index an existing dataset.jsonl
+"""
+
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+INDEX_FILE = Path("benchmark_dataset/search_index.sqlite")
+
+# Bump when tokenize() changes; a different version forces a full re-index
+TOKENIZER_VERSION = 1
+
+# Bump when the table layout changes; a different format recreates the index
+INDEX_FORMAT = 2
+
+# Whether rows can be deleted from a contentless FTS5 table
+CONTENTLESS_DELETE = sqlite3.sqlite_version_info >= (3, 43, 0)
+
+# Commands that only change how their argument looks
+FORMATTING_COMMANDS = {
+    "\\mathrm", "\\mathbf", "\\mathit", "\\mathsf", "\\mathtt", "\\mathcal", "\\mathbb",
+    "\\text", "\\textbf", "\\textit", "\\textrm", "\\emph", "\\operatorname",
+    "\\left", "\\right", "\\big", "\\bigl", "\\bigr", "\\Big", "\\quad", "\\qquad",
+    "\\displaystyle",
+}
+
+TOKEN_PATTERN = re.compile(r"\\[A-Za-z]+|[A-Za-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff]+")
+QUERY_PATTERN = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+QUERY_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def tokenize(text):
+    """
+    Split text into index tokens.
+
+    Returns:
+        List of tokens: lowercase words and numbers, LaTeX commands with
+        their backslash (e.g. "\\sigma"), and bigrams of Chinese text
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        if token.startswith("\\"):
+            if token not in FORMATTING_COMMANDS:
+                tokens.append(token.lower())
+        elif token.isascii():
+            tokens.append(token.lower())
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
+
+
+def _fts_phrase(tokens):
+    """Quote tokens as one FTS5 string (a phrase if there are several)."""
+    return '"' + " ".join(token.replace('"', '""') for token in tokens) + '"'
+
+
+def to_match_expression(query):
+    """
+    Translate a user query into an FTS5 MATCH expression.
+
+    Words and quoted phrases are tokenized like the indexed content (a word
+    that yields several tokens, e.g. Chinese text or "a^n", becomes a
+    phrase); AND, OR, NOT and parentheses are passed through.
+
+    Raises:
+        ValueError: If the query contains no searchable terms
+    """
+    parts = []
+    for item in QUERY_PATTERN.findall(query):
+        if item in QUERY_OPERATORS or item in ("(", ")"):
+            parts.append(item)
+            continue
+        tokens = tokenize(item.strip('"'))
+        if tokens:
+            parts.append(_fts_phrase(tokens))
+    if not any(part not in QUERY_OPERATORS and part not in ("(", ")") for part in parts):
+        raise ValueError(f"no searchable terms in query: {query!r}")
+    return " ".join(parts)
+
+
+def homework_digest(pairs):
+    """Hash of a homework's (exercise_number, content) pairs and the tokenizer version."""
+    digest = hashlib.sha256(f"{TOKENIZER_VERSION}\n".encode())
+    for number, content in pairs:
+        digest.update(f"{number}\0{content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def connect(path=INDEX_FILE):
+    """Open (or create) the index database, recreating it if its format is outdated."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    index_format = conn.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+    if index_format is None or int(index_format[0]) != INDEX_FORMAT:
+        with conn:
+            for table in ("exercises", "exercise_ids", "segments"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("DELETE FROM meta")
+            conn.execute("INSERT INTO meta VALUES ('format', ?)", (str(INDEX_FORMAT),))
+        conn.execute("VACUUM")
+
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS exercises USING fts5("
+        " tokens, content = '',"
+        + (" contentless_delete = 1," if CONTENTLESS_DELETE else "")
+        + " tokenize = \"unicode61 remove_diacritics 0 tokenchars '\\'\")"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS exercise_ids ("
+        " id INTEGER PRIMARY KEY, full_id TEXT NOT NULL, homework TEXT NOT NULL,"
+        " hw_number INTEGER NOT NULL, exercise_number INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS exercise_ids_homework ON exercise_ids (homework)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS segments (homework TEXT PRIMARY KEY, digest TEXT NOT NULL)"
+    )
+    return conn
+
+
+def _clear(conn):
+    """Remove every exercise from the index."""
+    conn.execute("INSERT INTO exercises (exercises) VALUES ('delete-all')")
+    conn.execute("DELETE FROM exercise_ids")
+    conn.execute("DELETE FROM segments")
+
+
+def _remove_homework(conn, homework):
+    """Remove one homework's exercises (needs CONTENTLESS_DELETE)."""
+    conn.execute(
+        "DELETE FROM exercises WHERE rowid IN (SELECT id FROM exercise_ids WHERE homework = ?)",
+        (homework,)
+    )
+    conn.execute("DELETE FROM exercise_ids WHERE homework = ?", (homework,))
+    conn.execute("DELETE FROM segments WHERE homework = ?", (homework,))
+
+
+def _add_homework(conn, homework, hw_number, pairs, digest):
+    """Index one homework's exercises."""
+    for number, content in pairs:
+        rowid = conn.execute(
+            "INSERT INTO exercise_ids (full_id, homework, hw_number, exercise_number)"
+            " VALUES (?, ?, ?, ?)",
+            (f"{homework}_ex{number}", homework, int(hw_number), int(number))
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO exercises (rowid, tokens) VALUES (?, ?)",
+            (rowid, " ".join(tokenize(content)))
+        )
+    conn.execute("INSERT OR REPLACE INTO segments VALUES (?, ?)", (homework, digest))
+
+
+def build_index(homeworks, path=INDEX_FILE):
+    """
+    Bring the index up to date with the dataset, homework by homework.
+
+    Args:
+        homeworks: (hw_number, [(exercise_number, content), ...]) pairs, as
+            produced by create_benchmark.split_homeworks()
+        path: Index database
+
+    Returns:
+        Dict with counts of "indexed", "unchanged" and "removed" homeworks
+        and the number of "exercises" in the index
+    """
+    conn = connect(path)
+    stats = {"indexed": 0, "unchanged": 0, "removed": 0}
+    try:
+        with conn:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer_version'").fetchone()
+            if version is None or int(version[0]) != TOKENIZER_VERSION:
+                _clear(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('tokenizer_version', ?)",
+                    (str(TOKENIZER_VERSION),)
+                )
+
+            indexed = dict(conn.execute("SELECT homework, digest FROM segments"))
+            homeworks = [
+                (f"hw{hw_number}", hw_number, pairs, homework_digest(pairs))
+                for hw_number, pairs in homeworks
+            ]
+            changed = [item for item in homeworks if indexed.get(item[0]) != item[3]]
+            removed = indexed.keys() - {item[0] for item in homeworks}
+
+            if (changed or removed) and not CONTENTLESS_DELETE and indexed:
+                # Old rows cannot be deleted one by one: start over
+                _clear(conn)
+                changed = homeworks
+            stats["unchanged"] = len(homeworks) - len(changed)
+
+            for homework in removed:
+                if CONTENTLESS_DELETE:
+                    _remove_homework(conn, homework)
+                stats["removed"] += 1
+            for homework, hw_number, pairs, digest in changed:
+                if CONTENTLESS_DELETE and homework in indexed:
+                    _remove_homework(conn, homework)
+                _add_homework(conn, homework, hw_number, pairs, digest)
+                stats["indexed"] += 1
+
+            if stats["indexed"] or stats["removed"]:
+                # Merge the index b-trees so queries touch as few pages as possible
+                conn.execute("INSERT INTO exercises (exercises) VALUES ('optimize')")
+
+        stats["exercises"] = conn.execute("SELECT COUNT(*) FROM exercise_ids").fetchone()[0]
+    finally:
+        conn.close()
+    return stats
+
+
+class SearchIndex:
+    """Read-only access to the search index, usable as a context manager."""
+
+    def __init__(self, path=INDEX_FILE):
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found; run create_benchmark.py first")
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def search(self, query, limit=10, ranked=True, homework=None):
+        """
+        Find exercises matching a query.
+
+        Args:
+            query: Words, "phrases", AND/OR/NOT and parentheses
+            limit: Maximum number of results (None for all)
+            ranked: Order by BM25 score; otherwise in dataset order
+            homework: Only return exercises of this homework, e.g. "hw3"
+
+        Returns:
+            List of (full_id, score) pairs; score is None if not ranked
+        """
+        where = "exercises MATCH ?"
+        params = [to_match_expression(query)]
+        if homework:
+            where += " AND ids.homework = ?"
+            params.append(homework)
+
+        tables = "exercises JOIN exercise_ids AS ids ON ids.id = exercises.rowid"
+        if ranked:
+            sql = (f"SELECT ids.full_id, -bm25(exercises) FROM {tables} WHERE {where}"
+                   " ORDER BY bm25(exercises)")
+        else:
+            sql = (f"SELECT ids.full_id, NULL FROM {tables} WHERE {where}"
+                   " ORDER BY ids.hw_number, ids.exercise_number")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._conn.execute(sql, params).fetchall()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM exercise_ids").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def homeworks_from_dataset(dataset):
+    """Rebuild split_homeworks()-style input from an exported dataset.jsonl."""
+    from dataset_reader import DatasetReader
+
+    homeworks = []
+    with DatasetReader(dataset) as reader:
+        for homework in reader.homeworks():
+            rows = reader.homework(homework)
+            homeworks.append((homework[2:], [(row["exercise_number"], row["content"]) for row in rows]))
+    return homeworks
+
+
+def main():
+    from dataset_reader import DEFAULT_DATASET, DatasetReader
+
+    parser = argparse.ArgumentParser(description="Search benchmark exercises.")
+    parser.add_argument("query", nargs="?", help='Query, e.g. "pumping lemma" OR dfa')
+    parser.add_argument("--limit", type=int, default=10, help="Maximum results (default %(default)s)")
+    parser.add_argument("--homework", default=None, help="Only search this homework, e.g. hw3")
+    parser.add_argument("--boolean", action="store_true",
+                        help="Return all matches in dataset order instead of BM25 ranking")
+    parser.add_argument("--index", type=Path, default=INDEX_FILE, help="Index file")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET,
+                        help="dataset.jsonl, for previews and --rebuild")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Update the index from --dataset before searching")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        stats = build_index(homeworks_from_dataset(args.dataset), args.index)
+        print(f"✓ Index updated: {stats['indexed']} homework(s) indexed, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed "
+              f"({stats['exercises']} exercises)")
+    if not args.query:
+        return
+
+    start = time.perf_counter()
+    with SearchIndex(args.index) as index:
+        try:
+            results = index.search(args.query, None if args.boolean else args.limit,
+                                   ranked=not args.boolean, homework=args.homework)
+        except (ValueError, sqlite3.OperationalError) as e:
+            print(f"Error: invalid query: {e}")
+            return
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(results)} result(s) in {1000 * elapsed:.1f} ms")
+    if not results:
+        return
+    with DatasetReader(args.dataset) as dataset:
+        for full_id, score in results:
+            row = dataset.get(full_id)
+            preview = " ".join(row["content"].split())[:100] if row else ""
+            label = f"{score:9.4g}  " if score is not None else ""
+            print(f"{label}{full_id:<12} {preview}")
+
+
+if __name__ == "__main__":
+    main()
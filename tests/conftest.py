@@ -0,0 +1,28 @@
+"""
+Shared fixtures. Tests run offline, against the stubs in benchmarks/.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The pipeline scripts are top-level modules, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.mock_simpletex import MockSimpleTexServer  # noqa: E402
+
+
+@pytest.fixture
+def simpletex():
+    """Start MockSimpleTexServer instances, stopped at teardown."""
+    servers = []
+
+    def start(**options):
+        server = MockSimpleTexServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,132 @@
+"""
+Concurrent extraction and checkpoint resume, on a generated PDF against
+MockSimpleTexServer.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import extract_pdfs
+from benchmarks.bench_pipeline import synthetic_pdf
+from extract_pdfs import SimpleTexBackend, _init_render_worker, extract_pdf_to_jsonl
+from ocr_client import SimpleTexClient
+
+PAGES = 8
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("raw") / "hw1.pdf"
+    synthetic_pdf(path, PAGES)
+    return path
+
+
+def backend_for(server, **options):
+    options = {"backoff_base": 0.01, "backoff_max": 0.05, **options}
+    return SimpleTexBackend(SimpleTexClient("token", api_url=server.url, **options))
+
+
+@pytest.fixture
+def reference(pdf, tmp_path, simpletex):
+    """Checkpoint of a serial run."""
+    jsonl_file = tmp_path / "serial.jsonl"
+    extract_pdf_to_jsonl(pdf, jsonl_file, backend=backend_for(simpletex()))
+    return jsonl_file.read_bytes()
+
+
+def page_indices(jsonl_bytes):
+    return [json.loads(line)["page_index"] for line in jsonl_bytes.splitlines()]
+
+
+def test_serial_output(reference):
+    assert page_indices(reference) == list(range(PAGES))
+    records = [json.loads(line) for line in reference.splitlines()]
+    assert all("error" not in record and record["content"] for record in records)
+
+
+@pytest.mark.parametrize("workers", [2, 8])
+def test_workers_match_serial(pdf, tmp_path, simpletex, reference, workers):
+    # Jitter makes responses arrive out of page order
+    server = simpletex(latency=0.01, jitter=0.05, seed=workers)
+    jsonl_file = tmp_path / "workers.jsonl"
+    extract_pdf_to_jsonl(pdf, jsonl_file, backend=backend_for(server), workers=workers)
+
+    assert jsonl_file.read_bytes() == reference
+
+
+def test_render_processes_match_serial(pdf, tmp_path, simpletex, reference):
+    server = simpletex(latency=0.01, jitter=0.05, seed=1)
+    jsonl_file = tmp_path / "processes.jsonl"
+    with ProcessPoolExecutor(max_workers=2, initializer=_init_render_worker) as render_pool, \
+            ThreadPoolExecutor(max_workers=4) as ocr_pool:
+        extract_pdf_to_jsonl(pdf, jsonl_file, backend=backend_for(server), workers=4,
+                             render_pool=render_pool, ocr_pool=ocr_pool)
+
+    assert jsonl_file.read_bytes() == reference
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_resume_from_truncated_checkpoint(pdf, tmp_path, simpletex, reference, workers):
+    # An interrupted run: three complete records and a torn fourth one
+    lines = reference.splitlines(keepends=True)
+    jsonl_file = tmp_path / "interrupted.jsonl"
+    jsonl_file.write_bytes(b"".join(lines[:3]) + lines[3][:20])
+
+    server = simpletex()
+    extract_pdf_to_jsonl(pdf, jsonl_file, resume=True, backend=backend_for(server),
+                         workers=workers)
+
+    assert server.requests == PAGES - 3
+    assert jsonl_file.read_bytes() == reference
+
+
+def test_resume_keeps_complete_checkpoint(pdf, tmp_path, simpletex, reference):
+    jsonl_file = tmp_path / "complete.jsonl"
+    jsonl_file.write_bytes(reference)
+
+    server = simpletex()
+    extract_pdf_to_jsonl(pdf, jsonl_file, resume=True, backend=backend_for(server))
+
+    assert server.requests == 0
+    assert jsonl_file.read_bytes() == reference
+
+
+def test_errored_pages_are_retried(pdf, tmp_path, simpletex, reference):
+    failing = {2, 5}
+    server = simpletex(outcomes=["error" if i in failing else "ok" for i in range(PAGES)])
+    jsonl_file = tmp_path / "errors.jsonl"
+    extract_pdf_to_jsonl(pdf, jsonl_file, backend=backend_for(server, max_retries=0))
+
+    records = [json.loads(line) for line in jsonl_file.read_bytes().splitlines()]
+    assert {record["page_index"] for record in records if "error" in record} == failing
+    assert page_indices(jsonl_file.read_bytes()) == list(range(PAGES))
+
+    server = simpletex()
+    extract_pdf_to_jsonl(pdf, jsonl_file, resume=True, backend=backend_for(server), workers=4)
+
+    assert server.requests == len(failing)
+    assert jsonl_file.read_bytes() == reference
+
+
+def test_partial_file_is_retried_by_extract_pdfs(pdf, tmp_path, simpletex, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(extract_pdfs, "UAT", "token")
+    (tmp_path / "raw").mkdir()
+    (tmp_path / "raw" / "hw1.pdf").write_bytes(pdf.read_bytes())
+
+    # Only the second request fails; the endpoint is part of the extraction
+    # parameters, so the retry must use the same server to resume
+    server = simpletex(outcomes=["ok", "error"])
+    client = SimpleTexClient("token", api_url=server.url, max_retries=0)
+    results = extract_pdfs.extract_pdfs(client=client, use_cache=False)
+    assert results["hw1"]["status"] == "partial"
+    assert results["hw1"]["failed_pages"] == 1
+
+    results = extract_pdfs.extract_pdfs(client=client, use_cache=False, workers=4)
+    assert results["hw1"]["status"] == "success"
+    assert server.requests == PAGES + 1
+
+    # A successful file is skipped on the next run
+    assert extract_pdfs.extract_pdfs(client=client, use_cache=False) == {}
@@ -0,0 +1,139 @@
+"""
+SimpleTexClient retries, backoff and rate limiting, against MockSimpleTexServer.
+"""
+
+import time
+
+import pytest
+import requests
+
+from ocr_client import OCRError, RateLimitError, SimpleTexClient, TokenBucket
+
+IMAGE = b"\x89PNG fake page"
+
+
+def make_client(server, **options):
+    """Client for `server` whose backoff delays are recorded in `client.delays`, not slept."""
+    options = {"backoff_base": 0.01, "backoff_max": 0.05, "timeout": (1, 1), **options}
+    client = SimpleTexClient("token", api_url=server.url, **options)
+    client.delays = []
+    backoff = client._backoff
+
+    def record(attempt, retry_after=None):
+        client.delays.append((attempt, retry_after, backoff(attempt, retry_after)))
+        return 0
+
+    client._backoff = record
+    return client
+
+
+def test_success(simpletex):
+    server = simpletex()
+    client = make_client(server)
+
+    assert "Mock exercise" in client.ocr(IMAGE)
+    assert client.stats() == {
+        "requests": 1, "retries": 0, "rate_limited": 0, "bytes_uploaded": len(IMAGE)
+    }
+
+
+def test_retries_server_errors(simpletex):
+    server = simpletex(outcomes=["error", "error", "ok"])
+    client = make_client(server)
+
+    assert "Mock exercise" in client.ocr(IMAGE)
+    assert client.stats()["requests"] == 3
+    assert client.stats()["retries"] == 2
+    assert [attempt for attempt, _, _ in client.delays] == [0, 1]
+
+
+def test_retries_timeouts(simpletex):
+    server = simpletex(outcomes=["slow", "ok"], slow_delay=1.0)
+    client = make_client(server, timeout=(1, 0.2))
+
+    assert "Mock exercise" in client.ocr(IMAGE)
+    assert client.stats()["requests"] == 2
+    assert client.stats()["retries"] == 1
+
+
+def test_backoff_is_exponential_and_capped(simpletex):
+    server = simpletex(error_rate=1.0)
+    client = make_client(server, max_retries=6, backoff_base=0.01, backoff_max=0.1)
+
+    with pytest.raises(requests.HTTPError):
+        client.ocr(IMAGE)
+    assert [attempt for attempt, _, _ in client.delays] == list(range(6))
+    for attempt, _, delay in client.delays:
+        assert 0 <= delay <= min(0.1, 0.01 * 2 ** attempt)
+
+
+def test_backoff_honours_retry_after(simpletex):
+    server = simpletex(outcomes=["rate_limit", "ok"])
+    client = make_client(server)
+
+    client.ocr(IMAGE)
+    # The stub sends Retry-After: 0
+    assert [retry_after for _, retry_after, _ in client.delays] == [0.0]
+    assert SimpleTexClient("token", backoff_base=0.01)._backoff(0, retry_after=2.0) >= 2.0
+
+
+@pytest.mark.parametrize("outcome", ["rate_limit", "quota"])
+def test_rate_limit_slows_down(simpletex, outcome):
+    server = simpletex(outcomes=[outcome, outcome, "ok"])
+    client = make_client(server, rate_limit=100)
+
+    assert "Mock exercise" in client.ocr(IMAGE)
+    stats = client.stats()
+    assert stats["rate_limited"] == 2
+    assert stats["retries"] == 2
+    # Halved twice, then recovered by one step of 5% of the maximum
+    assert client.limiter.rate == pytest.approx(100 * 0.5 * 0.5 + 5)
+
+
+def test_gives_up_after_max_retries(simpletex):
+    server = simpletex(error_rate=1.0)
+    client = make_client(server, max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        client.ocr(IMAGE)
+    assert server.requests == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_gives_up_on_persistent_quota_errors(simpletex):
+    server = simpletex(quota_error_rate=1.0)
+    client = make_client(server, max_retries=1, rate_limit=100)
+
+    with pytest.raises(RateLimitError):
+        client.ocr(IMAGE)
+    assert server.requests == 2
+    assert client.stats()["rate_limited"] == 2
+
+
+def test_other_api_errors_are_not_retried(simpletex):
+    server = simpletex(outcomes=["invalid"])
+    client = make_client(server)
+
+    with pytest.raises(OCRError, match="unsupported"):
+        client.ocr(IMAGE)
+    assert server.requests == 1
+    assert client.delays == []
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is available at once, the other five take 1/50 s each
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_token_bucket_adapts():
+    bucket = TokenBucket(rate=10, min_rate=1)
+    for _ in range(10):
+        bucket.slow_down()
+    assert bucket.rate == 1
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == 10
@@ -0,0 +1,91 @@
+"""
+Text post-processing shared by extract_pdfs.py and create_benchmark.py.
+
+Punctuation normalization uses a module-level replacement table and only
+rewrites the page for characters it actually contains; exercise
+segmentation is one forward scan with module-level compiled patterns.
+"""
+
+import re
+from collections import namedtuple
+
+# Chinese (full-width) punctuation and typographic quotes -> ASCII.
+# A chain of str.replace calls beats str.translate here: translate walks
+# mixed-width strings one code point at a time, replace uses fast search.
+PUNCTUATION_TABLE = (
+    ('，', ','), ('。', '.'), ('、', ','), ('；', ';'), ('：', ':'),
+    ('？', '?'), ('！', '!'), ('“', '"'), ('”', '"'), ('‘', "'"),
+    ('’', "'"), ('（', '('), ('）', ')'), ('【', '['), ('】', ']'),
+    ('《', '<'), ('》', '>'), ('．', '.'),
+)
+
+# Bump when iter_exercises output changes so cached splits are discarded
+SPLITTER_VERSION = 1
+
+# Separator between pages in the parsed markdown files
+PAGE_SEPARATOR = "\n\n---\n\n"
+
+# First exercise line, e.g. "1 (30'). ..." -- everything before it is the header
+HEADER_PATTERN = re.compile(r'^\d+[^\S\n]*\(', re.MULTILINE)
+
+# Exercise numbers: "1 (30'). " or "1. " or "2 (40'). "
+# Matches: digit(s), optional space, optional (time'), optional space, period or dot
+EXERCISE_PATTERN = re.compile(r'^(\d+)\s*(?:\([^)]+\))?\s*\.?\s+', re.MULTILINE)
+
+# Trailing page number (digits on the last line)
+TRAILING_PAGE_NUMBER = re.compile(r'\n\d+\s*$')
+
+# Shorter exercise bodies are treated as parsing errors
+MIN_EXERCISE_LENGTH = 10
+
+Exercise = namedtuple("Exercise", ["number", "content", "start", "end", "page"])
+Exercise.__doc__ = """\
+An exercise found in a parsed homework document.
+
+number: Exercise number as written ("1", "2", ...)
+content: Exercise text, stripped and without a trailing page number
+start, end: Character offsets of the exercise in the document
+page: Index of the markdown page (PAGE_SEPARATOR-delimited) it starts on
+"""
+
+
+def normalize_punctuation(content):
+    """Replace Chinese punctuation with English equivalents."""
+    for cn_char, en_char in PUNCTUATION_TABLE:
+        if cn_char in content:
+            content = content.replace(cn_char, en_char)
+    return content
+
+
+def iter_exercises(content):
+    """
+    Yield the exercises of a homework document in a single forward scan.
+
+    The header (title, date, ...) before the first "N (" line is skipped
+    without copying the document; each exercise runs from its number to
+    the next exercise number.
+
+    Args:
+        content: Full markdown content
+
+    Yields:
+        Exercise tuples in document order
+    """
+    header = HEADER_PATTERN.search(content)
+    position = header.start() if header else 0
+
+    matches = EXERCISE_PATTERN.finditer(content, position)
+    current = next(matches, None)
+    page = content.count(PAGE_SEPARATOR, 0, current.start()) if current else 0
+
+    while current is not None:
+        following = next(matches, None)
+        end = following.start() if following else len(content)
+
+        body = TRAILING_PAGE_NUMBER.sub('', content[current.end():end].strip())
+        if len(body) >= MIN_EXERCISE_LENGTH:
+            yield Exercise(current.group(1), body.strip(), current.start(), end, page)
+
+        if following is not None:
+            page += content.count(PAGE_SEPARATOR, current.start(), following.start())
+        current = following
@@ -1,97 +1,267 @@
+"""
+Upload the benchmark dataset to HuggingFace Hub.
+
+Everything (README, JSON, JSONL and the Parquet shards under data/) goes up
+in a single commit. Files whose content already matches the copy on the Hub
+are left out of the commit, and shards that no longer exist locally are
+deleted in the same commit.
+
+Usage:
+    python upload_to_hf.py username/repo-name [--private] [--dry-run] [--endpoint URL]
+
+Environment:
+    HF_TOKEN: HuggingFace access token (required unless --dry-run)
+"""
+
 import os
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from huggingface_hub import HfApi, create_repo
-from datasets import load_from_disk
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def upload_to_huggingface(repo_name, private=False):
-    """Upload benchmark dataset to HuggingFace."""
+DATASET_DIR = Path("benchmark_dataset")
+
+# Remote folder holding the Parquet shards (as written by `push_to_hub`)
+DATA_DIR = "data"
+
+
+def local_files(dataset_dir=DATASET_DIR, readme=Path("HF_README.md")):
+    """
+    List the files to publish as (local_path, path_in_repo) pairs.
+
+    Args:
+        dataset_dir: Output directory of create_benchmark.py
+        readme: Dataset card, published as README.md
+    """
+    files = [
+        (readme, "README.md"),
+        (dataset_dir / "dataset.json", "dataset.json"),
+        (dataset_dir / "dataset.jsonl", "dataset.jsonl"),
+    ]
+    files += [
+        (shard, f"{DATA_DIR}/{shard.name}")
+        for shard in sorted((dataset_dir / "parquet").glob("*.parquet"))
+    ]
+    return [(path, path_in_repo) for path, path_in_repo in files if path.exists()]
+
+
+def file_hashes(path):
+    """
+    Hash a file the way the Hub identifies content, in one read.
+
+    Returns:
+        (git_blob_sha1, sha256, size): the git blob id is what the Hub
+        reports for regular files, the SHA-256 what it reports for LFS files
+    """
+    size = path.stat().st_size
+    git_sha1 = hashlib.sha1(f"blob {size}\0".encode())
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            git_sha1.update(chunk)
+            sha256.update(chunk)
+    return git_sha1.hexdigest(), sha256.hexdigest(), size
+
+
+def remote_files(api, repo_id, revision=None):
+    """Map path -> RepoFile for every file in the repo (empty if it does not exist yet)."""
+    from huggingface_hub.utils import EntryNotFoundError, RepositoryNotFoundError, RevisionNotFoundError
+
+    try:
+        return {
+            entry.path: entry
+            for entry in api.list_repo_tree(
+                repo_id, recursive=True, repo_type="dataset", revision=revision
+            )
+            if hasattr(entry, "blob_id")
+        }
+    except (RepositoryNotFoundError, RevisionNotFoundError, EntryNotFoundError):
+        return {}
+
+
+def is_unchanged(hashes, remote):
+    """Check whether a local file's hashes match a remote RepoFile."""
+    git_sha1, sha256, size = hashes
+    if remote is None or remote.size != size:
+        return False
+    if remote.lfs is not None:
+        return remote.lfs.sha256 == sha256
+    return remote.blob_id == git_sha1
+
+
+def plan_upload(files, remote, workers=8):
+    """
+    Decide which files to add, skip and delete.
+
+    Local files are hashed in parallel. Remote Parquet shards under data/
+    that are not part of the local dataset are deleted, so a re-sharded
+    dataset does not leave stale shards behind.
+
+    Args:
+        files: (local_path, path_in_repo) pairs from local_files()
+        remote: path -> RepoFile from remote_files()
+        workers: Threads used for hashing
+
+    Returns:
+        Dict with "add" and "skip" lists of (local_path, path_in_repo, size)
+        and a "delete" list of remote paths
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        hashes = list(pool.map(file_hashes, [path for path, _ in files]))
+
+    plan = {"add": [], "skip": [], "delete": []}
+    for (path, path_in_repo), file_hash in zip(files, hashes):
+        action = "skip" if is_unchanged(file_hash, remote.get(path_in_repo)) else "add"
+        plan[action].append((path, path_in_repo, file_hash[2]))
+
+    published = {path_in_repo for _, path_in_repo in files}
+    plan["delete"] = sorted(
+        path for path in remote
+        if path.startswith(f"{DATA_DIR}/") and path.endswith(".parquet") and path not in published
+    )
+    return plan
+
+
+def print_plan(plan):
+    """Print the per-file actions and the number of bytes to send."""
+    for path, path_in_repo, size in plan["add"]:
+        print(f"  + {path_in_repo} ({size:,} bytes, from {path})")
+    for path, path_in_repo, size in plan["skip"]:
+        print(f"  = {path_in_repo} (unchanged)")
+    for path_in_repo in plan["delete"]:
+        print(f"  - {path_in_repo}")
+
+    bytes_to_send = sum(size for _, _, size in plan["add"])
+    bytes_skipped = sum(size for _, _, size in plan["skip"])
+    print(f"\n{len(plan['add'])} to upload ({bytes_to_send:,} bytes), "
+          f"{len(plan['skip'])} unchanged ({bytes_skipped:,} bytes skipped), "
+          f"{len(plan['delete'])} to delete")
+    return bytes_to_send
+
+
+def upload_to_huggingface(repo_name, private=False, dry_run=False, endpoint=None, workers=8,
+                          revision=None, dataset_dir=DATASET_DIR):
+    """
+    Upload benchmark dataset to HuggingFace in a single commit.
+
+    Args:
+        repo_name: Dataset repo id, e.g. "username/lytoc-benchmark"
+        private: Create the repository as private
+        dry_run: Only report what would be uploaded; nothing is written
+        endpoint: Hub URL (default: huggingface.co, or HF_ENDPOINT)
+        workers: Threads for hashing local files and uploading LFS files
+        revision: Branch to commit to (default: main)
+        dataset_dir: Output directory of create_benchmark.py
+
+    Returns:
+        Dict with the upload plan and the commit (None if nothing was committed)
+    """
 
     # Check if dataset exists
-    dataset_path = Path("benchmark_dataset/huggingface_dataset")
-    if not dataset_path.exists():
+    files = local_files(dataset_dir)
+    if not any(path_in_repo.startswith(f"{DATA_DIR}/") for _, path_in_repo in files):
         print("Error: Dataset not found. Run create_benchmark.py first.")
         return
 
     # Get HuggingFace token
     token = os.getenv("HF_TOKEN")
-    if not token:
+    if not token and not dry_run:
         print("Error: HF_TOKEN not found in .env file")
         return
 
+    from huggingface_hub import CommitOperationAdd, CommitOperationDelete, HfApi
+
     # Initialize HF API
-    api = HfApi(token=token)
+    api = HfApi(endpoint=endpoint, token=token or None)
 
     # Create repository
-    print(f"Creating repository: {repo_name}")
-    try:
-        repo_url = create_repo(
-            repo_id=repo_name,
-            repo_type="dataset",
-            private=private,
-            exist_ok=True,
-            token=token
-        )
-        print(f"Repository created/found: {repo_url}")
-    except Exception as e:
-        print(f"Error creating repository: {e}")
-        return
+    if not dry_run:
+        print(f"Creating repository: {repo_name}")
+        try:
+            repo_url = api.create_repo(
+                repo_id=repo_name,
+                repo_type="dataset",
+                private=private,
+                exist_ok=True
+            )
+            print(f"Repository created/found: {repo_url}")
+        except Exception as e:
+            print(f"Error creating repository: {e}")
+            return
+
+    # Compare local files with the remote tree
+    print("Comparing local files with the Hub...")
+    plan = plan_upload(files, remote_files(api, repo_name, revision), workers)
+    print_plan(plan)
 
-    # Load dataset
-    print("Loading dataset...")
-    dataset = load_from_disk(str(dataset_path))
+    if dry_run:
+        print("\nDry run: nothing was uploaded.")
+        return {"plan": plan, "commit": None}
+
+    if not plan["add"] and not plan["delete"]:
+        print("\n✓ Dataset is up to date, nothing to commit.")
+        return {"plan": plan, "commit": None}
+
+    operations = [
+        CommitOperationAdd(path_in_repo=path_in_repo, path_or_fileobj=str(path))
+        for path, path_in_repo, _ in plan["add"]
+    ] + [
+        CommitOperationDelete(path_in_repo=path_in_repo)
+        for path_in_repo in plan["delete"]
+    ]
 
-    # Upload dataset
-    print("Uploading dataset to HuggingFace...")
+    print(f"\nUploading {len(operations)} change(s) in one commit...")
     try:
-        dataset.push_to_hub(
+        commit = api.create_commit(
             repo_id=repo_name,
-            token=token,
-            private=private
+            repo_type="dataset",
+            operations=operations,
+            commit_message="Update benchmark dataset",
+            revision=revision,
+            num_threads=max(1, workers)
         )
-        print(f"✓ Dataset uploaded successfully!")
-        print(f"View at: https://huggingface.co/datasets/{repo_name}")
     except Exception as e:
         print(f"Error uploading dataset: {e}")
         return
 
-    # Upload additional files (README, JSON, JSONL)
-    print("\nUploading additional files...")
-    files_to_upload = [
-        ("HF_README.md", "README.md"),  # Upload HF_README.md as README.md
-        ("benchmark_dataset/dataset.json", "dataset.json"),
-        ("benchmark_dataset/dataset.jsonl", "dataset.jsonl"),
-    ]
-
-    for local_path, repo_path in files_to_upload:
-        if Path(local_path).exists():
-            try:
-                api.upload_file(
-                    path_or_fileobj=local_path,
-                    path_in_repo=repo_path,
-                    repo_id=repo_name,
-                    repo_type="dataset",
-                    token=token
-                )
-                print(f"✓ Uploaded {local_path}")
-            except Exception as e:
-                print(f"✗ Error uploading {local_path}: {e}")
+    print(f"✓ Dataset uploaded successfully!")
+    print(f"Commit: {commit.commit_url}")
 
     print(f"\n{'='*50}")
     print(f"Upload complete!")
-    print(f"Dataset URL: https://huggingface.co/datasets/{repo_name}")
+    print(f"Dataset URL: {api.endpoint}/datasets/{repo_name}")
+    return {"plan": plan, "commit": commit}
 
-if __name__ == "__main__":
-    import sys
 
-    if len(sys.argv) < 2:
-        print("Usage: python upload_to_hf.py <username/repo-name> [--private]")
-        print("Example: python upload_to_hf.py myusername/lytoc-benchmark")
-        sys.exit(1)
+def main():
+    parser = argparse.ArgumentParser(
+        description="Upload benchmark_dataset/ to a HuggingFace dataset repo in one commit."
+    )
+    parser.add_argument("repo_name", help="Dataset repo id, e.g. myusername/lytoc-benchmark")
+    parser.add_argument("--private", action="store_true", help="Create the repo as private")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Report which files would be uploaded and how many bytes, without uploading"
+    )
+    parser.add_argument(
+        "--endpoint", default=None,
+        help="Hub URL, e.g. a local fake Hub (default: huggingface.co or HF_ENDPOINT)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="Threads for hashing and for parallel LFS uploads (default %(default)s)"
+    )
+    parser.add_argument("--revision", default=None, help="Branch to commit to (default main)")
+    args = parser.parse_args()
+
+    upload_to_huggingface(
+        args.repo_name, private=args.private, dry_run=args.dry_run, endpoint=args.endpoint,
+        workers=args.workers, revision=args.revision
+    )
 
-    repo_name = sys.argv[1]
-    private = "--private" in sys.argv
 
-    upload_to_huggingface(repo_name, private)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Watch raw/ and keep the benchmark dataset up to date.
+
+A long-running loop: new, changed and removed PDFs in raw/ are detected
+with watchdog (inotify, FSEvents, ...) when it is installed, or by polling
+file sizes and mtimes otherwise. Bursts of changes (a batch of files being
+copied in) are debounced into one update, which extracts only the affected
+PDFs and, if any parsed homework changed, rebuilds the dataset.
+
+The rebuild is incremental where the pipeline is: only changed markdown
+files are re-split, only changed homeworks are re-indexed, and
+dataset.json, dataset.jsonl, the Parquet shards and the HuggingFace
+dataset are staged and swapped in atomically (see dataset_writer.py).
+
+Usage:
+    python watch.py [--debounce 2] [--interval 1] [--polling] [--dpi 100] [--workers 4]
+"""
+
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+RAW_DIR = Path("raw")
+PARSED_DIR = Path("parsed_data")
+
+# Filesystem events that mean a PDF changed; "opened" and "closed_no_write"
+# are also emitted when extraction reads a PDF
+CHANGE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+
+def pdf_snapshot(directory):
+    """Map each PDF in `directory` to its (size, mtime_ns)."""
+    snapshot = {}
+    for path in directory.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        snapshot[path.name] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+class PollingWatcher:
+    """Detect PDF changes by comparing directory snapshots every `interval` seconds."""
+
+    name = "polling"
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._snapshot = pdf_snapshot(self.directory)
+
+    def changes(self, timeout=None):
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait at most (None: until something changes)
+
+        Returns:
+            Set of PDF file names added, modified or removed (empty on timeout)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+            snapshot = pdf_snapshot(self.directory)
+            changed = {
+                name for name in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(name) != self._snapshot.get(name)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def stop(self):
+        pass
+
+
+class WatchdogWatcher:
+    """Detect PDF changes from filesystem events (requires watchdog)."""
+
+    name = "watchdog"
+
+    def __init__(self, directory):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self.directory = Path(directory)
+        self._changed = set()
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in CHANGE_EVENTS:
+                    return
+                paths = [event.src_path, getattr(event, "dest_path", "")]
+                names = {Path(path).name for path in paths if str(path).endswith(".pdf")}
+                if names:
+                    with watcher._lock:
+                        watcher._changed |= names
+                    watcher._event.set()
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.directory), recursive=False)
+        self._observer.start()
+
+    def changes(self, timeout=None):
+        """Wait for changes; same contract as PollingWatcher.changes()."""
+        self._event.wait(timeout)
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            self._event.clear()
+        return changed
+
+    def stop(self):
+        self._observer.stop()
+        self._observer.join()
+
+
+def make_watcher(directory, interval=1.0, polling=False):
+    """Use watchdog if it is installed (and not disabled), else poll."""
+    if not polling:
+        try:
+            return WatchdogWatcher(directory)
+        except ImportError:
+            pass
+    return PollingWatcher(directory, interval)
+
+
+def wait_for_batch(watcher, debounce):
+    """
+    Block until PDFs change, then until `debounce` seconds pass without
+    further changes (files still being copied keep changing).
+
+    Returns:
+        Set of changed PDF file names
+    """
+    pending = set()
+    while not pending:
+        pending = watcher.changes()
+    while True:
+        more = watcher.changes(timeout=debounce)
+        if not more:
+            return pending
+        pending |= more
+
+
+def markdown_digests(parsed_dir=PARSED_DIR):
+    """SHA-256 of every parsed homework markdown file, by name."""
+    return {
+        path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in parsed_dir.glob("hw*.md")
+    }
+
+
+def remove_outputs(stem, parsed_dir=PARSED_DIR):
+    """Drop the parsed files and manifest entry of a PDF removed from raw/."""
+    from extract_pdfs import load_manifest, save_manifest
+
+    for suffix in (".md", ".jsonl"):
+        (parsed_dir / f"{stem}{suffix}").unlink(missing_ok=True)
+    metadata_file = parsed_dir / "extraction_metadata.json"
+    manifest = load_manifest(metadata_file)
+    if manifest.pop(stem, None) is not None:
+        save_manifest(metadata_file, manifest)
+
+
+def update(changed, extract_options, benchmark_options, raw_dir=RAW_DIR, rebuild=False):
+    """
+    Bring parsed_data/ and benchmark_dataset/ up to date with raw/.
+
+    Args:
+        changed: PDF file names that changed, or None to check every PDF
+            (extraction skips unchanged ones)
+        extract_options: Keyword arguments for extract_pdfs()
+        benchmark_options: Keyword arguments for create_benchmark()
+        rebuild: Rebuild the dataset even if no parsed homework changed
+            (e.g. after a failed rebuild)
+
+    Returns:
+        (rebuilt, incomplete): whether the dataset was rebuilt, and the
+        names of PDFs whose extraction did not fully succeed
+    """
+    from create_benchmark import create_benchmark
+    from extract_pdfs import extract_pdfs
+
+    before = markdown_digests()
+    if changed is None:
+        present, removed = None, []
+    else:
+        present = sorted(Path(name).stem for name in changed if (raw_dir / name).exists())
+        removed = sorted(Path(name).stem for name in changed if not (raw_dir / name).exists())
+
+    incomplete = set()
+    if present is None or present:
+        results = extract_pdfs(only=present, **extract_options)
+        if results is None:
+            # Nothing was extracted (e.g. OCR_UAT is not set)
+            stems = present if present is not None else [path.stem for path in raw_dir.glob("*.pdf")]
+            incomplete = {f"{stem}.pdf" for stem in stems}
+        else:
+            # Files skipped as unchanged are not in the results: they succeeded before
+            incomplete = {
+                f"{stem}.pdf" for stem, result in results.items() if result["status"] != "success"
+            }
+    for stem in removed:
+        print(f"- {stem}.pdf removed, dropping its parsed output")
+        remove_outputs(stem)
+
+    if not rebuild and markdown_digests() == before and Path("benchmark_dataset/dataset.jsonl").exists():
+        print("No parsed homework changed, dataset left as is")
+        return False, incomplete
+    return create_benchmark(**benchmark_options) is not None, incomplete
+
+
+def watch(debounce=2.0, interval=1.0, polling=False, initial=True, extract_options=None,
+          benchmark_options=None):
+    """
+    Run the watch loop until interrupted.
+
+    Args:
+        debounce: Quiet period in seconds that ends a burst of changes
+        interval: Polling interval in seconds (polling watcher only)
+        polling: Poll even if watchdog is installed
+        initial: First bring everything up to date, as after downtime
+        extract_options: Keyword arguments for extract_pdfs()
+        benchmark_options: Keyword arguments for create_benchmark()
+    """
+    extract_options = extract_options or {}
+    benchmark_options = benchmark_options or {}
+
+    if not RAW_DIR.exists():
+        print("Error: raw/ directory not found")
+        return
+
+    watcher = make_watcher(RAW_DIR, interval, polling)
+    print(f"👀 Watching {RAW_DIR}/ for PDFs ({watcher.name}, {debounce}s debounce). Ctrl+C to stop.")
+
+    def try_update(changed, rebuild=False):
+        """
+        Run update(), logging failures instead of ending the watch loop.
+
+        Returns:
+            PDF names to retry with the next batch (None: every PDF)
+        """
+        start = time.perf_counter()
+        try:
+            rebuilt, incomplete = update(changed, extract_options, benchmark_options, rebuild=rebuild)
+        except Exception as e:
+            print(f"✗ Update failed: {type(e).__name__}: {e}; retrying with the next change")
+            return changed
+        status = "✓ Dataset updated" if rebuilt else "✓ Up to date"
+        print(f"{status} in {time.perf_counter() - start:.1f}s; watching for changes...")
+        if incomplete:
+            print(f"⚠ Not fully extracted: {', '.join(sorted(incomplete))}; retrying with the next change")
+        return incomplete
+
+    # PDFs whose update failed, merged into the next batch (None: everything)
+    retry = set()
+    try:
+        if initial:
+            retry = try_update(None)
+
+        while True:
+            changed = wait_for_batch(watcher, debounce)
+            print(f"\n{'='*60}")
+            print(f"Changed: {', '.join(sorted(changed))}")
+            if retry is None:
+                print("Retrying: all PDFs")
+            elif retry - changed:
+                print(f"Retrying: {', '.join(sorted(retry - changed))}")
+
+            # A failed update may have extracted its PDFs, so force the rebuild
+            retrying = retry is None or bool(retry)
+            batch = None if retry is None else changed | retry
+            retry = try_update(batch, rebuild=retrying)
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        watcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch raw/ and incrementally rebuild the dataset when PDFs change."
+    )
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="Seconds without changes that end a burst (default %(default)s)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Polling interval in seconds (default %(default)s)")
+    parser.add_argument("--polling", action="store_true",
+                        help="Poll raw/ even if watchdog is installed")
+    parser.add_argument("--no-initial", action="store_true",
+                        help="Do not bring the dataset up to date before watching")
+    parser.add_argument("--dpi", type=int, default=100, help="Extraction DPI (default %(default)s)")
+    parser.add_argument("--retry-dpi", type=lambda value: [int(d) for d in value.split(",") if d.strip()],
+                        default=[], help="Higher DPIs for pages whose OCR output looks wrong")
+    parser.add_argument("--stitch", type=int, default=1, help="Pages per stitched OCR request")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent OCR requests")
+    parser.add_argument("--processes", type=int, default=1, help="Page rendering processes")
+    parser.add_argument("--text-layer", action="store_true",
+                        help="Use the PDF text layer for born-digital pages")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Skip near-duplicate detection when rebuilding")
+    args = parser.parse_args()
+
+    watch(
+        debounce=args.debounce, interval=args.interval, polling=args.polling,
+        initial=not args.no_initial,
+        extract_options={
+            "dpi": args.dpi, "retry_dpis": args.retry_dpi, "stitch": args.stitch,
+            "workers": args.workers, "processes": args.processes, "text_layer": args.text_layer,
+        },
+        benchmark_options={"dedup": not args.no_dedup},
+    )
+
+
+if __name__ == "__main__":
+    main()